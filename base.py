@@ -6,7 +6,7 @@ from typing import Optional
 
 from src.config import Config
 from src.web_host import WebHost
-from src.media_player import MediaPlayer
+from src.media_player import MediaPlayer, MediaTranscoder
 from src.notification import NotificationService
 from src.monobank import MonobankClient
 from src.poller import DonationPoller
@@ -120,12 +120,14 @@ async def main():
     # Initialize core components
     web_host = WebHost(config, project_root=PROJECT_ROOT)
     media_player = MediaPlayer(config, project_root=PROJECT_ROOT)
+    media_transcoder = MediaTranscoder(config, media_player, project_root=PROJECT_ROOT)
     donations_feed = DonationsFeed(config, max_donations=50)
     notification_service = NotificationService(web_host, media_player, config)
 
     # Connect components to each other
     web_host.set_notification_service(notification_service)
     web_host.set_donations_feed(donations_feed)
+    web_host.set_media_transcoder(media_transcoder)
     notification_service.set_donations_feed(donations_feed)
 
     # Initialize monobank components
@@ -159,6 +161,8 @@ async def main():
 
     # Start services
     await web_host.start_async()
+    await media_player.start()
+    await media_transcoder.start()
     await notification_service.start()
     await poller.start()
     await youtube_player.start()
@@ -188,6 +192,8 @@ async def main():
     # Stop services
     await poller.stop()
     await notification_service.stop()
+    await media_transcoder.stop()
+    await media_player.stop()
     await web_host.stop_async()
     await youtube_player.stop()
     player_ui.stop()
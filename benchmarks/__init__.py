@@ -0,0 +1,28 @@
+from .runner import (
+    Benchmark,
+    BenchContext,
+    benchmark,
+    get_benchmarks,
+    run_benchmarks,
+    compare_results,
+    format_comparison,
+    save_results,
+    load_results,
+)
+from .load import LoadOptions, LoadTest, LoadServer, format_report
+
+__all__ = [
+    "Benchmark",
+    "BenchContext",
+    "benchmark",
+    "get_benchmarks",
+    "run_benchmarks",
+    "compare_results",
+    "format_comparison",
+    "save_results",
+    "load_results",
+    "LoadOptions",
+    "LoadTest",
+    "LoadServer",
+    "format_report",
+]
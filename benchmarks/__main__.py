@@ -0,0 +1,167 @@
+"""
+Offline benchmarks of the hot paths.
+
+    python -m benchmarks list
+    python -m benchmarks run [-k PATTERN] [-o results.json] [--repeat N] [--min-time S]
+    python -m benchmarks compare BASE.json NEW.json [--threshold 0.10]
+
+compare exits with code 1 when any benchmark regressed.
+
+WebSocket fan-out load test against a live server (see benchmarks/load.py):
+
+    python -m benchmarks load [--url URL | --spawn [--workers N]] [--overlay-clients N] [--feed-clients N]
+                              [--rate R] [--duration S] [--pid PID] [-o report.json]
+    python -m benchmarks serve [--port P] [--workers N]
+"""
+import argparse
+import asyncio
+import os
+import signal
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+from .runner import ensure_import_path
+
+ensure_import_path()
+
+from .load import LoadOptions, LoadServer, LoadTest, format_report, spawn_server, wait_for_server  # noqa: E402
+from .runner import (  # noqa: E402
+    PROJECT_ROOT,
+    BenchContext,
+    compare_results,
+    format_comparison,
+    get_benchmarks,
+    load_results,
+    run_benchmarks,
+    save_results,
+)
+
+RESULTS_DIR = PROJECT_ROOT / "benchmarks" / "results"
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Offline hot path benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_cmd = commands.add_parser("list", help="List benchmarks")
+    list_cmd.add_argument("-k", "--filter", help="Only benchmarks matching this name or glob")
+
+    run_cmd = commands.add_parser("run", help="Run benchmarks and save results as JSON")
+    run_cmd.add_argument("-k", "--filter", help="Only benchmarks matching this name or glob")
+    run_cmd.add_argument("-o", "--output", type=Path, help="Results file (default: benchmarks/results/<time>.json)")
+    run_cmd.add_argument("--repeat", type=int, default=5, help="Samples per benchmark (default: 5)")
+    run_cmd.add_argument("--min-time", type=float, default=0.1, help="Minimum seconds per sample (default: 0.1)")
+
+    compare_cmd = commands.add_parser("compare", help="Compare two result files")
+    compare_cmd.add_argument("base", type=Path)
+    compare_cmd.add_argument("new", type=Path)
+    compare_cmd.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown, 0.10 = 10%% (default)")
+
+    load_cmd = commands.add_parser("load", help="WebSocket fan-out load test against a live server")
+    load_cmd.add_argument("--url", default="http://localhost:8080", help="Server to test (default: %(default)s)")
+    load_cmd.add_argument("--spawn", action="store_true", help="Start a headless server (python -m benchmarks serve) and test it")
+    load_cmd.add_argument("--port", type=int, default=8090, help="Port of the spawned server (default: %(default)s)")
+    load_cmd.add_argument("--workers", type=int, default=0, help="Worker processes of the spawned server (default: 0)")
+    load_cmd.add_argument("--batch-window-ms", type=float, default=0.0, help="ws_batch_window_ms of the spawned server (default: 0)")
+    load_cmd.add_argument("--pid", type=int, help="Server process to sample memory/CPU of (automatic with --spawn)")
+    load_cmd.add_argument("--overlay-clients", type=int, default=500, help="Connections to /ws (default: %(default)s)")
+    load_cmd.add_argument("--feed-clients", type=int, default=500, help="Connections to /feed/ws (default: %(default)s)")
+    load_cmd.add_argument("--rate", type=float, default=2.0, help="Donations per second (default: %(default)s)")
+    load_cmd.add_argument("--duration", type=float, default=30.0, help="Seconds of firing donations (default: %(default)s)")
+    load_cmd.add_argument("--grace", type=float, default=5.0, help="Seconds to wait for late deliveries (default: %(default)s)")
+    load_cmd.add_argument("--lag-threshold", type=float, default=1.0, help="p99 seconds above which a client counts as lagging")
+    load_cmd.add_argument("-o", "--output", type=Path, help="Report file (default: benchmarks/results/load-<time>.json)")
+
+    serve_cmd = commands.add_parser("serve", help="Headless server for load tests (no Monobank, no YouTube)")
+    serve_cmd.add_argument("--port", type=int, default=8090)
+    serve_cmd.add_argument("--workers", type=int, default=0)
+    serve_cmd.add_argument("--batch-window-ms", type=float, default=0.0)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "load":
+        return _run_load(args)
+
+    if args.command == "serve":
+        asyncio.run(_serve(args.port, args.workers, args.batch_window_ms))
+        return 0
+
+    if args.command == "list":
+        for bench in get_benchmarks(args.filter):
+            print(bench.name)
+        return 0
+
+    if args.command == "run":
+        benchmarks = get_benchmarks(args.filter)
+        if not benchmarks:
+            print(f"No benchmarks match '{args.filter}'")
+            return 2
+        data = run_benchmarks(benchmarks, repeat=args.repeat, min_time=args.min_time)
+        output = args.output or RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+        save_results(data, output)
+        print(f"\nSaved {len(data['results'])} result(s) to {output}")
+        return 0
+
+    rows = compare_results(load_results(args.base), load_results(args.new), args.threshold)
+    print(format_comparison(rows))
+    regressions = [row["name"] for row in rows if row["status"] == "regression"]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+def _run_load(args: argparse.Namespace) -> int:
+    options = LoadOptions(
+        url=args.url,
+        overlay_clients=args.overlay_clients,
+        feed_clients=args.feed_clients,
+        rate=args.rate,
+        duration=args.duration,
+        grace=args.grace,
+        lag_threshold=args.lag_threshold,
+        pid=args.pid,
+    )
+
+    server = None
+    if args.spawn:
+        server = spawn_server(args.port, args.workers, args.batch_window_ms)
+        options.url = f"http://127.0.0.1:{args.port}"
+        options.pid = server.pid
+    try:
+        if server:
+            asyncio.run(wait_for_server(options.url))
+        report = asyncio.run(LoadTest(options).run())
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=10)
+
+    print("\n" + format_report(report))
+    output = args.output or RESULTS_DIR / f"load-{datetime.now():%Y%m%d-%H%M%S}.json"
+    save_results(report, output)
+    print(f"\nSaved report to {output}")
+    return 0
+
+
+async def _serve(port: int, workers: int, batch_window_ms: float) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        ctx = BenchContext(Path(tmp))
+        server = LoadServer(ctx, port, workers, batch_window_ms)
+        await server.start()
+        print(f"[LoadServer] Serving on http://127.0.0.1:{port} (pid {os.getpid()})")
+
+        # Stopped by `load --spawn` with SIGTERM; shut worker processes down too
+        stop = asyncio.Event()
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+        try:
+            await stop.wait()
+        finally:
+            await server.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
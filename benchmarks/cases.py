@@ -0,0 +1,310 @@
+"""
+Benchmarks of the hot paths. Each setup builds realistic input once and
+returns the operation that is timed.
+"""
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+from src.donations_feed import DonationsFeed, FeedQuery
+from src.history import HistoryStore, HistorySearch
+from src.media_player import MediaPlayer
+from src.monobank import MonobankClient
+from src.notification import Donation
+from src.web_host import WebHost
+from src.web_host.broadcast_hub import BroadcastHub, Envelope
+from src.youtube_player.queue_manager import QueueManager, QueueItem
+from src.youtube_player.url_parser import YouTubeURLParser
+
+from .runner import BenchContext, benchmark
+
+# Deterministic inputs, so runs are comparable
+SEED = 1234
+
+DONOR_NAMES = ["Олександр", "Марія Коваленко", "Andrii", "Kateryna S.", "Тарас", None]
+
+COMMENTS = [
+    "Слава Україні! Дякую за стрім",
+    "Увімкни будь ласка https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42s",
+    "на каву ☕",
+    "music please youtu.be/3JZ_D3ELwOQ?si=abcdef дуже прошу",
+    "https://music.youtube.com/watch?v=kJQP7kiw5Fk&list=RDAMVM",
+    "бебра бебра бебра",
+    "Привіт з Харкова! Тримайтесь там, все буде Україна, " * 4,
+    "https://youtube.com/shorts/abc123XYZ99 це не відео",
+    "",
+    "sus amogus www.youtube.com/watch?v=9bZkp7q19f0",
+]
+
+
+@benchmark("url_parser.extract_url")
+def bench_extract_url(ctx: BenchContext, _):
+    """One pass over a batch of typical donation comments."""
+    parser = YouTubeURLParser()
+
+    def op():
+        for comment in COMMENTS:
+            parser.extract_url(comment)
+    return op
+
+
+@benchmark("media_player.select_media", params=(10, 100, 1000))
+def bench_select_media(ctx: BenchContext, rule_count: int):
+    """Rule lookup by amount and comment triggers, half of the rules keyword-based."""
+    media_dir = ctx.workdir / "media"
+    (media_dir / "video").mkdir(parents=True)
+    (media_dir / "audio").mkdir()
+    for i in range(5):
+        (media_dir / "video" / f"{i}.gif").write_bytes(b"GIF89a")
+        (media_dir / "audio" / f"{i}.mp3").write_bytes(b"ID3")
+
+    rng = random.Random(SEED)
+    rules = []
+    for i in range(rule_count):
+        rule = {"images": [f"video/{i % 5}.gif"], "sounds": [f"audio/{i % 5}.mp3"]}
+        if i % 2:
+            rule["keywords"] = [f"trigger{i}", f"слово{i}"]
+            if i % 10 == 1:
+                rule["patterns"] = [rf"combo\s+{i}"]
+        else:
+            rule["min"] = i * 100
+            rule["max"] = i * 100 + 99
+        rules.append(rule)
+
+    config = ctx.make_config({"media": {"path": str(media_dir), "rules": rules, "rotation_file": ""}})
+    player = MediaPlayer(config, project_root=ctx.workdir)
+    donations = [
+        (rng.randrange(1, rule_count * 100), rng.choice(COMMENTS) + f" trigger{rng.randrange(rule_count)}")
+        for _ in range(20)
+    ]
+    player.select_media(*donations[0])  # Build keyword matcher outside of timing
+
+    def op():
+        for amount, comment in donations:
+            player.select_media(amount, comment)
+    return op
+
+
+def _queue_manager(ctx: BenchContext, size: int) -> QueueManager:
+    manager = QueueManager(str(ctx.workdir / "queue.json"))
+    for i in range(size):
+        manager._queue.append(QueueItem(
+            url=f"https://www.youtube.com/watch?v=video{i:06d}",
+            title=f"Track {i} — виконавець",
+            duration_sec=180 + i % 240,
+            downloaded=i % 3 == 0,
+            file_path=f"youtube_cache/video{i:06d}.mp3" if i % 3 == 0 else None,
+        ))
+    return manager
+
+
+@benchmark("queue_manager.save", params=(10, 1000, 10000))
+def bench_queue_save(ctx: BenchContext, size: int):
+    return _queue_manager(ctx, size).save
+
+
+@benchmark("queue_manager.load", params=(10, 1000, 10000))
+def bench_queue_load(ctx: BenchContext, size: int):
+    manager = _queue_manager(ctx, size)
+    manager.save()
+
+    def op():
+        manager.load(silent=True)
+    return op
+
+
+def _donations(count: int) -> list[Donation]:
+    rng = random.Random(SEED)
+    start = datetime(2024, 1, 1, 12, 0)
+    return [
+        Donation(
+            amount=rng.randrange(100, 100000),
+            comment=rng.choice(COMMENTS) or None,
+            timestamp=start + timedelta(minutes=i),
+            donor_name=rng.choice(DONOR_NAMES),
+        )
+        for i in range(count)
+    ]
+
+
+def _feed(ctx: BenchContext, count: int = 50) -> DonationsFeed:
+    feed = DonationsFeed(ctx.make_config(), max_donations=count)
+    for donation in _donations(count):
+        feed.add_donation(donation)
+    return feed
+
+
+@benchmark("donations_feed.init_message")
+def bench_feed_init(ctx: BenchContext, _):
+    """Full feed sent to every connecting client."""
+    feed = _feed(ctx)
+
+    def op():
+        BroadcastHub.encode(feed.init_message())
+    return op
+
+
+@benchmark("donations_feed.init_reconnect")
+def bench_feed_init_reconnect(ctx: BenchContext, _):
+    """Encoded init for one more client of a reconnect burst (feed unchanged)."""
+    feed = _feed(ctx)
+
+    def op():
+        feed.init_envelope().msgpack()
+    return op
+
+
+@benchmark("donations_feed.init_message_msgpack")
+def bench_feed_init_msgpack(ctx: BenchContext, _):
+    """Same full feed for a client that negotiated MessagePack frames."""
+    feed = _feed(ctx)
+
+    def op():
+        message = feed.init_message()
+        Envelope(BroadcastHub.encode(message), message=message).msgpack()
+    return op
+
+
+@benchmark("donations_feed.new_donation")
+def bench_feed_new_donation(ctx: BenchContext, _):
+    """Add and broadcast one donation (no clients connected)."""
+    feed = _feed(ctx)
+    donations = _donations(50)
+
+    async def op():
+        donation = donations[feed.get_version() % len(donations)]
+        feed.add_donation(donation)
+        await feed.broadcast_new_donation(donation)
+    return op
+
+
+@benchmark("donations_feed.api_page")
+def bench_feed_page(ctx: BenchContext, _):
+    """/api/donations page after the feed changed (cache miss)."""
+    feed = _feed(ctx)
+    query = FeedQuery(limit=20)
+
+    def op():
+        feed._changed()
+        feed.get_page(query)
+    return op
+
+
+@benchmark("history.search", params=("кав", "музик дуже", "Україні"))
+async def bench_history_search(ctx: BenchContext, text: str):
+    """First page of a search over 100k stored donations, from rare to common terms."""
+    store = HistoryStore(ctx.workdir / "history.db", jar_id="bench-jar")
+    await store.start()
+    ctx.add_cleanup(store.stop)
+
+    donations = _donations(100_000)
+    for i, donation in enumerate(donations):
+        donation.tx_id = f"tx{i:08d}"
+        if i % 1000 == 0:
+            donation.comment = "на каву"
+    await store.add_many(donations)
+    query = HistorySearch(text)
+
+    async def op():
+        await store.search(query)
+    return op
+
+
+class _InProcessClient:
+    """Connection stand-in for BroadcastHub: counts delivered frames."""
+
+    def __init__(self, delivered: "_Delivered"):
+        self.closed = False
+        self._delivered = delivered
+
+    async def send_frame(self, payload: bytes, opcode) -> None:
+        self._delivered.add()
+
+    async def close(self, code: int = 1000, message: bytes = b"") -> None:
+        self.closed = True
+
+
+class _Delivered:
+    def __init__(self):
+        self.count = 0
+        self.target = 0
+        self.done: asyncio.Future | None = None
+
+    def add(self) -> None:
+        self.count += 1
+        if self.count >= self.target and self.done and not self.done.done():
+            self.done.set_result(None)
+
+
+@benchmark("web_host.broadcast", params=(1, 100, 1000))
+async def bench_broadcast(ctx: BenchContext, client_count: int):
+    """Publish one show_media alert and wait until every client has been written to."""
+    web_host = WebHost(ctx.make_config({"server": {"ws_replay_size": 256}}))
+    hub = web_host._hub
+    delivered = _Delivered()
+    for _ in range(client_count):
+        hub.add_websocket(_InProcessClient(delivered))
+    ctx.add_cleanup(hub.close_all)
+
+    message = {
+        "type": "show_media",
+        "image": "/media/video/bebra.gif?v=0123456789abcdef",
+        "audio": "/media/audio/donat_gitara.mp3?v=0123456789abcdef",
+        "duration": 5000,
+        "donor_name": "Марія Коваленко",
+        "comment": COMMENTS[1],
+        "amount": 25000,
+    }
+    loop = asyncio.get_running_loop()
+
+    async def op():
+        delivered.target = delivered.count + client_count
+        delivered.done = loop.create_future()
+        await web_host._broadcast(message)
+        await delivered.done
+    return op
+
+
+class _RecordedMonobankClient(MonobankClient):
+    """Serves a canned statement response instead of calling the API."""
+
+    def __init__(self, config, statements: list[dict]):
+        super().__init__(config)
+        self._statements = statements
+
+    async def _request(self, endpoint: str) -> dict | list:
+        return self._statements
+
+
+@benchmark("monobank.get_jar_transactions", params=(500,))
+def bench_jar_transactions(ctx: BenchContext, count: int):
+    """Decode a statement page into JarTransactions (Monobank returns up to 500)."""
+    rng = random.Random(SEED)
+    now = int(datetime(2024, 1, 1).timestamp())
+    statements = []
+    for i in range(count):
+        donor = rng.choice(DONOR_NAMES)
+        statement = {
+            "id": f"tx{i:08d}",
+            "time": now - i * 37,
+            "description": f"Від: {donor}" if donor else "Поповнення «Банки»",
+            "mcc": 4829,
+            "originalMcc": 4829,
+            "amount": rng.randrange(-5000, 100000),
+            "operationAmount": 0,
+            "currencyCode": 980,
+            "commissionRate": 0,
+            "cashbackAmount": 0,
+            "balance": 1000000 + i,
+            "hold": False,
+        }
+        comment = rng.choice(COMMENTS)
+        if comment:
+            statement["comment"] = comment
+        statements.append(statement)
+
+    client = _RecordedMonobankClient(ctx.make_config({"monobank": {"jar_id": "bench-jar"}}), statements)
+
+    async def op():
+        await client.get_jar_transactions(from_time=datetime(2024, 1, 1))
+    return op
@@ -0,0 +1,501 @@
+"""
+WebSocket fan-out load test: many real overlay (/ws) and feed (/feed/ws)
+connections against a running server, while donations are fired at a fixed
+rate through POST /test-donation. Each donation carries a unique comment, so
+every client can time when it saw it.
+
+The report has delivery latency percentiles per endpoint (POST sent -> frame
+received), clients that were dropped by the server or lag behind, and memory
+and CPU of the server processes (Linux /proc, when the pid is known).
+"""
+import asyncio
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Callable
+
+import aiohttp
+from aiohttp import WSMsgType
+
+from .runner import PROJECT_ROOT, BenchContext
+
+# Frame that carries the donation comment, per endpoint
+ENDPOINTS = {
+    "overlay": ("/ws", "show_media"),
+    "feed": ("/feed/ws", "new_donation"),
+}
+
+
+@dataclass
+class LoadOptions:
+    url: str = "http://localhost:8080"
+    overlay_clients: int = 500
+    feed_clients: int = 500
+    rate: float = 2.0  # Donations per second
+    duration: float = 30.0  # Seconds of firing donations
+    grace: float = 5.0  # Seconds to wait for late deliveries
+    lag_threshold: float = 1.0  # Client is lagging when its p99 latency is above this (seconds)
+    connect_concurrency: int = 100  # Handshakes in flight at once
+    pid: int | None = None  # Server process to sample (with its children)
+    sample_interval: float = 0.5
+
+
+def percentiles(values: list[float]) -> dict:
+    """p50/p90/p99/max in milliseconds (nearest rank)."""
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        index = max(0, min(len(ordered) - 1, round(p * len(ordered) + 0.5) - 1))
+        return ordered[index] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": rank(0.50),
+        "p90_ms": rank(0.90),
+        "p99_ms": rank(0.99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+class ProcessSampler:
+    """Samples RSS and CPU of a process and its children from /proc."""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        self._pid = pid
+        self._interval = interval
+        self._ticks = os.sysconf("SC_CLK_TCK")
+        self._page_size = os.sysconf("SC_PAGE_SIZE")
+        self._rss: list[int] = []
+        self._cpu: list[float] = []
+        self._task: asyncio.Task | None = None
+
+    @staticmethod
+    def is_supported() -> bool:
+        return Path("/proc/self/stat").exists()
+
+    def _tree(self) -> list[int]:
+        children: dict[int, list[int]] = {}
+        for entry in Path("/proc").iterdir():
+            if not entry.name.isdigit():
+                continue
+            try:
+                ppid = int(self._read_stat(int(entry.name))[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(ppid, []).append(int(entry.name))
+
+        pids, pending = [], [self._pid]
+        while pending:
+            pid = pending.pop()
+            pids.append(pid)
+            pending.extend(children.get(pid, []))
+        return pids
+
+    @staticmethod
+    def _read_stat(pid: int) -> list[str]:
+        """Fields of /proc/<pid>/stat after the command name, starting with state."""
+        raw = Path(f"/proc/{pid}/stat").read_text()
+        return raw[raw.rindex(")") + 2:].split()
+
+    def _usage(self) -> tuple[int, float]:
+        """RSS bytes and CPU seconds of the process tree."""
+        rss, cpu = 0, 0.0
+        for pid in self._tree():
+            try:
+                fields = self._read_stat(pid)
+            except OSError:
+                continue
+            cpu += (int(fields[11]) + int(fields[12])) / self._ticks  # utime + stime
+            rss += int(fields[21]) * self._page_size
+        return rss, cpu
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        last_rss, last_cpu = self._usage()
+        last_time = time.monotonic()
+        self._rss.append(last_rss)
+        while True:
+            await asyncio.sleep(self._interval)
+            rss, cpu = self._usage()
+            now = time.monotonic()
+            self._rss.append(rss)
+            self._cpu.append((cpu - last_cpu) / (now - last_time) * 100)
+            last_cpu, last_time = cpu, now
+
+    def get_report(self) -> dict:
+        if not self._rss:
+            return {}
+        mb = 1024 * 1024
+        return {
+            "pid": self._pid,
+            "rss_start_mb": self._rss[0] / mb,
+            "rss_peak_mb": max(self._rss) / mb,
+            "rss_end_mb": self._rss[-1] / mb,
+            "cpu_mean_percent": statistics.fmean(self._cpu) if self._cpu else 0.0,
+            "cpu_peak_percent": max(self._cpu, default=0.0),
+        }
+
+
+class LoadClient:
+    """One WebSocket connection that records when each tagged donation arrived."""
+
+    def __init__(self, kind: str, index: int, marker: str):
+        self.kind = kind
+        self.index = index
+        self.received: dict[int, float] = {}
+        self.frames = 0
+        self.connected = False
+        self.connect_error: str | None = None
+        self.close_code: int | None = None
+        self.closed_at: float | None = None
+        self._marker = marker
+        self._frame_type = ENDPOINTS[kind][1]
+        self._ws: aiohttp.ClientWebSocketResponse | None = None
+        self._task: asyncio.Task | None = None
+
+    async def connect(self, session: aiohttp.ClientSession, base_url: str) -> None:
+        try:
+            ws = await session.ws_connect(base_url + ENDPOINTS[self.kind][0], autoping=True)
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            self.connect_error = type(e).__name__
+            return
+        self.connected = True
+        self._ws = ws
+        self._task = asyncio.create_task(self._run(ws))
+
+    async def _run(self, ws: aiohttp.ClientWebSocketResponse) -> None:
+        ping_task = None
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                received = time.perf_counter()
+                message = json.loads(msg.data)
+                self.frames += 1
+                messages = message["messages"] if message.get("type") == "batch" else [message]
+                for message in messages:
+                    msg_type = message.get("type")
+                    if msg_type == self._frame_type:
+                        number = self._donation_number(message)
+                        if number is not None:
+                            self.received.setdefault(number, received)
+                    elif msg_type == "hello" and ping_task is None:
+                        # Server drops clients that send no heartbeat
+                        ping_task = asyncio.create_task(self._ping(ws, message.get("heartbeat_ms", 15000) / 1000))
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            pass
+        finally:
+            if ping_task:
+                ping_task.cancel()
+            self.close_code = ws.close_code
+            self.closed_at = time.perf_counter()
+
+    @staticmethod
+    async def _ping(ws: aiohttp.ClientWebSocketResponse, interval: float) -> None:
+        while not ws.closed:
+            await asyncio.sleep(interval)
+            try:
+                await ws.send_str(json.dumps({"type": "ping", "t": int(time.time() * 1000)}))
+            except (aiohttp.ClientError, ConnectionError):
+                return
+
+    def _donation_number(self, message: dict) -> int | None:
+        donation = message.get("donation") if self.kind == "feed" else message
+        comment = (donation or {}).get("comment") or ""
+        if not comment.startswith(self._marker):
+            return None
+        try:
+            return int(comment[len(self._marker):])
+        except ValueError:
+            return None
+
+    async def close(self) -> None:
+        if self._ws:
+            await self._ws.close()
+        if self._task:
+            await self._task
+
+
+class LoadTest:
+    def __init__(self, options: LoadOptions, progress: Callable[[str], None] | None = print):
+        self._options = options
+        self._progress = progress or (lambda _: None)
+        self._marker = f"load-{uuid.uuid4().hex[:8]}-"
+        self._sent: dict[int, float] = {}
+        self._post_errors = 0
+        self._clients: list[LoadClient] = []
+
+    async def run(self) -> dict:
+        options = self._options
+        base_url = options.url.rstrip("/")
+        ws_url = "ws" + base_url[len("http"):] if base_url.startswith("http") else base_url
+        _raise_fd_limit(options.overlay_clients + options.feed_clients + 100)
+
+        sampler = None
+        if options.pid and ProcessSampler.is_supported():
+            sampler = ProcessSampler(options.pid, options.sample_interval)
+            sampler.start()
+
+        connector = aiohttp.TCPConnector(limit=0, force_close=True)
+        timeout = aiohttp.ClientTimeout(total=None, connect=30)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            try:
+                connect_time = await self._connect_all(session, ws_url)
+                server_clients = await self._get_json(session, base_url + "/api/connections")
+
+                started = time.perf_counter()
+                await self._fire(session, base_url)
+                fired_for = time.perf_counter() - started
+                await asyncio.sleep(options.grace)
+                test_end = time.perf_counter()
+            finally:
+                await asyncio.gather(*(client.close() for client in self._clients))
+                if sampler:
+                    await sampler.stop()
+
+        return self._report(connect_time, fired_for, test_end, server_clients, sampler)
+
+    async def _connect_all(self, session: aiohttp.ClientSession, ws_url: str) -> float:
+        options = self._options
+        self._clients = [LoadClient("overlay", i, self._marker) for i in range(options.overlay_clients)]
+        self._clients += [LoadClient("feed", i, self._marker) for i in range(options.feed_clients)]
+
+        self._progress(f"Connecting {options.overlay_clients} overlay and {options.feed_clients} feed clients...")
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(options.connect_concurrency)
+
+        async def connect(client: LoadClient) -> None:
+            async with semaphore:
+                await client.connect(session, ws_url)
+
+        await asyncio.gather(*(connect(client) for client in self._clients))
+        elapsed = time.perf_counter() - started
+        connected = sum(client.connected for client in self._clients)
+        self._progress(f"Connected {connected}/{len(self._clients)} in {elapsed:.1f}s")
+        return elapsed
+
+    async def _fire(self, session: aiohttp.ClientSession, base_url: str) -> None:
+        """POST donations on a fixed schedule; a slow response doesn't delay the next one."""
+        options = self._options
+        count = max(1, round(options.rate * options.duration))
+        self._progress(f"Firing {count} donations at {options.rate:g}/s...")
+
+        async def post(number: int) -> None:
+            body = {"amount": 100 + number, "donor_name": "Load Test", "comment": f"{self._marker}{number}"}
+            self._sent[number] = time.perf_counter()
+            try:
+                async with session.post(base_url + "/test-donation", json=body) as resp:
+                    if resp.status != 200:
+                        self._post_errors += 1
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                self._post_errors += 1
+
+        started = time.perf_counter()
+        tasks = []
+        for number in range(count):
+            delay = started + number / options.rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(post(number)))
+        await asyncio.gather(*tasks)
+
+    @staticmethod
+    async def _get_json(session: aiohttp.ClientSession, url: str) -> dict | None:
+        try:
+            async with session.get(url) as resp:
+                return await resp.json() if resp.status == 200 else None
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            return None
+
+    def _report(self, connect_time: float, fired_for: float, test_end: float,
+                server_clients: dict | None, sampler: ProcessSampler | None) -> dict:
+        options = self._options
+        endpoints = {}
+        for kind in ENDPOINTS:
+            clients = [client for client in self._clients if client.kind == kind]
+            latencies, dropped, lagging, missed = [], 0, 0, 0
+            close_codes: dict[str, int] = {}
+            for client in clients:
+                if not client.connected:
+                    continue
+                client_latencies = [
+                    client.received[number] - sent
+                    for number, sent in self._sent.items() if number in client.received
+                ]
+                latencies.extend(client_latencies)
+
+                closed_early = client.closed_at is not None and client.closed_at < test_end
+                if closed_early:
+                    dropped += 1
+                    close_codes[str(client.close_code)] = close_codes.get(str(client.close_code), 0) + 1
+                    continue
+
+                client_missed = sum(
+                    1 for number in self._sent if number not in client.received
+                )
+                missed += client_missed
+                slow = percentiles(client_latencies).get("p99_ms", 0) > options.lag_threshold * 1000
+                if client_missed or slow:
+                    lagging += 1
+
+            endpoints[kind] = {
+                "clients": len(clients),
+                "connected": sum(client.connected for client in clients),
+                "connect_errors": sum(client.connect_error is not None for client in clients),
+                "dropped": dropped,
+                "close_codes": close_codes,
+                "lagging": lagging,
+                "missed_deliveries": missed,
+                "frames": sum(client.frames for client in clients),
+                "latency": percentiles(latencies),
+            }
+
+        harness = resource.getrusage(resource.RUSAGE_SELF)
+        return {
+            "meta": {
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "options": asdict(options),
+            },
+            "connect_seconds": connect_time,
+            "donations": {
+                "sent": len(self._sent),
+                "post_errors": self._post_errors,
+                "seconds": fired_for,
+            },
+            "server_connections": server_clients,
+            "endpoints": endpoints,
+            "server": sampler.get_report() if sampler else None,
+            # Latency includes this process reading every frame; if it is near 100% CPU, it is the bottleneck
+            "harness_cpu_seconds": harness.ru_utime + harness.ru_stime,
+        }
+
+
+def _raise_fd_limit(needed: int) -> None:
+    """Each connection is a file descriptor; default soft limits are often 1024."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != resource.RLIM_INFINITY and soft < needed:
+        target = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+
+
+def format_report(report: dict) -> str:
+    donations = report["donations"]
+    lines = [
+        f"Donations sent: {donations['sent']} in {donations['seconds']:.1f}s ({donations['post_errors']} POST errors)",
+        f"Connect time: {report['connect_seconds']:.1f}s",
+        "",
+        f"{'endpoint':<10} {'clients':>8} {'dropped':>8} {'lagging':>8} {'missed':>8} {'frames':>9} "
+        f"{'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}",
+    ]
+    for kind, data in report["endpoints"].items():
+        latency = data["latency"]
+
+        def ms(key: str) -> str:
+            return f"{latency[key]:.1f}ms" if key in latency else "-"
+
+        lines.append(
+            f"{kind:<10} {data['connected']:>8} {data['dropped']:>8} {data['lagging']:>8} "
+            f"{data['missed_deliveries']:>8} {data['frames']:>9} {ms('p50_ms'):>9} {ms('p90_ms'):>9} {ms('p99_ms'):>9} {ms('max_ms'):>9}"
+        )
+        if data["close_codes"]:
+            lines.append(f"{'':<10} close codes: {data['close_codes']}")
+
+    server = report.get("server")
+    if server:
+        lines += [
+            "",
+            f"Server RSS: {server['rss_start_mb']:.1f} -> peak {server['rss_peak_mb']:.1f} MB, "
+            f"CPU mean {server['cpu_mean_percent']:.0f}% / peak {server['cpu_peak_percent']:.0f}%",
+        ]
+    lines.append(f"Harness CPU: {report['harness_cpu_seconds']:.1f}s")
+    return "\n".join(lines)
+
+
+class LoadServer:
+    """
+    Headless server for load tests: WebHost with feed and notifications,
+    no Monobank polling and no YouTube player.
+    """
+
+    def __init__(self, ctx: BenchContext, port: int, workers: int = 0, batch_window_ms: float = 0.0):
+        self._config = ctx.make_config({
+            "server": {"host": "127.0.0.1", "port": port, "workers": workers, "ws_batch_window_ms": batch_window_ms},
+            "media": {"path": str(PROJECT_ROOT / "media"), "transcode": False, "rotation_file": ""},
+            "tracing": {"file": ""},
+        })
+        self._web_host = None
+        self._notification_service = None
+
+    async def start(self) -> None:
+        from src.donations_feed import DonationsFeed
+        from src.media_player import MediaPlayer
+        from src.notification import NotificationService
+        from src.web_host import WebHost
+
+        web_host = WebHost(self._config, project_root=PROJECT_ROOT)
+        media_player = MediaPlayer(self._config, project_root=PROJECT_ROOT)
+        donations_feed = DonationsFeed(self._config, max_donations=50)
+        notification_service = NotificationService(web_host, media_player, self._config)
+
+        web_host.set_notification_service(notification_service)
+        web_host.set_donations_feed(donations_feed)
+        notification_service.set_donations_feed(donations_feed)
+
+        await web_host.start_async()
+        await notification_service.start()
+        self._web_host = web_host
+        self._notification_service = notification_service
+
+    async def stop(self) -> None:
+        if self._notification_service:
+            await self._notification_service.stop()
+        if self._web_host:
+            await self._web_host.stop_async()
+
+
+def spawn_server(port: int, workers: int = 0, batch_window_ms: float = 0.0) -> subprocess.Popen:
+    """Run `python -m benchmarks serve` in its own process, so its CPU and memory are measured alone."""
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "benchmarks", "serve",
+            "--port", str(port), "--workers", str(workers), "--batch-window-ms", str(batch_window_ms),
+        ],
+        cwd=PROJECT_ROOT,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+async def wait_for_server(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while True:
+            try:
+                async with session.get(url.rstrip("/") + "/api/connections") as resp:
+                    if resp.status == 200:
+                        return
+            except (aiohttp.ClientError, OSError):
+                pass
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Server at {url} did not start in {timeout:.0f}s")
+            await asyncio.sleep(0.2)
@@ -0,0 +1,270 @@
+import asyncio
+import contextlib
+import fnmatch
+import inspect
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable
+
+import yaml
+
+if TYPE_CHECKING:
+    from src.config import Config
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# Setup gets a BenchContext and returns the operation to time (sync or async, no arguments)
+Setup = Callable[["BenchContext", Any], Any]
+
+
+@dataclass
+class Benchmark:
+    name: str
+    setup: Setup
+    param: Any = None
+
+
+_REGISTRY: list[Benchmark] = []
+
+
+def benchmark(name: str, params: tuple = (None,)) -> Callable[[Setup], Setup]:
+    """Register setup function; one benchmark per param, named "name[param]"."""
+    def register(setup: Setup) -> Setup:
+        for param in params:
+            full_name = name if param is None else f"{name}[{param}]"
+            _REGISTRY.append(Benchmark(full_name, setup, param))
+        return setup
+    return register
+
+
+def get_benchmarks(pattern: str | None = None) -> list[Benchmark]:
+    """Benchmark named pattern, else those matching it as glob (substring if no wildcard)."""
+    from . import cases  # noqa: F401 - registers benchmarks
+
+    if not pattern:
+        return list(_REGISTRY)
+    exact = [b for b in _REGISTRY if b.name == pattern]
+    if exact:
+        return exact
+    if not any(ch in pattern for ch in "*?["):
+        pattern = f"*{pattern}*"
+    return [b for b in _REGISTRY if fnmatch.fnmatch(b.name, pattern)]
+
+
+class BenchContext:
+    """Scratch directory, configs and cleanups for one benchmark."""
+
+    def __init__(self, workdir: Path):
+        self.workdir = workdir
+        self._cleanups: list[Callable[[], Any]] = []
+
+    def make_config(self, overrides: dict | None = None) -> "Config":
+        """Config from config.example.yaml with sections updated from overrides."""
+        from src.config import Config
+
+        with open(PROJECT_ROOT / "config.example.yaml", "r", encoding="utf-8") as f:
+            raw = yaml.safe_load(f)
+        for section, values in (overrides or {}).items():
+            raw.setdefault(section, {}).update(values)
+
+        path = self.workdir / "config.yaml"
+        with open(path, "w", encoding="utf-8") as f:
+            yaml.safe_dump(raw, f, allow_unicode=True)
+        return Config(str(path))
+
+    def add_cleanup(self, cleanup: Callable[[], Any]) -> None:
+        """Run after the benchmark (sync or async)."""
+        self._cleanups.append(cleanup)
+
+    async def cleanup(self) -> None:
+        for cleanup in reversed(self._cleanups):
+            result = cleanup()
+            if inspect.isawaitable(result):
+                await result
+
+
+@dataclass
+class Result:
+    name: str
+    number: int  # Operations per sample
+    samples_us: list[float] = field(default_factory=list)  # Per-operation time of every sample
+
+    def to_dict(self) -> dict:
+        return {
+            "number": self.number,
+            "repeat": len(self.samples_us),
+            "min_us": min(self.samples_us),
+            "median_us": statistics.median(self.samples_us),
+            "mean_us": statistics.fmean(self.samples_us),
+            "stdev_us": statistics.stdev(self.samples_us) if len(self.samples_us) > 1 else 0.0,
+            "samples_us": self.samples_us,
+        }
+
+
+async def _time(op: Callable[[], Any], number: int) -> float:
+    """Seconds for number runs of op."""
+    if inspect.iscoroutinefunction(op):
+        started = time.perf_counter()
+        for _ in range(number):
+            await op()
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(number):
+        op()
+    return time.perf_counter() - started
+
+
+async def _measure(bench: Benchmark, workdir: Path, repeat: int, min_time: float) -> Result:
+    ctx = BenchContext(workdir)
+    try:
+        op = bench.setup(ctx, bench.param)
+        if inspect.isawaitable(op):
+            op = await op
+
+        # Warm up and find how many runs make one sample last at least min_time
+        number = 1
+        while True:
+            elapsed = await _time(op, number)
+            if elapsed >= min_time or number >= 1_000_000:
+                break
+            number *= 10 if elapsed < min_time / 10 else 2
+
+        result = Result(bench.name, number)
+        for _ in range(repeat):
+            result.samples_us.append(await _time(op, number) / number * 1e6)
+        return result
+    finally:
+        await ctx.cleanup()
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=5,
+        )
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmarks(
+    benchmarks: list[Benchmark],
+    repeat: int = 5,
+    min_time: float = 0.1,
+    progress: Callable[[str], None] | None = print,
+) -> dict:
+    """
+    Run benchmarks, each in a fresh event loop and scratch directory.
+    The app's own [Component] logging is discarded while measuring, so
+    terminal speed doesn't skew results.
+    """
+    results = {}
+    for bench in benchmarks:
+        with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w", encoding="utf-8") as devnull:
+            with contextlib.redirect_stdout(devnull):
+                result = asyncio.run(_measure(bench, Path(tmp), repeat, min_time))
+        results[bench.name] = result.to_dict()
+        if progress:
+            data = results[bench.name]
+            progress(f"{bench.name:<48} {_format_us(data['median_us']):>10}  (±{_format_us(data['stdev_us'])}, {data['number']}x{data['repeat']})")
+
+    return {
+        "meta": {
+            "created": datetime.now().astimezone().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": repeat,
+            "min_time": min_time,
+        },
+        "results": results,
+    }
+
+
+def _format_us(value: float) -> str:
+    if value >= 1e6:
+        return f"{value / 1e6:.2f} s"
+    if value >= 1e3:
+        return f"{value / 1e3:.2f} ms"
+    return f"{value:.2f} us"
+
+
+def save_results(data: dict, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+
+def load_results(path: Path) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_results(base: dict, new: dict, threshold: float = 0.10) -> list[dict]:
+    """
+    Compare median time per benchmark present in both runs.
+    Status is "regression" when new is slower by more than threshold
+    (0.10 = 10%) and the gap is larger than the noise of both runs,
+    "improvement" for the mirror case, "same" otherwise.
+    """
+    rows = []
+    base_results = base.get("results", {})
+    new_results = new.get("results", {})
+    for name in sorted(set(base_results) | set(new_results)):
+        old, cur = base_results.get(name), new_results.get(name)
+        if old is None or cur is None:
+            rows.append({"name": name, "status": "added" if old is None else "removed"})
+            continue
+
+        ratio = cur["median_us"] / old["median_us"] if old["median_us"] else float("inf")
+        noise = old["stdev_us"] + cur["stdev_us"]
+        gap = abs(cur["median_us"] - old["median_us"])
+
+        status = "same"
+        if gap > noise:
+            if ratio > 1 + threshold:
+                status = "regression"
+            elif ratio < 1 - threshold:
+                status = "improvement"
+
+        rows.append({
+            "name": name,
+            "status": status,
+            "base_us": old["median_us"],
+            "new_us": cur["median_us"],
+            "ratio": ratio,
+        })
+    return rows
+
+
+def format_comparison(rows: list[dict]) -> str:
+    lines = [f"{'benchmark':<48} {'base':>10} {'new':>10} {'change':>8}  status"]
+    for row in rows:
+        if "ratio" not in row:
+            lines.append(f"{row['name']:<48} {'':>10} {'':>10} {'':>8}  {row['status']}")
+            continue
+        change = f"{(row['ratio'] - 1) * 100:+.1f}%"
+        marker = {"regression": "REGRESSION", "improvement": "improved"}.get(row["status"], "")
+        lines.append(
+            f"{row['name']:<48} {_format_us(row['base_us']):>10} {_format_us(row['new_us']):>10} {change:>8}  {marker}"
+        )
+    return "\n".join(lines)
+
+
+def ensure_import_path() -> None:
+    """Make `src` importable when run as python -m benchmarks from anywhere."""
+    root = str(PROJECT_ROOT)
+    if root not in sys.path:
+        sys.path.insert(0, root)
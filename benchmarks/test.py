@@ -0,0 +1,116 @@
+import asyncio
+import json
+import os
+import socket
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks import get_benchmarks, run_benchmarks, compare_results, save_results, load_results
+from benchmarks import BenchContext, LoadOptions, LoadServer, LoadTest
+from benchmarks.__main__ import main
+
+
+def _result(median: float, stdev: float = 1.0) -> dict:
+    return {"median_us": median, "stdev_us": stdev, "min_us": median, "mean_us": median, "number": 1, "repeat": 3}
+
+
+def test_compare_results():
+    """Test that slowdowns beyond threshold and noise are flagged."""
+    base = {"results": {"a": _result(100), "b": _result(100), "c": _result(100, stdev=20), "gone": _result(5)}}
+    new = {"results": {"a": _result(130), "b": _result(70), "c": _result(130, stdev=20), "added": _result(5)}}
+
+    status = {row["name"]: row["status"] for row in compare_results(base, new, threshold=0.10)}
+    assert status == {
+        "a": "regression",
+        "b": "improvement",
+        "c": "same",  # 30% slower, but within noise of both runs
+        "gone": "removed",
+        "added": "added",
+    }
+
+    print("[PASS] test_compare_results")
+
+
+def test_run_and_compare_cli():
+    """Test a quick run, the JSON result file and compare exit codes."""
+    benchmarks = get_benchmarks("url_parser")
+    assert [b.name for b in benchmarks] == ["url_parser.extract_url"]
+    assert len(get_benchmarks("web_host.broadcast*")) == 3
+
+    data = run_benchmarks(benchmarks + get_benchmarks("web_host.broadcast[1]"), repeat=2, min_time=0.001, progress=None)
+    assert set(data["results"]) == {"url_parser.extract_url", "web_host.broadcast[1]"}
+    assert data["results"]["url_parser.extract_url"]["median_us"] > 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base_path = Path(tmp) / "base.json"
+        slow_path = Path(tmp) / "slow.json"
+        save_results(data, base_path)
+        assert load_results(base_path) == json.loads(base_path.read_text(encoding="utf-8"))
+
+        slow = json.loads(json.dumps(data))
+        for result in slow["results"].values():
+            result["median_us"] *= 10
+        save_results(slow, slow_path)
+
+        assert main(["compare", str(base_path), str(base_path)]) == 0
+        assert main(["compare", str(base_path), str(slow_path)]) == 1
+
+    print("[PASS] test_run_and_compare_cli")
+
+
+def test_load_harness():
+    """Test a small load run against an in-process server: every client sees every donation."""
+    async def run(workdir: Path):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+
+        server = LoadServer(BenchContext(workdir), port)
+        await server.start()
+        try:
+            options = LoadOptions(
+                url=f"http://127.0.0.1:{port}",
+                overlay_clients=5,
+                feed_clients=5,
+                rate=20,
+                duration=0.25,
+                grace=0.5,
+                pid=os.getpid(),
+                sample_interval=0.1,
+            )
+            return await LoadTest(options, progress=None).run()
+        finally:
+            await server.stop()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report = asyncio.run(run(Path(tmp)))
+
+    assert report["donations"]["sent"] == 5
+    assert report["donations"]["post_errors"] == 0
+    assert report["server_connections"] == {"overlay": 5, "feed": 5}
+    for kind in ("overlay", "feed"):
+        endpoint = report["endpoints"][kind]
+        assert endpoint["connected"] == 5
+        assert endpoint["dropped"] == 0
+        assert endpoint["missed_deliveries"] == 0
+        assert endpoint["latency"]["count"] == 25
+        assert 0 < endpoint["latency"]["p50_ms"] <= endpoint["latency"]["p99_ms"]
+    assert report["server"]["rss_peak_mb"] > 0
+
+    print("[PASS] test_load_harness")
+
+
+if __name__ == "__main__":
+    print("Benchmark Suite Tests")
+    print("=" * 50 + "\n")
+
+    test_compare_results()
+    test_run_and_compare_cli()
+    test_load_harness()
+
+    print("\nAll Benchmark Suite tests passed!")
@@ -20,13 +20,17 @@ except ImportError:
 
 from src.config import Config
 from src.web_host import WebHost
-from src.media_player import MediaPlayer
+from src.media_player import MediaPlayer, MediaTranscoder
 from src.notification import NotificationService
 from src.monobank import MonobankClient
 from src.poller import DonationPoller
 from src.donations_feed import DonationsFeed
+from src.history import HistoryStore
+from src.leaderboard import Leaderboard
+from src.goal import GoalProgress
 from src.youtube_player import YouTubePlayer
 from src.youtube_player.queue_manager import QueueManager
+from src.tracing import TRACER
 
 if HAS_PYQT5:
     from src.youtube_player.gui import PlayerWindow
@@ -194,6 +198,17 @@ def start_input_listener(notification_service: "NotificationService") -> None:
     thread.start()
 
 
+def configure_tracing(config: Config) -> None:
+    """Set up donation lifecycle tracing from the tracing section of config."""
+    TRACER.enabled = config.is_tracing_enabled()
+    trace_file = config.get_trace_file()
+    if TRACER.enabled and trace_file:
+        path = Path(trace_file)
+        if not path.is_absolute():
+            path = PROJECT_ROOT / path
+        TRACER.configure(path, config.get_trace_max_bytes(), config.get_trace_backups())
+
+
 async def main(queue_manager: Optional[QueueManager] = None):
     """Main async application."""
     # Initialize config
@@ -221,15 +236,19 @@ async def main(queue_manager: Optional[QueueManager] = None):
         # Reload config after saving
         config.reload()
 
+    configure_tracing(config)
+
     # Initialize core components
     web_host = WebHost(config, project_root=PROJECT_ROOT)
     media_player = MediaPlayer(config, project_root=PROJECT_ROOT)
+    media_transcoder = MediaTranscoder(config, media_player, project_root=PROJECT_ROOT)
     donations_feed = DonationsFeed(config, max_donations=50)
     notification_service = NotificationService(web_host, media_player, config)
 
     # Connect components to each other
     web_host.set_notification_service(notification_service)
     web_host.set_donations_feed(donations_feed)
+    web_host.set_media_transcoder(media_transcoder)
     notification_service.set_donations_feed(donations_feed)
 
     # Initialize monobank components
@@ -256,14 +275,41 @@ async def main(queue_manager: Optional[QueueManager] = None):
             return
 
         if donation.comment:
-            await youtube_player.add_from_comment(donation.comment)
+            await youtube_player.add_from_comment(donation.comment, trace_id=donation.trace_id)
 
     poller.on_new_donation(on_donation)
 
+    # Every polled donation goes to the history database (written in batches)
+    history_store = HistoryStore.from_config(config, PROJECT_ROOT) if config.is_history_enabled() else None
+    if history_store:
+        poller.on_new_donation(history_store.add)
+        web_host.set_history_store(history_store)
+
+    # Totals and top donors, updated as donations are shown
+    leaderboard = Leaderboard.from_config(config, PROJECT_ROOT) if config.is_leaderboard_enabled() else None
+    if leaderboard:
+        leaderboard.set_web_host(web_host)
+        notification_service.set_leaderboard(leaderboard)
+
+    # Jar balance and goal progress, read from the statements the poller fetches
+    goal_progress = GoalProgress.from_config(config, monobank_client) if config.is_goal_enabled() else None
+    if goal_progress:
+        goal_progress.set_web_host(web_host)
+        poller.on_transactions(goal_progress.update_from_transactions)
+
     # Start services
+    if history_store:
+        await history_store.start()
     await web_host.start_async()
+    if leaderboard:
+        await leaderboard.start()
+    await media_player.start()
+    await media_transcoder.start()
     await notification_service.start()
     await poller.start()
+    if goal_progress:
+        # After the poller's first fetch: its balance saves a client-info request
+        await goal_progress.start()
     await youtube_player.start()
 
     print(f"[Main] Polling for donations every {config.get_poll_interval()} seconds")
@@ -287,9 +333,18 @@ async def main(queue_manager: Optional[QueueManager] = None):
     # Stop services
     await poller.stop()
     await notification_service.stop()
+    await media_transcoder.stop()
+    await media_player.stop()
     await web_host.stop_async()
     await youtube_player.stop()
     youtube_player.cleanup()
+    if goal_progress:
+        await goal_progress.stop()
+    if leaderboard:
+        await leaderboard.stop()
+    if history_store:
+        await history_store.stop()
+    TRACER.close()
 
 
 def run_async_app(queue_manager: Optional[QueueManager] = None):
@@ -10,6 +10,15 @@ class MediaRule:
     max_amount: int | None
     images: list[str] = field(default_factory=list)
     sounds: list[str] = field(default_factory=list)
+    keywords: list[str] = field(default_factory=list)  # Comment words that trigger this rule
+    patterns: list[str] = field(default_factory=list)  # Regex patterns matched against comment
+    image_weights: list[int] = field(default_factory=list)  # Empty = equal weights
+    sound_weights: list[int] = field(default_factory=list)
+    no_repeat: int = 1  # Don't repeat a file within last N picks of this rule
+
+    @property
+    def is_keyword_rule(self) -> bool:
+        return bool(self.keywords or self.patterns)
 
 
 @dataclass
@@ -18,6 +27,16 @@ class ServerConfig:
     host: str = "localhost"
     show_test_button: bool = True
     player_volume: float = 0.7  # 0.0 to 1.0
+    ws_send_queue: int = 256  # Messages queued per WebSocket client before it is disconnected
+    ws_send_timeout: float = 10.0  # Seconds a queued message may wait before client is disconnected
+    ws_heartbeat: float = 10.0  # Server ping interval in seconds, pong must arrive within half of it (0 = off)
+    ws_idle_timeout: float = 45.0  # Close connection if client sent nothing for this long (0 = off)
+    ws_replay_size: int = 256  # Recent broadcasts kept for reconnecting clients (0 = off)
+    sse_keepalive: float = 15.0  # Seconds between keep-alive comments on idle SSE streams (at least 1)
+    ws_batch_window_ms: float = 0.0  # Pack broadcasts published within this window into one frame (0 = off)
+    topic_tiers: dict[str, float] = field(default_factory=dict)  # Tier name -> minimum UAH, for "tier:<name>" topics
+    workers: int = 0  # Web worker processes sharing the port (0 = serve from main process)
+    fanout_socket: str = ""  # Unix socket between main process and workers ("" = temp dir)
 
 
 @dataclass
@@ -32,6 +51,12 @@ class MediaConfig:
     path: str = "./media"
     default_duration: int = 5000
     rules: list[MediaRule] = field(default_factory=list)
+    trigger_priority: str = "keyword"  # "keyword" or "amount" - which rules win when both match
+    rotation_file: str = "media_rotation.json"  # Shuffle bag state, empty = don't persist
+    preload_ahead: int = 3  # Queued donations whose media is sent to overlay for preloading
+    transcode: bool = True  # Convert GIFs to WebM/MP4 when ffmpeg is available
+    transcode_cache: str = "media_cache"
+    ffmpeg_path: str = ""  # Empty = search PATH
 
 
 @dataclass
@@ -39,6 +64,39 @@ class YouTubeConfig:
     min_donation_for_music: int = 0  # Minimum donation amount for music ordering (0 = any amount)
 
 
+@dataclass
+class TracingConfig:
+    enabled: bool = True
+    file: str = "logs/traces.jsonl"  # Finished traces as JSON lines, empty = memory only
+    max_bytes: int = 5 * 1024 * 1024  # Rotate trace file at this size
+    backups: int = 3  # Rotated trace files to keep
+    ack_timeout: float = 10.0  # Seconds a trace waits for an overlay to acknowledge the alert
+
+
+@dataclass
+class HistoryConfig:
+    enabled: bool = True
+    file: str = "data/history.db"  # SQLite database with every donation
+    batch_size: int = 100  # Write as soon as this many donations are pending
+    flush_interval: float = 1.0  # Otherwise write pending donations every N seconds
+
+
+@dataclass
+class LeaderboardConfig:
+    enabled: bool = True
+    windows: list[str] = field(default_factory=lambda: ["today", "stream", "all"])  # Also rolling: "30m", "24h", "7d"
+    top_size: int = 10  # Donors listed per window
+    checkpoint_file: str = "data/leaderboard.json"  # Saved standings, empty = start over on restart
+    checkpoint_interval: float = 30.0  # Seconds between checkpoints (only when something changed)
+
+
+@dataclass
+class GoalConfig:
+    enabled: bool = True
+    target: float = 0.0  # Goal in UAH, 0 = the jar's goal set in Monobank
+    refresh_interval: float = 600.0  # Ask client-info after this long without a statement balance
+
+
 class Config:
     def __init__(self, config_path: str = "config.yaml"):
         self._config_path = Path(config_path)
@@ -47,6 +105,10 @@ class Config:
         self._monobank = MonobankConfig()
         self._media = MediaConfig()
         self._youtube = YouTubeConfig()
+        self._tracing = TracingConfig()
+        self._history = HistoryConfig()
+        self._leaderboard = LeaderboardConfig()
+        self._goal = GoalConfig()
 
         self.reload()
 
@@ -61,14 +123,38 @@ class Config:
         self._parse_monobank()
         self._parse_media()
         self._parse_youtube()
+        self._parse_tracing()
+        self._parse_history()
+        self._parse_leaderboard()
+        self._parse_goal()
 
     def _parse_server(self) -> None:
         server = self._raw.get("server", {})
+
+        # Keep-alives are how an idle dead SSE peer gets noticed: they can't be turned off
+        sse_keepalive = server.get("sse_keepalive", 15.0)
+        if not sse_keepalive or sse_keepalive <= 0:
+            print(f"[Config] sse_keepalive must be positive, got {sse_keepalive}; using 15 seconds")
+            sse_keepalive = 15.0
+        elif sse_keepalive < 1.0:
+            print(f"[Config] sse_keepalive {sse_keepalive} is below 1 second; using 1")
+            sse_keepalive = 1.0
+
         self._server = ServerConfig(
             port=server.get("port", 8080),
             host=server.get("host", "localhost"),
             show_test_button=server.get("show_test_button", True),
             player_volume=server.get("player_volume", 0.7),
+            ws_send_queue=server.get("ws_send_queue", 256),
+            ws_send_timeout=server.get("ws_send_timeout", 10.0),
+            ws_heartbeat=server.get("ws_heartbeat", 10.0),
+            ws_idle_timeout=server.get("ws_idle_timeout", 45.0),
+            ws_replay_size=server.get("ws_replay_size", 256),
+            sse_keepalive=sse_keepalive,
+            ws_batch_window_ms=server.get("ws_batch_window_ms", 0.0),
+            topic_tiers=dict(server.get("topic_tiers") or {}),
+            workers=server.get("workers", 0),
+            fanout_socket=server.get("fanout_socket", ""),
         )
 
     def _parse_monobank(self) -> None:
@@ -85,25 +171,100 @@ class Config:
         rules = []
 
         for rule in rules_raw:
+            images, image_weights = self._parse_weighted(rule.get("images", []))
+            sounds, sound_weights = self._parse_weighted(rule.get("sounds", []))
             rules.append(MediaRule(
                 min_amount=rule.get("min", 0),
                 max_amount=rule.get("max"),
-                images=rule.get("images", []),
-                sounds=rule.get("sounds", []),
+                images=images,
+                sounds=sounds,
+                image_weights=image_weights,
+                sound_weights=sound_weights,
+                no_repeat=rule.get("no_repeat", 1),
+                keywords=rule.get("keywords", []),
+                patterns=rule.get("patterns", []),
             ))
 
+        trigger_priority = media.get("trigger_priority", "keyword")
+        if trigger_priority not in ("keyword", "amount"):
+            print(f"[Config] Unknown trigger_priority '{trigger_priority}', using 'keyword'")
+            trigger_priority = "keyword"
+
         self._media = MediaConfig(
             path=media.get("path", "./media"),
             default_duration=media.get("default_duration", 5000),
             rules=rules,
+            trigger_priority=trigger_priority,
+            rotation_file=media.get("rotation_file", "media_rotation.json") or "",
+            preload_ahead=media.get("preload_ahead", 3),
+            transcode=media.get("transcode", True),
+            transcode_cache=media.get("transcode_cache", "media_cache"),
+            ffmpeg_path=media.get("ffmpeg_path", "") or "",
         )
 
+    @staticmethod
+    def _parse_weighted(entries: list) -> tuple[list[str], list[int]]:
+        """
+        Parse media list where each entry is a path or {path, weight}.
+        Weights are only returned if at least one entry sets them.
+        """
+        paths = []
+        weights = []
+        for entry in entries:
+            if isinstance(entry, dict):
+                paths.append(entry.get("path", ""))
+                weights.append(int(entry.get("weight", 1)))
+            else:
+                paths.append(entry)
+                weights.append(1)
+
+        if all(w == 1 for w in weights):
+            weights = []
+        return paths, weights
+
     def _parse_youtube(self) -> None:
         youtube = self._raw.get("youtube", {})
         self._youtube = YouTubeConfig(
             min_donation_for_music=youtube.get("min_donation_for_music", 0),
         )
 
+    def _parse_tracing(self) -> None:
+        tracing = self._raw.get("tracing", {})
+        self._tracing = TracingConfig(
+            enabled=tracing.get("enabled", True),
+            file=tracing.get("file", "logs/traces.jsonl"),
+            max_bytes=tracing.get("max_bytes", 5 * 1024 * 1024),
+            backups=tracing.get("backups", 3),
+            ack_timeout=tracing.get("ack_timeout", 10.0),
+        )
+
+    def _parse_history(self) -> None:
+        history = self._raw.get("history", {})
+        self._history = HistoryConfig(
+            enabled=history.get("enabled", True),
+            file=history.get("file", "data/history.db"),
+            batch_size=history.get("batch_size", 100),
+            flush_interval=history.get("flush_interval", 1.0),
+        )
+
+    def _parse_leaderboard(self) -> None:
+        leaderboard = self._raw.get("leaderboard", {})
+        self._leaderboard = LeaderboardConfig(
+            enabled=leaderboard.get("enabled", True),
+            windows=[str(w) for w in leaderboard.get("windows") or ["today", "stream", "all"]],
+            top_size=leaderboard.get("top_size", 10),
+            checkpoint_file=leaderboard.get("checkpoint_file", "data/leaderboard.json") or "",
+            checkpoint_interval=leaderboard.get("checkpoint_interval", 30.0),
+        )
+
+    def _parse_goal(self) -> None:
+        goal = self._raw.get("goal", {})
+        self._goal = GoalConfig(
+            enabled=goal.get("enabled", True),
+            target=goal.get("target", 0.0) or 0.0,
+            refresh_interval=goal.get("refresh_interval", 600.0),
+        )
+
     # Server getters
     def get_port(self) -> int:
         return self._server.port
@@ -118,6 +279,40 @@ class Config:
         """Get player volume (0.0 to 1.0)."""
         return self._server.player_volume
 
+    def get_ws_send_queue(self) -> int:
+        return self._server.ws_send_queue
+
+    def get_ws_send_timeout(self) -> float:
+        return self._server.ws_send_timeout
+
+    def get_ws_heartbeat(self) -> float:
+        return self._server.ws_heartbeat
+
+    def get_ws_idle_timeout(self) -> float:
+        return self._server.ws_idle_timeout
+
+    def get_ws_replay_size(self) -> int:
+        return self._server.ws_replay_size
+
+    def get_sse_keepalive(self) -> float:
+        return self._server.sse_keepalive
+
+    def get_ws_batch_window(self) -> float:
+        """Batch window in seconds."""
+        return self._server.ws_batch_window_ms / 1000
+
+    def get_topic_tiers(self) -> dict[str, float]:
+        return self._server.topic_tiers
+
+    def get_workers(self) -> int:
+        return self._server.workers
+
+    def get_fanout_socket(self) -> str:
+        return self._server.fanout_socket
+
+    def get_config_path(self) -> Path:
+        return self._config_path
+
     # Monobank getters
     def get_monobank_token(self) -> str:
         return self._monobank.token
@@ -138,11 +333,91 @@ class Config:
     def get_media_rules(self) -> list[MediaRule]:
         return self._media.rules
 
+    def get_trigger_priority(self) -> str:
+        """Get which rules win when both keyword and amount rules match."""
+        return self._media.trigger_priority
+
+    def get_rotation_file(self) -> str:
+        """Get shuffle bag state file path (empty = in memory only)."""
+        return self._media.rotation_file
+
+    def get_preload_ahead(self) -> int:
+        """Get how many queued donations get their media preloaded."""
+        return self._media.preload_ahead
+
+    def is_transcode_enabled(self) -> bool:
+        return self._media.transcode
+
+    def get_transcode_cache(self) -> str:
+        return self._media.transcode_cache
+
+    def get_ffmpeg_path(self) -> str:
+        return self._media.ffmpeg_path
+
     # YouTube getters
     def get_min_donation_for_music(self) -> int:
         """Get minimum donation amount to order music."""
         return self._youtube.min_donation_for_music
 
+    # Tracing getters
+    def is_tracing_enabled(self) -> bool:
+        return self._tracing.enabled
+
+    def get_trace_file(self) -> str:
+        """Get trace file path (empty = keep traces in memory only)."""
+        return self._tracing.file
+
+    def get_trace_max_bytes(self) -> int:
+        return self._tracing.max_bytes
+
+    def get_trace_backups(self) -> int:
+        return self._tracing.backups
+
+    def get_trace_ack_timeout(self) -> float:
+        return self._tracing.ack_timeout
+
+    # History getters
+    def is_history_enabled(self) -> bool:
+        return self._history.enabled
+
+    def get_history_file(self) -> str:
+        """Get donation history database path."""
+        return self._history.file
+
+    def get_history_batch_size(self) -> int:
+        return self._history.batch_size
+
+    def get_history_flush_interval(self) -> float:
+        return self._history.flush_interval
+
+    # Leaderboard getters
+    def is_leaderboard_enabled(self) -> bool:
+        return self._leaderboard.enabled
+
+    def get_leaderboard_windows(self) -> list[str]:
+        return self._leaderboard.windows
+
+    def get_leaderboard_top_size(self) -> int:
+        return self._leaderboard.top_size
+
+    def get_leaderboard_checkpoint_file(self) -> str:
+        """Get leaderboard checkpoint path (empty = don't persist)."""
+        return self._leaderboard.checkpoint_file
+
+    def get_leaderboard_checkpoint_interval(self) -> float:
+        return self._leaderboard.checkpoint_interval
+
+    # Goal getters
+    def is_goal_enabled(self) -> bool:
+        return self._goal.enabled
+
+    def get_goal_target(self) -> float:
+        """Get goal in UAH (0 = use the jar's goal)."""
+        return self._goal.target
+
+    def get_goal_refresh_interval(self) -> float:
+        return self._goal.refresh_interval
+
     # Setters
     def set_jar_id(self, jar_id: str) -> None:
         """Set jar_id and save to config file."""
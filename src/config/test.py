@@ -200,10 +200,67 @@ def test_media_rules_min_max_order():
         Path(temp_config_path).unlink()
 
 
+def test_media_rules_weights():
+    """Test weighted media entries and no_repeat parsing."""
+    config_data = {
+        "server": {"port": 8080},
+        "monobank": {"token": "test", "jar_id": "test", "poll_interval": 60},
+        "media": {
+            "path": "./media",
+            "rules": [
+                {
+                    "min": 0,
+                    "max": None,
+                    "images": [{"path": "rare.gif", "weight": 1}, {"path": "common.gif", "weight": 5}],
+                    "sounds": ["sound1.mp3", "sound2.mp3"],
+                    "no_repeat": 2,
+                },
+            ],
+        },
+    }
+
+    with tempfile.NamedTemporaryFile(mode="w", suffix=".yaml", delete=False) as f:
+        yaml.dump(config_data, f)
+        temp_config_path = f.name
+
+    try:
+        config = Config(temp_config_path)
+        rule = config.get_media_rules()[0]
+
+        assert rule.images == ["rare.gif", "common.gif"]
+        assert rule.image_weights == [1, 5]
+        assert rule.sounds == ["sound1.mp3", "sound2.mp3"]
+        assert rule.sound_weights == [], "Plain entries should not produce weights"
+        assert rule.no_repeat == 2
+
+        print("[PASS] test_media_rules_weights")
+    finally:
+        Path(temp_config_path).unlink()
+
+
+def test_sse_keepalive_minimum():
+    """Test that SSE keep-alives can't be turned off or set below a second."""
+    for value, expected in [(None, 15.0), (30, 30), (0, 15.0), (-5, 15.0), (0.2, 1.0)]:
+        server = {"port": 8080} if value is None else {"port": 8080, "sse_keepalive": value}
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".yaml", delete=False) as f:
+            yaml.dump({"server": server}, f)
+            temp_config_path = f.name
+
+        try:
+            keepalive = Config(temp_config_path).get_sse_keepalive()
+            assert keepalive == expected, f"sse_keepalive {value}: expected {expected}, got {keepalive}"
+        finally:
+            Path(temp_config_path).unlink()
+
+    print("[PASS] test_sse_keepalive_minimum")
+
+
 if __name__ == "__main__":
     test_youtube_config_default()
     test_youtube_config_with_minimum()
     test_media_rules_parsing()
     test_media_rules_with_multiple_items()
     test_media_rules_min_max_order()
+    test_media_rules_weights()
+    test_sse_keepalive_minimum()
     print("\nAll Config tests passed!")
@@ -1,3 +1,3 @@
-from .donations_feed import DonationsFeed
+from .donations_feed import DonationsFeed, FeedQuery
 
-__all__ = ["DonationsFeed"]
+__all__ = ["DonationsFeed", "FeedQuery"]
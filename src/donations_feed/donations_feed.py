@@ -1,83 +1,241 @@
+import hashlib
 import json
-import weakref
-from typing import TYPE_CHECKING
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING, Mapping
 
 from aiohttp import web
 
+from src.notification import Donation
+from src.web_host.broadcast_hub import BroadcastHub, Envelope, HubClient
+from src.web_host.topics import donation_topics
+
 if TYPE_CHECKING:
-    from src.notification import Donation
     from src.config import Config
 
 
+@dataclass(frozen=True)
+class FeedQuery:
+    """Filters and page position for GET /api/donations."""
+    cursor: int | None = None  # Return donations older than this id
+    limit: int = 20
+    since: int | None = None  # Unix timestamp, inclusive
+    until: int | None = None  # Unix timestamp, inclusive
+    min_amount: float | None = None  # UAH
+    donor: str | None = None  # Case-insensitive substring of donor name
+
+    MAX_LIMIT = 100
+
+    @classmethod
+    def from_params(cls, params: Mapping[str, str]) -> "FeedQuery":
+        """Parse query string parameters. Raises ValueError on invalid values."""
+        def optional(name: str, convert):
+            value = params.get(name, "").strip()
+            if not value:
+                return None
+            try:
+                return convert(value)
+            except ValueError:
+                raise ValueError(f"Invalid value for '{name}': {value}")
+
+        limit = optional("limit", int)
+        if limit is not None and not 1 <= limit <= cls.MAX_LIMIT:
+            raise ValueError(f"'limit' must be between 1 and {cls.MAX_LIMIT}")
+
+        donor = params.get("donor", "").strip().casefold()
+        return cls(
+            cursor=optional("cursor", int),
+            limit=limit or cls.limit,
+            since=optional("since", int),
+            until=optional("until", int),
+            min_amount=optional("min_amount", float),
+            donor=donor or None,
+        )
+
+    def matches(self, data: dict) -> bool:
+        if self.since is not None and data["timestamp"] < self.since:
+            return False
+        if self.until is not None and data["timestamp"] > self.until:
+            return False
+        if self.min_amount is not None and data["amount"] < self.min_amount:
+            return False
+        if self.donor and self.donor not in data["donor_name"].casefold():
+            return False
+        return True
+
+
+class _FeedEntry:
+    """Donation in the feed, serialized once when added."""
+
+    __slots__ = ("id", "donation", "data", "json", "topics")
+
+    def __init__(self, donation_id: int, donation: "Donation", config: "Config"):
+        self.id = donation_id  # Also the API cursor and the key of "evict" messages
+        self.donation = donation
+        self.data = {"id": donation_id, **DonationsFeed._donation_to_dict(donation)}
+        self.json = BroadcastHub.encode(self.data)
+        self.topics = donation_topics(config, donation.amount)
+
+
 class DonationsFeed:
     """Manages donations list and broadcasts updates to connected clients."""
 
+    # Serialized API pages and init messages kept per feed version
+    PAGE_CACHE_SIZE = 64
+
     def __init__(self, config: "Config", max_donations: int = 50):
         self._config = config
         self._max_donations = max_donations
 
-        # List of donations (oldest first)
-        self._donations: list["Donation"] = []
+        # Last N donations, oldest first; a full ring drops the oldest on append
+        self._entries: deque[_FeedEntry] = deque(maxlen=max_donations)
+        self._next_id = 1
+        # Entries dropped from the ring, announced with the next broadcast
+        self._evicted: deque[_FeedEntry] = deque(maxlen=max_donations)
+
+        # Bumped on every change; API responses and init messages are cached per version
+        self._version = 0
+        # Newest donation's own time: the same in every worker, unlike the time it arrived
+        self._modified_at: datetime | None = None
+        self._page_cache: dict[FeedQuery, tuple[str, bytes]] = {}
+        self._init_cache: dict[frozenset[str] | None, tuple[str, int, Envelope]] = {}
 
         # Connected WebSocket clients
-        self._websockets: weakref.WeakSet = weakref.WeakSet()
+        self._hub = BroadcastHub(
+            "feed",
+            max_queue=config.get_ws_send_queue(),
+            send_timeout=config.get_ws_send_timeout(),
+            replay_size=config.get_ws_replay_size(),
+            batch_window=config.get_ws_batch_window(),
+        )
 
     def add_donation(self, donation: "Donation") -> None:
-        """Add donation to feed and broadcast to clients."""
-        # Add to list
-        self._donations.append(donation)
+        """Add donation to feed (broadcast_new_donation() sends it to clients)."""
+        evicted = self._append(donation)
+        if evicted:
+            self._evicted.append(evicted)
+        self._changed()
+        print(f"[DonationsFeed] Added donation. Total: {len(self._entries)}")
 
-        # Keep only last N donations
-        if len(self._donations) > self._max_donations:
-            self._donations = self._donations[-self._max_donations:]
+    def _append(self, donation: "Donation", donation_id: int | None = None) -> _FeedEntry | None:
+        """Add entry to the ring. Returns the entry it pushed out, if any."""
+        if donation_id is None:
+            donation_id = self._next_id
+        self._next_id = donation_id + 1
 
-        print(f"[DonationsFeed] Added donation. Total: {len(self._donations)}")
+        evicted = self._entries[0] if self._entries and len(self._entries) == self._max_donations else None
+        self._entries.append(_FeedEntry(donation_id, donation, self._config))
+        return evicted
 
-    async def register_websocket(self, ws: web.WebSocketResponse) -> None:
-        """Register a new WebSocket client."""
-        self._websockets.add(ws)
-        print(f"[DonationsFeed] WebSocket connected. Total: {len(self._websockets)}")
+    async def register_websocket(
+        self,
+        ws: web.WebSocketResponse,
+        since: int | None = None,
+        epoch: str | None = None,
+        fmt: str = "json",
+        topics: frozenset[str] | None = None,
+    ) -> HubClient:
+        """
+        Register a new WebSocket client.
+        A reconnecting client passes the last seq it saw and only gets what it missed.
+        fmt is the negotiated wire format ("json" or "msgpack"), topics its subscriptions.
+        """
+        client = self._hub.add_websocket(ws, fmt, topics)
+        self.resume(client, since, epoch)
+        print(f"[DonationsFeed] WebSocket connected. Total: {self._hub.client_count()}")
+        return client
 
-        # Send current donations
-        await self._send_current_donations(ws)
+    def resume(self, client: HubClient, since: int | None, epoch: str | None) -> None:
+        """Queue missed updates for new client, or all current donations if they can't be replayed."""
+        # Queued before any later broadcast, so nothing is lost or duplicated
+        if since is None or not self._hub.replay(client, since, epoch):
+            self._hub.send_envelope(client, self.init_envelope(client.topics))
 
-    def unregister_websocket(self, ws: web.WebSocketResponse) -> None:
-        """Unregister a WebSocket client."""
-        self._websockets.discard(ws)
-        print(f"[DonationsFeed] WebSocket disconnected. Total: {len(self._websockets)}")
+    async def unregister_client(self, conn: web.WebSocketResponse) -> None:
+        """Unregister a WebSocket or SSE client."""
+        await self._hub.remove_client(conn)
+        print(f"[DonationsFeed] Client disconnected. Total: {self._hub.client_count()}")
 
     async def broadcast_new_donation(self, donation: "Donation") -> None:
-        """Broadcast new donation to all connected clients."""
-        message = self._donation_to_dict(donation)
-        await self._broadcast({"type": "new_donation", "donation": message})
-
-    async def _send_current_donations(self, ws: web.WebSocketResponse) -> None:
-        """Send all current donations to a client."""
-        donations_data = [self._donation_to_dict(d) for d in self._donations]
-        message = json.dumps({
+        """Broadcast new donation, then ids it pushed out of the feed, to all connected clients."""
+        entry = self._find_entry(donation) or _FeedEntry(0, donation, self._config)
+        seq = self._hub.last_seq + 1
+        payload = b'{"type":"new_donation","donation":' + entry.json + b',"seq":' + str(seq).encode() + b"}"
+        message = {"type": "new_donation", "donation": entry.data, "seq": seq}
+        self._hub.publish_encoded(payload, seq, message=message, topics=("new_donation", *entry.topics))
+
+        if self._evicted:
+            # Tagged like the dropped donations, so clients subscribed to them remove them too
+            ids = [evicted.id for evicted in self._evicted]
+            topics = tuple(dict.fromkeys(topic for evicted in self._evicted for topic in evicted.topics))
+            self._evicted.clear()
+            await self._broadcast({"type": "evict", "ids": ids}, topics)
+
+    def _find_entry(self, donation: "Donation") -> _FeedEntry | None:
+        # Broadcast follows add_donation(), so the entry is almost always the newest one
+        for entry in reversed(self._entries):
+            if entry.donation is donation:
+                return entry
+        return None
+
+    def init_message(self, topics: frozenset[str] | None = None) -> dict:
+        """
+        Message with all current donations for a new client (only matching ones if it has topics).
+        Also inlined into the feed page, so it paints before the socket connects.
+        """
+        return {
             "type": "init",
-            "donations": donations_data
-        })
-        try:
-            await ws.send_str(message)
-        except Exception as e:
-            print(f"[DonationsFeed] Error sending current donations: {e}")
+            "donations": [entry.data for entry in self._matching(topics)],
+            "epoch": self._hub.epoch,
+            "seq": self._hub.last_seq,
+        }
+
+    def init_envelope(self, topics: frozenset[str] | None = None) -> Envelope:
+        """
+        init_message() encoded for the wire, built from the entries' JSON.
+        Memoized until the feed or stream position changes, so a burst of
+        reconnecting clients shares one encoded frame.
+        """
+        epoch, seq = self._hub.epoch, self._hub.last_seq
+        cached = self._init_cache.get(topics)
+        if cached and cached[0] == epoch and cached[1] == seq:
+            return cached[2]
+
+        entries = self._matching(topics)
+        payload = (
+            b'{"type":"init","donations":[' + b",".join(entry.json for entry in entries)
+            + b'],"epoch":' + BroadcastHub.encode(epoch) + b',"seq":' + str(seq).encode() + b"}"
+        )
+        message = {"type": "init", "donations": [entry.data for entry in entries], "epoch": epoch, "seq": seq}
+        envelope = Envelope(payload, message=message)
+
+        if topics not in self._init_cache and len(self._init_cache) >= self.PAGE_CACHE_SIZE:
+            self._init_cache.pop(next(iter(self._init_cache)))
+        self._init_cache[topics] = (epoch, seq, envelope)
+        return envelope
 
-    async def _broadcast(self, message: dict) -> None:
-        """Broadcast message to all connected clients."""
-        if not self._websockets:
-            return
+    def _matching(self, topics: frozenset[str] | None) -> list[_FeedEntry]:
+        if topics is None or "new_donation" in topics:
+            return list(self._entries)
+        return [entry for entry in self._entries if not topics.isdisjoint(entry.topics)]
 
-        data = json.dumps(message)
-        tasks = []
+    async def _broadcast(self, message: dict, topics: tuple[str, ...] = ()) -> None:
+        """Broadcast message to all connected clients (subscribers of its topics)."""
+        self._hub.publish(message, topics=topics)
 
-        for ws in list(self._websockets):
-            if not ws.closed:
-                tasks.append(ws.send_str(data))
+    def get_hub(self) -> BroadcastHub:
+        return self._hub
 
-        if tasks:
-            import asyncio
-            await asyncio.gather(*tasks, return_exceptions=True)
+    def get_broadcast_stats(self) -> dict:
+        return self._hub.get_stats()
+
+    def client_count(self) -> int:
+        return self._hub.client_count()
+
+    async def close_all(self) -> None:
+        """Disconnect all clients."""
+        await self._hub.close_all()
 
     @staticmethod
     def _donation_to_dict(donation: "Donation") -> dict:
@@ -89,10 +247,105 @@ class DonationsFeed:
             "timestamp": int(donation.timestamp.timestamp()),
         }
 
+    @staticmethod
+    def _dict_to_donation(data: dict) -> Donation:
+        """Inverse of _donation_to_dict()."""
+        return Donation(
+            amount=round(data["amount"] * 100),
+            comment=data.get("comment") or None,
+            timestamp=datetime.fromtimestamp(data["timestamp"]),
+            donor_name=data.get("donor_name"),
+        )
+
+    def get_snapshot(self) -> dict:
+        """Donations with ids and stream position, for worker processes."""
+        return {
+            "epoch": self._hub.epoch,
+            "seq": self._hub.last_seq,
+            "next_id": self._next_id,
+            "donations": [entry.data for entry in self._entries],
+        }
+
+    def load_snapshot(self, snapshot: dict) -> None:
+        """Replace state with snapshot from main process."""
+        self._hub.sync(snapshot["epoch"], snapshot["seq"])
+        self._entries.clear()
+        for data in snapshot["donations"]:
+            self._append(self._dict_to_donation(data), data["id"])
+        self._next_id = snapshot["next_id"]
+        self._changed()
+
+    def publish_mirrored(self, payload: bytes, seq: int, ttl: float | None, topics: tuple[str, ...] = ()) -> None:
+        """Apply and forward a message published by the main process."""
+        message = json.loads(payload)
+        if message.get("type") == "new_donation":
+            # Same ring size as the main process: its "evict" follows and is just forwarded
+            data = message["donation"]
+            self._append(self._dict_to_donation(data), data.get("id"))
+            self._changed()
+        self._hub.publish_encoded(payload, seq, ttl, topics=topics)
+
     def get_donations(self) -> list["Donation"]:
         """Get current donations list."""
-        return self._donations.copy()
+        return [entry.donation for entry in self._entries]
 
     def clear(self) -> None:
         """Clear all donations."""
-        self._donations.clear()
+        self._entries.clear()
+        self._evicted.clear()
+        self._changed()
+
+    def _changed(self) -> None:
+        self._version += 1
+        self._modified_at = max((entry.donation.timestamp for entry in self._entries), default=None)
+        self._page_cache.clear()
+        self._init_cache.clear()
+
+    def get_version(self) -> int:
+        return self._version
+
+    def get_modified_at(self) -> datetime | None:
+        """Time of the newest donation in the feed, None when it's empty."""
+        return self._modified_at
+
+    @staticmethod
+    def parse_query(params: Mapping[str, str]) -> FeedQuery:
+        """Parse API query string. Raises ValueError on invalid values."""
+        return FeedQuery.from_params(params)
+
+    def query(self, query: FeedQuery) -> dict:
+        """Get one page of donations matching query, newest first."""
+        items = []
+        next_cursor = None
+
+        for entry in reversed(self._entries):
+            if query.cursor is not None and entry.id >= query.cursor:
+                continue
+            if not query.matches(entry.data):
+                continue
+
+            if len(items) == query.limit:
+                # At least one more match exists - continue after the last returned item
+                next_cursor = items[-1]["id"]
+                break
+            items.append(entry.data)
+
+        return {"donations": items, "next_cursor": next_cursor}
+
+    def get_page(self, query: FeedQuery) -> tuple[str, bytes]:
+        """
+        Get serialized page and its ETag.
+        Pages are built once per feed version, repeated polls reuse the bytes.
+        The ETag depends on the content only, so every worker gives the same one.
+        """
+        cached = self._page_cache.get(query)
+        if cached:
+            return cached
+
+        body = json.dumps(self.query(query), ensure_ascii=False).encode("utf-8")
+        etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+
+        if len(self._page_cache) >= self.PAGE_CACHE_SIZE:
+            self._page_cache.pop(next(iter(self._page_cache)))
+        self._page_cache[query] = (etag, body)
+        return etag, body
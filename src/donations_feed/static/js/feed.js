@@ -8,6 +8,16 @@
     const maxDelay = 30000;
     let reconnectTimeout = null;
 
+    // Client heartbeat: the server drops connections that stay silent,
+    // and we reconnect if the server stops answering. Server sends interval in "hello".
+    let heartbeatInterval = 15000;
+    let heartbeatTimer = null;
+    let lastMessageAt = 0;
+
+    // Position in server stream: reconnects ask only for messages after lastSeq
+    let streamEpoch = null;
+    let lastSeq = null;
+
     function updateStatus(connected) {
         if (statusIndicator) {
             if (connected) {
@@ -20,21 +30,34 @@
 
     function connect() {
         const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-        const wsUrl = `${protocol}//${window.location.host}/feed/ws`;
+        const params = new URLSearchParams();
+        // Scene subscribes with its own ?topics=, e.g. /?topics=tier:big
+        const topics = new URLSearchParams(window.location.search).get('topics');
+        if (topics) {
+            params.set('topics', topics);
+        }
+        if (lastSeq !== null) {
+            params.set('since', lastSeq);
+            params.set('epoch', streamEpoch);
+        }
+        const query = params.toString();
+        const wsUrl = `${protocol}//${window.location.host}/feed/ws` + (query ? `?${query}` : '');
 
         console.log('[Feed] Connecting to', wsUrl);
-        ws = new WebSocket(wsUrl);
+        ws = new WebSocket(wsUrl, MessagePack.subprotocols());
+        ws.binaryType = 'arraybuffer';
 
         ws.onopen = function() {
             console.log('[Feed] WebSocket connected successfully');
             reconnectAttempts = 0;
             updateStatus(true);
+            startHeartbeat();
         };
 
         ws.onmessage = function(event) {
+            lastMessageAt = Date.now();
             try {
-                const data = JSON.parse(event.data);
-                handleMessage(data);
+                dispatch(MessagePack.parse(event.data));
             } catch (e) {
                 console.error('[Feed] Failed to parse message:', e);
             }
@@ -42,6 +65,7 @@
 
         ws.onclose = function() {
             console.log('[Feed] WebSocket disconnected');
+            stopHeartbeat();
             updateStatus(false);
             scheduleReconnect();
         };
@@ -52,6 +76,70 @@
         };
     }
 
+    function dispatch(data) {
+        if (data.type === 'batch') {
+            // Broadcasts of a burst packed into one frame, each keeps its own seq
+            data.messages.forEach(dispatch);
+            return;
+        }
+        if (trackSequence(data)) {
+            handleMessage(data);
+        }
+    }
+
+    // Returns false for messages already received before a reconnect
+    function trackSequence(data) {
+        if (data.type === 'init') {
+            streamEpoch = data.epoch;
+            lastSeq = data.seq;
+            return true;
+        }
+        if (data.type === 'hello') {
+            if (data.epoch !== streamEpoch) {
+                // Server restarted, old sequence numbers mean nothing
+                streamEpoch = data.epoch;
+                lastSeq = data.seq;
+            }
+            return true;
+        }
+        if (typeof data.seq === 'number') {
+            if (lastSeq !== null && data.seq <= lastSeq) {
+                return false;
+            }
+            lastSeq = data.seq;
+        }
+        return true;
+    }
+
+    function startHeartbeat() {
+        stopHeartbeat();
+        lastMessageAt = Date.now();
+        heartbeatTimer = setInterval(function() {
+            if (!ws || ws.readyState !== WebSocket.OPEN) {
+                return;
+            }
+            if (Date.now() - lastMessageAt > heartbeatInterval * 3) {
+                // Half-open connection: close() could wait for a handshake that never comes
+                console.warn('[Feed] Server not responding, reconnecting');
+                const deadWs = ws;
+                deadWs.onclose = null;
+                deadWs.close();
+                stopHeartbeat();
+                updateStatus(false);
+                scheduleReconnect();
+                return;
+            }
+            ws.send(JSON.stringify({ type: 'ping', t: Date.now() }));
+        }, heartbeatInterval);
+    }
+
+    function stopHeartbeat() {
+        if (heartbeatTimer) {
+            clearInterval(heartbeatTimer);
+            heartbeatTimer = null;
+        }
+    }
+
     function scheduleReconnect() {
         // Calculate exponential backoff, but cap at maxDelay
         const delay = Math.min(baseDelay * Math.pow(2, reconnectAttempts), maxDelay);
@@ -65,12 +153,23 @@
         console.log('[Feed] Handling message:', data);
 
         switch (data.type) {
+            case 'hello':
+                if (data.heartbeat_ms > 0 && data.heartbeat_ms !== heartbeatInterval) {
+                    heartbeatInterval = data.heartbeat_ms;
+                    startHeartbeat();
+                }
+                break;
+            case 'pong':
+                break;
             case 'init':
                 initDonations(data.donations);
                 break;
             case 'new_donation':
                 addDonation(data.donation, true);
                 break;
+            case 'evict':
+                evictDonations(data.ids);
+                break;
             default:
                 console.warn('[Feed] Unknown message type:', data.type);
         }
@@ -99,6 +198,7 @@
 
         const item = document.createElement('div');
         item.className = `donation-item${isNew ? ' new' : ''}`;
+        item.dataset.id = donation.id;
 
         const amount = parseFloat(donation.amount).toFixed(2);
         const time = new Date(donation.timestamp * 1000).toLocaleTimeString('uk-UA');
@@ -130,6 +230,19 @@
         }
     }
 
+    // Donations the server dropped from its feed: keep the same window it has
+    function evictDonations(ids) {
+        ids.forEach(id => {
+            const item = donationsList.querySelector(`.donation-item[data-id="${id}"]`);
+            if (item) {
+                item.remove();
+            }
+        });
+        if (!donationsList.querySelector('.donation-item')) {
+            showEmptyState();
+        }
+    }
+
     function showEmptyState() {
         donationsList.innerHTML = '<div class="empty-state">Тут буде список донатів...</div>';
     }
@@ -140,7 +253,20 @@
         return div.innerHTML;
     }
 
+    // Donations inlined by the server: paint them now, the socket resumes after their seq
+    function applySnapshot() {
+        const el = document.getElementById('snapshot');
+        if (!el) {
+            return;
+        }
+        const snapshot = JSON.parse(el.textContent);
+        if (snapshot.init) {
+            dispatch(snapshot.init);
+        }
+    }
+
     // Start connection
+    applySnapshot();
     updateStatus(false);
     connect();
 })();
@@ -0,0 +1,3 @@
+from .goal_progress import GoalProgress
+
+__all__ = ["GoalProgress"]
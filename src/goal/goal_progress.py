@@ -0,0 +1,170 @@
+import asyncio
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.config import Config
+    from src.monobank import MonobankClient, JarTransaction
+    from src.web_host import WebHost
+
+SOURCE_STATEMENT = "statement"
+SOURCE_CLIENT_INFO = "client_info"
+
+
+class GoalProgress:
+    """
+    Jar balance and progress towards its goal, pushed as "goal_progress".
+
+    Statement items carry the jar balance after each transaction, so the
+    balance is taken from the transactions the poller fetches anyway,
+    withdrawals included (or from a webhook item through update_balance).
+    client-info is only requested when there is no fresh balance - at start,
+    after a quiet refresh_interval - or to learn the goal when none is
+    configured, and its response is cached.
+    """
+
+    def __init__(
+        self,
+        monobank_client: "MonobankClient",
+        jar_id: str,
+        target: int | None = None,
+        refresh_interval: float = 600.0,
+    ):
+        self._monobank = monobank_client
+        self._jar_id = jar_id
+        self._target = target  # Kopecks, overrides the jar's goal
+        self._refresh_interval = refresh_interval
+        self._web_host: "WebHost | None" = None
+
+        self._balance: int | None = None
+        self._goal: int | None = target
+        self._source: str | None = None
+        # Bank time of the newest statement item seen: older items are ignored. Only bank
+        # times are compared, the host clock may be off; client-info doesn't move it.
+        self._balance_at = 0.0
+        # Unix time the balance is as of, reported as updated_at
+        self._as_of = 0.0
+        # When fresh data last arrived (monotonic), for deciding on a client-info request
+        self._updated = 0.0
+        self._goal_known = target is not None
+        self._published: dict | None = None
+        self._task: asyncio.Task | None = None
+
+    @classmethod
+    def from_config(cls, config: "Config", monobank_client: "MonobankClient") -> "GoalProgress":
+        target = config.get_goal_target()
+        return cls(
+            monobank_client,
+            config.get_jar_id(),
+            target=int(target * 100) if target else None,
+            refresh_interval=config.get_goal_refresh_interval(),
+        )
+
+    def set_web_host(self, web_host: "WebHost") -> None:
+        """Set web host the progress is pushed through."""
+        self._web_host = web_host
+
+    async def start(self) -> None:
+        if self._task:
+            return
+        await self.refresh()
+        self._task = asyncio.create_task(self._refresh_loop())
+        print(f"[GoalProgress] Started ({self._describe()})")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def update_from_transactions(self, transactions: list["JarTransaction"]) -> None:
+        """Take the balance of the newest transaction that has one (poller callback)."""
+        latest = None
+        for tx in transactions:
+            if tx.balance is not None and (latest is None or tx.time > latest.time):
+                latest = tx
+        if latest:
+            await self.update_balance(latest.balance, latest.time.timestamp())
+
+    async def update_balance(self, balance: int, at: float, source: str = SOURCE_STATEMENT) -> None:
+        """Set balance (kopecks) as of bank time at, e.g. from a statement or webhook item."""
+        if at < self._balance_at:
+            return
+        self._balance_at = at
+        await self._set_balance(balance, at, source)
+
+    async def _set_balance(self, balance: int, as_of: float, source: str) -> None:
+        self._balance = balance
+        self._as_of = as_of
+        self._source = source
+        self._updated = time.monotonic()
+        await self._publish()
+
+    async def refresh(self) -> None:
+        """Request client-info unless the balance is fresh and the goal known."""
+        if self._is_fresh() and self._goal_known:
+            return
+        try:
+            jar = await self._monobank.get_jar_by_id(self._jar_id, max_age=self._refresh_interval)
+        except Exception as e:
+            print(f"[GoalProgress] Error getting jar info: {e}")
+            return
+        if jar is None:
+            print(f"[GoalProgress] Jar {self._jar_id} not found")
+            return
+
+        if self._target is None:
+            self._goal = jar.goal
+        self._goal_known = True
+        if not self._is_fresh():
+            # Stamped with the host clock for display only; statement items still compare
+            # against the newest bank time seen, so a skewed clock can't make them look stale
+            await self._set_balance(jar.balance, time.time(), SOURCE_CLIENT_INFO)
+        else:
+            await self._publish()
+
+    def get_progress(self) -> dict | None:
+        """Current progress, None until a balance is known."""
+        if self._balance is None:
+            return None
+        percent = round(self._balance * 100 / self._goal, 2) if self._goal else None
+        return {
+            "jar_id": self._jar_id,
+            "balance": self._balance / 100,
+            "goal": self._goal / 100 if self._goal else None,
+            "percent": percent,
+            "source": self._source,
+            "updated_at": int(self._as_of),
+        }
+
+    def _is_fresh(self) -> bool:
+        return self._balance is not None and time.monotonic() - self._updated < self._refresh_interval
+
+    async def _publish(self) -> None:
+        progress = self.get_progress()
+        if progress is None:
+            return
+        # Same balance seen again (e.g. another poll) is not pushed
+        key = (progress["balance"], progress["goal"])
+        if self._published is not None and key == (self._published["balance"], self._published["goal"]):
+            return
+        self._published = progress
+        if self._web_host:
+            await self._web_host.publish_goal_progress(progress)
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            # Wake when the balance would go stale; new statement data pushes that back
+            remaining = self._refresh_interval - (time.monotonic() - self._updated)
+            await asyncio.sleep(max(remaining, 1.0))
+            await self.refresh()
+
+    def _describe(self) -> str:
+        progress = self.get_progress()
+        if progress is None:
+            return "balance unknown"
+        goal = f" / {progress['goal']:.2f}" if progress["goal"] else ""
+        return f"{progress['balance']:.2f}{goal} UAH"
@@ -0,0 +1,165 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.config import Config
+from src.goal import GoalProgress
+from src.monobank import MonobankClient
+
+
+class _FakeMonobankClient(MonobankClient):
+    """Answers client-info with a fixed jar and counts requests."""
+
+    def __init__(self, balance: int, goal: int | None):
+        super().__init__(Config(str(PROJECT_ROOT / "config.example.yaml")))
+        self.jar = {"id": "jar1", "title": "Jar", "balance": balance, "goal": goal}
+        self.requests = []
+
+    async def _request(self, endpoint: str) -> dict | list:
+        self.requests.append(endpoint)
+        return {"jars": [dict(self.jar)]}
+
+
+class _FakeWebHost:
+    def __init__(self):
+        self.published = []
+
+    async def publish_goal_progress(self, progress: dict) -> None:
+        self.published.append(progress)
+
+
+def _statement(tx_id: str, at: int, amount: int, balance: int) -> dict:
+    return {"id": tx_id, "time": at, "amount": amount, "description": "Від: Alice", "balance": balance}
+
+
+def test_goal_from_statements():
+    """Test balance from statement items, client-info only for the goal, and cached."""
+    async def run():
+        now = int(time.time())
+        client = _FakeMonobankClient(balance=10000, goal=100000)
+        web_host = _FakeWebHost()
+        goal = GoalProgress(client, "jar1", refresh_interval=600)
+        goal.set_web_host(web_host)
+
+        # Poller's first fetch comes before start: only the goal is missing
+        await goal.update_from_transactions(MonobankClient.parse_transactions([
+            _statement("tx2", now - 60, 5000, 25000),
+            _statement("tx1", now - 120, 5000, 20000),
+        ]))
+        assert goal.get_progress()["goal"] is None
+        await goal.start()
+        try:
+            assert len(client.requests) == 1
+            progress = goal.get_progress()
+            assert (progress["balance"], progress["goal"], progress["percent"]) == (250.0, 1000.0, 25.0)
+            assert progress["source"] == "statement", "Fresh statement balance is kept over client-info"
+
+            await goal.update_from_transactions(MonobankClient.parse_transactions([_statement("tx3", now, 2500, 27500)]))
+            assert web_host.published[-1]["percent"] == 27.5
+
+            # A withdrawal is no donation, but its balance is the newest
+            statements = [_statement("out1", now, -7500, 20000), _statement("tx3", now - 1, 2500, 27500)]
+            assert [tx.id for tx in MonobankClient.parse_transactions(statements)] == ["tx3"]
+            await goal.update_from_transactions(MonobankClient.parse_transactions(statements, incoming_only=False))
+            assert web_host.published[-1]["percent"] == 20.0
+
+            # Older item (e.g. a late page) doesn't move the balance back, same balance isn't pushed again
+            pushes = len(web_host.published)
+            await goal.update_from_transactions(MonobankClient.parse_transactions([_statement("tx0", now - 300, 100, 100)]))
+            await goal.update_balance(20000, now + 1)
+            assert goal.get_progress()["balance"] == 200.0
+            assert len(web_host.published) == pushes
+
+            await goal.refresh()
+            assert len(client.requests) == 1, "No client-info request while the balance is fresh"
+        finally:
+            await goal.stop()
+
+        # Nothing from statements: balance from client-info, served from the cached response
+        quiet = GoalProgress(client, "jar1", target=50000, refresh_interval=600)
+        await quiet.start()
+        try:
+            progress = quiet.get_progress()
+            assert (progress["balance"], progress["goal"], progress["percent"]) == (100.0, 500.0, 20.0)
+            assert progress["source"] == "client_info"
+            assert len(client.requests) == 1
+            await client.get_jar_by_id("jar1")
+            assert len(client.requests) == 2, "max_age=0 always asks Monobank"
+        finally:
+            await quiet.stop()
+
+    asyncio.run(run())
+    print("[PASS] test_goal_from_statements")
+
+
+def test_goal_stale_refresh():
+    """Test client-info fallback once the statement balance is stale."""
+    async def run():
+        client = _FakeMonobankClient(balance=40000, goal=None)
+        goal = GoalProgress(client, "jar1", target=100000, refresh_interval=0.2)
+        await goal.update_balance(30000, time.time())
+        await goal.start()
+        try:
+            assert client.requests == [], "Goal configured and balance fresh"
+            assert goal.get_progress()["percent"] == 30.0
+            await asyncio.sleep(0.3)
+            await goal.refresh()
+            assert len(client.requests) == 1
+            assert goal.get_progress()["percent"] == 40.0
+        finally:
+            await goal.stop()
+
+        # No goal on the jar: progress without a percentage
+        no_goal = GoalProgress(client, "jar1")
+        await no_goal.refresh()
+        assert no_goal.get_progress()["goal"] is None and no_goal.get_progress()["percent"] is None
+
+    asyncio.run(run())
+    print("[PASS] test_goal_stale_refresh")
+
+
+def test_goal_clock_skew():
+    """Test that a host clock running ahead of the bank doesn't make statement balances stale."""
+    async def run():
+        bank_now = int(time.time())
+        client = _FakeMonobankClient(balance=40000, goal=100000)
+        goal = GoalProgress(client, "jar1", refresh_interval=600)
+        await goal.update_from_transactions(MonobankClient.parse_transactions([_statement("tx1", bank_now - 60, 100, 30000)]))
+
+        real_time = time.time
+        time.time = lambda: real_time() + 3600
+        try:
+            goal._updated = 0.0  # Balance stale: client-info is asked
+            await goal.refresh()
+        finally:
+            time.time = real_time
+        assert goal.get_progress()["source"] == "client_info"
+
+        # Newer by the bank's clock, though older than the host's
+        await goal.update_from_transactions(MonobankClient.parse_transactions([_statement("tx2", bank_now, 5000, 45000)]))
+        progress = goal.get_progress()
+        assert (progress["balance"], progress["source"]) == (450.0, "statement")
+        assert progress["updated_at"] == bank_now
+
+        # Still ordered by bank time among statement items
+        await goal.update_from_transactions(MonobankClient.parse_transactions([_statement("tx1", bank_now - 60, 100, 30000)]))
+        assert goal.get_progress()["balance"] == 450.0
+
+    asyncio.run(run())
+    print("[PASS] test_goal_clock_skew")
+
+
+if __name__ == "__main__":
+    print("Goal Progress Tests")
+    print("=" * 50 + "\n")
+
+    test_goal_from_statements()
+    test_goal_stale_refresh()
+    test_goal_clock_skew()
+
+    print("\nAll Goal Progress tests passed!")
@@ -0,0 +1,15 @@
+from .history_store import HistoryStore, HistoryRecord, HistorySearch, DonorTotal, HistoryTotals
+from .backfill import StatementBackfill
+from .export import HistoryExport, ExportQuery, EXPORT_FORMATS
+
+__all__ = [
+    "HistoryStore",
+    "HistoryRecord",
+    "HistorySearch",
+    "DonorTotal",
+    "HistoryTotals",
+    "StatementBackfill",
+    "HistoryExport",
+    "ExportQuery",
+    "EXPORT_FORMATS",
+]
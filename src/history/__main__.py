@@ -0,0 +1,134 @@
+"""
+Donation history tools.
+
+    python -m src.history backfill (--days N | --since YYYY-MM-DD) [--until YYYY-MM-DD] [--jar JAR_ID]
+    python -m src.history export [--format csv|jsonl] [--since YYYY-MM-DD] [--until YYYY-MM-DD] [--jar JAR_ID] [-o FILE]
+
+backfill imports past donations from Monobank jar statements into the
+history database configured in config.yaml. It keeps to the statement
+rate limit (one request per minute), so a long range takes a while;
+donations already stored are skipped, so it can be interrupted and rerun.
+
+export writes stored donations, oldest first, as CSV or JSON Lines to a
+file or stdout (until is exclusive: --since 2026-01-01 --until 2026-02-01
+is January). Donations are read in batches, so any range exports in
+constant memory.
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.config import Config  # noqa: E402
+from src.monobank import MonobankClient  # noqa: E402
+from src.history import HistoryStore, StatementBackfill, HistoryExport, ExportQuery, EXPORT_FORMATS  # noqa: E402
+
+
+def _date(value: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected YYYY-MM-DD[THH:MM], got '{value}'")
+
+
+async def backfill(config: Config, args: argparse.Namespace) -> int:
+    jar_id = args.jar or config.get_jar_id()
+    if not jar_id:
+        print("[Error] No jar_id in config.yaml, pass --jar")
+        return 1
+
+    since = args.since or datetime.now() - timedelta(days=args.days)
+    store = HistoryStore.from_config(config, PROJECT_ROOT)
+    await store.start()
+    try:
+        importer = StatementBackfill(MonobankClient(config), store, jar_id)
+        imported = await importer.run(since, args.until)
+    finally:
+        await store.stop()
+
+    print(f"Imported {imported} donation(s) into {store.get_path()}")
+    return 0
+
+
+async def export(config: Config, args: argparse.Namespace) -> int:
+    store = HistoryStore.from_config(config, PROJECT_ROOT)
+    if not store.get_path().exists():
+        print(f"[Error] No history database at {store.get_path()}")
+        return 1
+
+    query = ExportQuery(
+        format=args.format,
+        since=int(args.since.timestamp()) if args.since else None,
+        # Inclusive in ExportQuery, exclusive on the command line
+        until=int(args.until.timestamp()) - 1 if args.until else None,
+        jar_id=args.jar,
+    )
+    output = sys.stdout.buffer
+    # Messages go to stderr: stdout may be the export itself
+    with contextlib.redirect_stdout(sys.stderr):
+        await store.start()
+        try:
+            exporter = HistoryExport(store, query)
+            if args.output:
+                with open(args.output, "wb") as f:
+                    rows = await exporter.write_to(f)
+            else:
+                rows = await exporter.write_to(output)
+                output.flush()
+        except BrokenPipeError:
+            # Reader stopped early (e.g. piped into head); keep Python from failing on exit flush
+            os.dup2(os.open(os.devnull, os.O_WRONLY), output.fileno())
+            return 0
+        finally:
+            await store.stop()
+
+        print(f"Exported {rows} donation(s)" + (f" to {args.output}" if args.output else ""))
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.history", description="Donation history tools")
+    parser.add_argument("--config", type=Path, default=PROJECT_ROOT / "config.yaml", help="Config file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill_cmd = commands.add_parser("backfill", help="Import past donations from Monobank statements")
+    start = backfill_cmd.add_mutually_exclusive_group(required=True)
+    start.add_argument("--days", type=int, help="Import the last N days")
+    start.add_argument("--since", type=_date, help="Import from this date")
+    backfill_cmd.add_argument("--until", type=_date, help="Import up to this date (default: now)")
+    backfill_cmd.add_argument("--jar", help="Jar id (default: monobank.jar_id from config)")
+
+    export_cmd = commands.add_parser("export", help="Write stored donations as CSV or JSON Lines")
+    export_cmd.add_argument("--format", choices=list(EXPORT_FORMATS), default="csv", help="Output format (default: csv)")
+    export_cmd.add_argument("--since", type=_date, help="Donations from this date")
+    export_cmd.add_argument("--until", type=_date, help="Donations before this date")
+    export_cmd.add_argument("--jar", help="Only donations to this jar")
+    export_cmd.add_argument("-o", "--output", type=Path, help="Output file (default: stdout)")
+
+    args = parser.parse_args(argv)
+
+    if not args.config.exists():
+        print(f"[Error] Config file not found: {args.config}")
+        return 1
+    config = Config(str(args.config))
+
+    try:
+        if args.command == "backfill":
+            return asyncio.run(backfill(config, args))
+        if args.command == "export":
+            return asyncio.run(export(config, args))
+    except KeyboardInterrupt:
+        print("\nInterrupted")
+        return 130
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Awaitable, Callable
+
+from src.monobank import MonobankClient
+from src.notification import Donation
+
+if TYPE_CHECKING:
+    from .history_store import HistoryStore
+
+
+class StatementBackfill:
+    """
+    One-shot import of past donations from jar statements into history.
+
+    Monobank allows one statement request per 60 seconds, at most 31 days and
+    1 hour per request, and returns at most 500 items (newest first). The
+    range is walked from newest to oldest in windows of that size; a full
+    page is continued from its oldest item. Already stored donations are
+    skipped, so an interrupted import can simply be run again.
+    """
+
+    REQUEST_INTERVAL = 60.0
+    MAX_RANGE = 31 * 24 * 3600 + 3600
+    PAGE_SIZE = 500
+    # Retries of a request rejected with 429 (waiting REQUEST_INTERVAL each)
+    MAX_RETRIES = 3
+
+    def __init__(
+        self,
+        client: MonobankClient,
+        store: "HistoryStore",
+        jar_id: str,
+        request_interval: float = REQUEST_INTERVAL,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        self._client = client
+        self._store = store
+        self._jar_id = jar_id
+        self._request_interval = request_interval
+        self._sleep = sleep
+        self._last_request: float | None = None
+
+    async def run(self, since: datetime, until: datetime | None = None) -> int:
+        """Import donations from since to until (default now). Returns how many were new."""
+        start = int(since.timestamp())
+        to = int((until or datetime.now()).timestamp())
+        imported = 0
+
+        while to > start:
+            window_start = max(start, to - self.MAX_RANGE)
+            statements = await self._fetch(window_start, to)
+
+            donations = [
+                Donation(
+                    amount=tx.amount,
+                    currency="UAH",
+                    comment=tx.comment or tx.description,
+                    timestamp=tx.time,
+                    donor_name=tx.donor_name,
+                    tx_id=tx.id,
+                )
+                for tx in MonobankClient.parse_transactions(statements)
+            ]
+            if donations:
+                imported += await self._store.add_many(donations, self._jar_id)
+
+            print(
+                f"[StatementBackfill] {datetime.fromtimestamp(window_start):%Y-%m-%d %H:%M} - "
+                f"{datetime.fromtimestamp(to):%Y-%m-%d %H:%M}: {len(statements)} item(s), {imported} new in total"
+            )
+
+            if len(statements) >= self.PAGE_SIZE:
+                # Full page: the rest of the window is older than its last item
+                oldest = min(stmt.get("time", to) for stmt in statements)
+                to = oldest if oldest < to else to - 1
+            else:
+                to = window_start
+
+        return imported
+
+    async def _fetch(self, from_time: int, to_time: int) -> list[dict]:
+        for attempt in range(self.MAX_RETRIES + 1):
+            await self._wait_turn()
+            try:
+                return await self._client.get_statements(self._jar_id, from_time, to_time)
+            except Exception as e:
+                if "429" not in str(e) or attempt == self.MAX_RETRIES:
+                    raise
+                print("[StatementBackfill] Rate limited, waiting")
+        return []
+
+    async def _wait_turn(self) -> None:
+        if self._last_request is not None:
+            delay = self._last_request + self._request_interval - time.monotonic()
+            if delay > 0:
+                await self._sleep(delay)
+        self._last_request = time.monotonic()
@@ -0,0 +1,119 @@
+import csv
+import io
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING, AsyncIterator, BinaryIO, Mapping
+
+if TYPE_CHECKING:
+    from .history_store import HistoryRecord, HistoryStore
+
+# Format -> content type
+EXPORT_FORMATS = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+CSV_COLUMNS = ["date", "amount", "donor_name", "comment", "jar_id", "tx_id"]
+
+# Spreadsheets run cells starting with these as formulas
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+@dataclass(frozen=True)
+class ExportQuery:
+    """Format and filters for GET /api/donations/export."""
+    format: str = "csv"
+    since: int | None = None  # Unix timestamp, inclusive
+    until: int | None = None  # Unix timestamp, inclusive
+    jar_id: str | None = None
+
+    @classmethod
+    def from_params(cls, params: Mapping[str, str]) -> "ExportQuery":
+        """Parse query string parameters. Raises ValueError on invalid values."""
+        def optional(name: str, convert):
+            value = params.get(name, "").strip()
+            if not value:
+                return None
+            try:
+                return convert(value)
+            except ValueError:
+                raise ValueError(f"Invalid value for '{name}': {value}")
+
+        fmt = params.get("format", "").strip().lower() or cls.format
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"'format' must be one of: {', '.join(EXPORT_FORMATS)}")
+        return cls(
+            format=fmt,
+            since=optional("since", int),
+            until=optional("until", int),
+            jar_id=params.get("jar", "").strip() or None,
+        )
+
+
+class HistoryExport:
+    """
+    Donations from history as CSV or JSON Lines, oldest first.
+
+    Records are read and encoded one batch at a time, so memory use doesn't
+    grow with the number of donations; the output is produced as a stream of
+    chunks (an HTTP response body) or written to a file.
+    """
+
+    def __init__(self, store: "HistoryStore", query: ExportQuery, batch_size: int = 500):
+        self._store = store
+        self._query = query
+        self._batch_size = batch_size
+        self.rows = 0
+
+    @property
+    def content_type(self) -> str:
+        return EXPORT_FORMATS[self._query.format]
+
+    @property
+    def filename(self) -> str:
+        return f"donations-{datetime.now():%Y%m%d-%H%M}.{self._query.format}"
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        """Encoded output, one chunk per batch of donations."""
+        self.rows = 0
+        if self._query.format == "csv":
+            # BOM: Excel reads the file as UTF-8 (names and comments are mostly Cyrillic)
+            yield "﻿".encode("utf-8") + self._encode_csv([CSV_COLUMNS])
+
+        async for records in self._store.iter_records(
+            since=datetime.fromtimestamp(self._query.since) if self._query.since is not None else None,
+            until=datetime.fromtimestamp(self._query.until + 1) if self._query.until is not None else None,
+            jar_id=self._query.jar_id,
+            batch_size=self._batch_size,
+        ):
+            self.rows += len(records)
+            if self._query.format == "csv":
+                yield self._encode_csv(self._csv_row(record) for record in records)
+            else:
+                yield "".join(json.dumps(record.to_dict(), ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+
+    async def write_to(self, file: BinaryIO) -> int:
+        """Write the export to a binary file. Returns the number of donations."""
+        async for chunk in self.chunks():
+            file.write(chunk)
+        return self.rows
+
+    @staticmethod
+    def _csv_row(record: "HistoryRecord") -> list[str]:
+        return [
+            datetime.fromtimestamp(record.timestamp).isoformat(sep=" "),
+            f"{record.amount / 100:.2f}",
+            HistoryExport._csv_text(record.donor_name or ""),
+            HistoryExport._csv_text(record.comment or ""),
+            record.jar_id,
+            record.tx_id or "",
+        ]
+
+    @staticmethod
+    def _csv_text(value: str) -> str:
+        """Donor text that a spreadsheet would run as a formula is kept as text."""
+        return "'" + value if value.startswith(_FORMULA_PREFIXES) else value
+
+    @staticmethod
+    def _encode_csv(rows) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode("utf-8")
@@ -0,0 +1,602 @@
+import asyncio
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, AsyncIterator, Mapping
+
+from src.metrics import metrics
+
+if TYPE_CHECKING:
+    from src.config import Config
+    from src.notification import Donation
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS donations (
+    id INTEGER PRIMARY KEY,
+    tx_id TEXT UNIQUE,              -- Monobank statement item id, NULL for test donations
+    jar_id TEXT NOT NULL DEFAULT '',
+    timestamp INTEGER NOT NULL,     -- Unix time
+    amount INTEGER NOT NULL,        -- Kopecks
+    donor_name TEXT,
+    donor_key TEXT NOT NULL,        -- Case-folded donor name, groups one donor's donations
+    comment TEXT
+);
+CREATE INDEX IF NOT EXISTS donations_time ON donations (timestamp);
+CREATE INDEX IF NOT EXISTS donations_donor ON donations (donor_key, timestamp);
+CREATE INDEX IF NOT EXISTS donations_amount ON donations (amount);
+"""
+
+# Full-text index of donor names and comments, kept up to date by triggers.
+# External content: the text is stored once, in donations.
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS donations_fts USING fts5(
+    donor_name, comment,
+    content='donations', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS donations_fts_insert AFTER INSERT ON donations BEGIN
+    INSERT INTO donations_fts (rowid, donor_name, comment) VALUES (new.id, new.donor_name, new.comment);
+END;
+CREATE TRIGGER IF NOT EXISTS donations_fts_delete AFTER DELETE ON donations BEGIN
+    INSERT INTO donations_fts (donations_fts, rowid, donor_name, comment)
+    VALUES ('delete', old.id, old.donor_name, old.comment);
+END;
+CREATE TRIGGER IF NOT EXISTS donations_fts_update AFTER UPDATE OF donor_name, comment ON donations BEGIN
+    INSERT INTO donations_fts (donations_fts, rowid, donor_name, comment)
+    VALUES ('delete', old.id, old.donor_name, old.comment);
+    INSERT INTO donations_fts (rowid, donor_name, comment) VALUES (new.id, new.donor_name, new.comment);
+END;
+-- Index donations stored before the search index existed
+INSERT INTO donations_fts (donations_fts) VALUES ('rebuild');
+"""
+
+# Schema version (PRAGMA user_version) -> script that upgrades to it
+MIGRATIONS = {1: SCHEMA, 2: SEARCH_SCHEMA}
+SCHEMA_VERSION = max(MIGRATIONS)
+
+_COLUMNS = "id, tx_id, jar_id, timestamp, amount, donor_name, comment"
+
+
+def _has_fts5() -> bool:
+    try:
+        sqlite3.connect(":memory:").execute("CREATE VIRTUAL TABLE probe USING fts5(text)")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+# Some SQLite builds come without FTS5; search then scans with LIKE
+HAS_FTS5 = _has_fts5()
+
+
+@dataclass(frozen=True)
+class HistoryRecord:
+    id: int
+    tx_id: str | None
+    jar_id: str
+    timestamp: int  # Unix time
+    amount: int  # Kopecks
+    donor_name: str | None
+    comment: str | None
+
+    @property
+    def cursor(self) -> tuple[int, int]:
+        """Position in newest-first order, for query(before=...)."""
+        return self.timestamp, self.id
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "tx_id": self.tx_id,
+            "jar_id": self.jar_id,
+            "timestamp": self.timestamp,
+            "amount": self.amount / 100,  # UAH, like the feed API
+            "donor_name": self.donor_name or "Anonymous",
+            "comment": self.comment or "",
+        }
+
+
+@dataclass(frozen=True)
+class DonorTotal:
+    donor_name: str
+    amount: int  # Kopecks
+    count: int
+
+    def to_dict(self) -> dict:
+        return {"donor_name": self.donor_name, "amount": self.amount / 100, "count": self.count}
+
+
+@dataclass(frozen=True)
+class HistoryTotals:
+    count: int
+    amount: int  # Kopecks
+    donors: int
+
+    def to_dict(self) -> dict:
+        return {"count": self.count, "amount": self.amount / 100, "donors": self.donors}
+
+
+def donor_key(donor_name: str | None) -> str:
+    """Donations of one donor are grouped by case-folded name ("" = anonymous)."""
+    return (donor_name or "").strip().casefold()
+
+
+@dataclass(frozen=True)
+class HistorySearch:
+    """Search text, filters and page position for GET /api/donations/search."""
+    text: str
+    since: int | None = None  # Unix timestamp, inclusive
+    until: int | None = None  # Unix timestamp, inclusive
+    min_amount: float | None = None  # UAH
+    max_amount: float | None = None  # UAH
+    jar_id: str | None = None
+    limit: int = 20
+    offset: int = 0
+
+    MAX_LIMIT = 100
+
+    @classmethod
+    def from_params(cls, params: Mapping[str, str]) -> "HistorySearch":
+        """Parse query string parameters. Raises ValueError on invalid values."""
+        def optional(name: str, convert):
+            value = params.get(name, "").strip()
+            if not value:
+                return None
+            try:
+                return convert(value)
+            except ValueError:
+                raise ValueError(f"Invalid value for '{name}': {value}")
+
+        text = params.get("q", "").strip()
+        if not text:
+            raise ValueError("'q' is required")
+        limit = optional("limit", int)
+        if limit is not None and not 1 <= limit <= cls.MAX_LIMIT:
+            raise ValueError(f"'limit' must be between 1 and {cls.MAX_LIMIT}")
+        offset = optional("offset", int)
+        if offset is not None and offset < 0:
+            raise ValueError("'offset' must not be negative")
+
+        return cls(
+            text=text,
+            since=optional("since", int),
+            until=optional("until", int),
+            min_amount=optional("min_amount", float),
+            max_amount=optional("max_amount", float),
+            jar_id=params.get("jar", "").strip() or None,
+            limit=limit or cls.limit,
+            offset=offset or 0,
+        )
+
+    def terms(self) -> list[str]:
+        """Words of the search text; each matches words starting with it."""
+        return re.findall(r"\w+", self.text)
+
+    def match_expression(self) -> str:
+        """FTS5 query: every term as a quoted prefix, so the text can't inject query syntax."""
+        return " ".join(f'"{term}"*' for term in self.terms())
+
+
+class HistoryStore:
+    """
+    Every donation in an SQLite database (WAL mode).
+
+    add() only queues the donation; queued donations are written in one
+    transaction per batch, in a worker thread, when batch_size is reached or
+    every flush_interval seconds. Queries run in worker threads too, on their
+    own connection, so a long report never holds up writes or the event loop.
+    Donations with a known Monobank id are stored once (polling and
+    backfill may both see them).
+
+    A read_only store (web workers) only queries a database another process
+    writes: no migrations, no write connection and no flush task.
+    """
+
+    # Searches rank only this many of their most recently stored matches (see search)
+    RANKED_MATCHES = 1000
+
+    def __init__(
+        self,
+        path: Path,
+        jar_id: str = "",
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        read_only: bool = False,
+    ):
+        self._path = path
+        self._jar_id = jar_id
+        self._read_only = read_only
+        self._batch_size = max(1, batch_size)
+        self._flush_interval = flush_interval
+
+        self._write_conn: sqlite3.Connection | None = None
+        self._has_search_index = False
+        self._read_conn: sqlite3.Connection | None = None
+        # One thread at a time per connection
+        self._write_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+
+        self._pending: list[tuple] = []
+        self._flush_task: asyncio.Task | None = None
+        self._wake = asyncio.Event()
+        self._stopping = False
+        # Serializes flushes, so batches are written in order
+        self._flush_lock = asyncio.Lock()
+
+    @classmethod
+    def from_config(cls, config: "Config", project_root: Path, read_only: bool = False) -> "HistoryStore":
+        path = Path(config.get_history_file())
+        if not path.is_absolute():
+            path = project_root / path
+        return cls(
+            path,
+            jar_id=config.get_jar_id(),
+            batch_size=config.get_history_batch_size(),
+            flush_interval=config.get_history_flush_interval(),
+            read_only=read_only,
+        )
+
+    def get_path(self) -> Path:
+        return self._path
+
+    async def start(self) -> None:
+        """Open (and create) the database and start writing queued donations."""
+        if self._read_conn:
+            return
+        await asyncio.to_thread(self._open)
+        if self._read_only:
+            print(f"[HistoryStore] Started read-only ({self._path})")
+            return
+        self._stopping = False
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        print(f"[HistoryStore] Started ({self._path})")
+
+    async def stop(self) -> None:
+        """Write what is still queued and close the database."""
+        if self._flush_task:
+            # Not cancelled: a batch already handed to a worker thread would be written after close
+            self._stopping = True
+            self._wake.set()
+            await self._flush_task
+            self._flush_task = None
+        if self._write_conn:
+            await self.flush()
+        if self._read_conn:
+            await asyncio.to_thread(self._close)
+            print("[HistoryStore] Stopped")
+
+    def _open(self) -> None:
+        if self._read_only:
+            # The writing process creates and migrates the database
+            self._read_conn = sqlite3.connect(
+                f"{self._path.resolve().as_uri()}?mode=ro",
+                uri=True, check_same_thread=False, isolation_level=None,
+            )
+        else:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            self._write_conn = self._connect()
+            self._write_conn.execute("PRAGMA journal_mode=WAL")
+            # WAL + NORMAL: a power loss can drop the last batch, never corrupt the file
+            self._write_conn.execute("PRAGMA synchronous=NORMAL")
+            self._migrate(self._write_conn)
+            self._read_conn = self._connect()
+        self._has_search_index = bool(self._read_conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'donations_fts'"
+        ).fetchone())
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._path, check_same_thread=False, isolation_level=None)
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for target in sorted(MIGRATIONS):
+            if target <= version:
+                continue
+            if MIGRATIONS[target] is SEARCH_SCHEMA and not HAS_FTS5:
+                # Applied once the database is opened with an SQLite that has FTS5
+                print("[HistoryStore] SQLite has no FTS5, search will scan donations")
+                return
+            try:
+                conn.executescript(f"BEGIN; {MIGRATIONS[target]} PRAGMA user_version={target}; COMMIT;")
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            version = target
+
+    def _close(self) -> None:
+        # Waits for a write or query still running in another thread
+        with self._write_lock, self._read_lock:
+            for conn in (self._read_conn, self._write_conn):
+                if conn:
+                    conn.close()
+            self._read_conn = self._write_conn = None
+
+    # Writes
+
+    def add(self, donation: "Donation", jar_id: str | None = None) -> None:
+        """Queue donation for writing (never blocks)."""
+        self._check_writable()
+        self._pending.append(self._row(donation, jar_id))
+        if len(self._pending) >= self._batch_size:
+            self._wake.set()
+
+    def _check_writable(self) -> None:
+        if self._read_only:
+            raise RuntimeError("History store is read-only")
+
+    def _row(self, donation: "Donation", jar_id: str | None) -> tuple:
+        return (
+            donation.tx_id,
+            self._jar_id if jar_id is None else jar_id,
+            int(donation.timestamp.timestamp()),
+            donation.amount,
+            donation.donor_name,
+            donor_key(donation.donor_name),
+            donation.comment,
+        )
+
+    async def add_many(self, donations: list["Donation"], jar_id: str | None = None) -> int:
+        """Write donations now (e.g. a backfill page). Returns how many were new."""
+        self._check_writable()
+        if self._write_conn is None:
+            raise RuntimeError("History store is not started")
+        rows = [self._row(donation, jar_id) for donation in donations]
+        async with self._flush_lock:
+            return await asyncio.to_thread(self._write, rows)
+
+    async def flush(self) -> int:
+        """Write queued donations. Returns how many were new."""
+        async with self._flush_lock:
+            # Before start donations stay queued
+            if not self._pending or self._write_conn is None:
+                return 0
+            rows, self._pending = self._pending, []
+            return await asyncio.to_thread(self._write, rows)
+
+    async def _flush_loop(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"[HistoryStore] Error writing donations: {e}")
+
+    def _write(self, rows: list[tuple]) -> int:
+        started = time.perf_counter()
+        with self._write_lock:
+            conn = self._write_conn
+            conn.execute("BEGIN")
+            try:
+                cursor = conn.executemany(
+                    "INSERT OR IGNORE INTO donations (tx_id, jar_id, timestamp, amount, donor_name, donor_key, comment)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                # Rows ignored as duplicates and search index updates are not counted
+                written = cursor.rowcount
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        metrics.HISTORY_WRITE_DURATION.observe(time.perf_counter() - started)
+        metrics.HISTORY_ROWS_WRITTEN.inc(written)
+        return written
+
+    # Queries
+
+    async def _read(self, sql: str, params: list[Any]) -> list[tuple]:
+        def run() -> list[tuple]:
+            with self._read_lock:
+                return self._read_conn.execute(sql, params).fetchall()
+        return await asyncio.to_thread(run)
+
+    @staticmethod
+    def _where(
+        since: datetime | None,
+        until: datetime | None,
+        jar_id: str | None,
+        min_amount: int | None = None,
+        donor: str | None = None,
+        max_amount: int | None = None,
+    ) -> tuple[str, list[Any]]:
+        """WHERE clause for the filters (since inclusive, until exclusive, amounts in kopecks)."""
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(int(since.timestamp()))
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(int(until.timestamp()))
+        if jar_id is not None:
+            clauses.append("jar_id = ?")
+            params.append(jar_id)
+        if min_amount is not None:
+            clauses.append("amount >= ?")
+            params.append(min_amount)
+        if max_amount is not None:
+            clauses.append("amount <= ?")
+            params.append(max_amount)
+        if donor is not None:
+            clauses.append("donor_key = ?")
+            params.append(donor_key(donor))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    async def query(
+        self,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        jar_id: str | None = None,
+        min_amount: int | None = None,
+        donor: str | None = None,
+        before: tuple[int, int] | None = None,
+        limit: int = 100,
+    ) -> list[HistoryRecord]:
+        """Donations in a time range, newest first. Next page: before = cursor of the last record."""
+        where, params = self._where(since, until, jar_id, min_amount, donor)
+        if before is not None:
+            where += (" AND " if where else " WHERE ") + "(timestamp, id) < (?, ?)"
+            params += [before[0], before[1]]
+        rows = await self._read(
+            f"SELECT {_COLUMNS} FROM donations{where} ORDER BY timestamp DESC, id DESC LIMIT ?",
+            params + [limit],
+        )
+        return [HistoryRecord(*row) for row in rows]
+
+    @staticmethod
+    def parse_search(params: Mapping[str, str]) -> HistorySearch:
+        """Parse search API query string. Raises ValueError on invalid values."""
+        return HistorySearch.from_params(params)
+
+    async def search(self, query: HistorySearch) -> tuple[list[HistoryRecord], int | None]:
+        """
+        Donations whose donor name or comment contains words starting with the
+        search terms, best match first (name matches weigh double), then newest.
+        Only the RANKED_MATCHES most recently stored matches are ranked; older
+        ones follow them, most recently stored first.
+        Returns one page and the offset of the next (None on the last page).
+        """
+        if not query.terms():
+            return [], None
+        where, params = self._where(
+            datetime.fromtimestamp(query.since) if query.since is not None else None,
+            datetime.fromtimestamp(query.until + 1) if query.until is not None else None,
+            query.jar_id,
+            min_amount=round(query.min_amount * 100) if query.min_amount is not None else None,
+            max_amount=round(query.max_amount * 100) if query.max_amount is not None else None,
+        )
+        where = where.replace(" WHERE ", " AND ", 1)
+        columns = ", ".join(f"d.{column}" for column in _COLUMNS.split(", "))
+        # One extra row tells whether there is a next page
+        page = [query.limit + 1, query.offset]
+        ranking = "bm25(donations_fts, 2.0, 1.0), d.timestamp DESC, d.id DESC"
+
+        def run() -> list[tuple]:
+            with self._read_lock:
+                conn = self._read_conn
+                if not self._has_search_index:
+                    likes, like_params = [], []
+                    for term in query.terms():
+                        # Terms are words, but "_" is one and would match any character
+                        pattern = "%" + re.sub(r"([\\%_])", r"\\\1", term) + "%"
+                        likes.append("(d.donor_name LIKE ? ESCAPE '\\' OR d.comment LIKE ? ESCAPE '\\')")
+                        like_params += [pattern, pattern]
+                    return conn.execute(
+                        f"SELECT {columns} FROM donations d WHERE {' AND '.join(likes)}{where}"
+                        " ORDER BY d.timestamp DESC, d.id DESC LIMIT ? OFFSET ?",
+                        like_params + params + page,
+                    ).fetchall()
+
+                match = query.match_expression()
+                source = f"FROM donations_fts JOIN donations d ON d.id = donations_fts.rowid WHERE donations_fts MATCH ?{where}"
+                # Scoring costs a few us per match and hardly tells thousands apart: only matches
+                # from the RANKED_MATCHES-th most recently stored one on are ranked. The index
+                # walks matches newest stored first, so finding that one costs no scoring.
+                edge_source = source if where else "FROM donations_fts WHERE donations_fts MATCH ?"
+                edge = conn.execute(
+                    f"SELECT donations_fts.rowid {edge_source} ORDER BY donations_fts.rowid DESC LIMIT 1 OFFSET ?",
+                    [match] + params + [self.RANKED_MATCHES - 1],
+                ).fetchone()
+                if edge is None:
+                    return conn.execute(
+                        f"SELECT {columns} {source} ORDER BY {ranking} LIMIT ? OFFSET ?",
+                        [match] + params + page,
+                    ).fetchall()
+
+                rows = []
+                if query.offset < self.RANKED_MATCHES:
+                    rows = conn.execute(
+                        f"SELECT {columns} {source} AND donations_fts.rowid >= ? ORDER BY {ranking} LIMIT ? OFFSET ?",
+                        [match] + params + [edge[0]] + page,
+                    ).fetchall()
+                if len(rows) < page[0]:
+                    # Past the ranked ones: older matches, most recently stored first
+                    rows += conn.execute(
+                        f"SELECT {columns} {source} AND donations_fts.rowid < ? ORDER BY donations_fts.rowid DESC LIMIT ? OFFSET ?",
+                        [match] + params + [edge[0], page[0] - len(rows), max(0, query.offset - self.RANKED_MATCHES)],
+                    ).fetchall()
+                return rows
+
+        started = time.perf_counter()
+        rows = await asyncio.to_thread(run)
+        metrics.HISTORY_SEARCH_DURATION.observe(time.perf_counter() - started)
+        records = [HistoryRecord(*row) for row in rows[:query.limit]]
+        next_offset = query.offset + query.limit if len(rows) > query.limit else None
+        return records, next_offset
+
+    async def iter_records(
+        self,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        jar_id: str | None = None,
+        batch_size: int = 500,
+    ) -> AsyncIterator[list[HistoryRecord]]:
+        """
+        Donations in a time range, oldest first, in batches of batch_size.
+        Each batch is one indexed query continuing after the previous one, so
+        only a batch is in memory and other queries run in between.
+        """
+        where, params = self._where(since, until, jar_id)
+        after: tuple[int, int] | None = None
+        while True:
+            page_where, page_params = where, list(params)
+            if after is not None:
+                # Row value comparison: SQLite seeks the time index to it instead of scanning up to it
+                page_where += (" AND " if page_where else " WHERE ") + "(timestamp, id) > (?, ?)"
+                page_params += [after[0], after[1]]
+            rows = await self._read(
+                f"SELECT {_COLUMNS} FROM donations{page_where} ORDER BY timestamp, id LIMIT ?",
+                page_params + [batch_size],
+            )
+            if not rows:
+                return
+            records = [HistoryRecord(*row) for row in rows]
+            yield records
+            if len(rows) < batch_size:
+                return
+            after = records[-1].cursor
+
+    async def top_donors(
+        self,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        jar_id: str | None = None,
+        limit: int = 10,
+    ) -> list[DonorTotal]:
+        """Donors by total amount, highest first (anonymous donations excluded)."""
+        where, params = self._where(since, until, jar_id)
+        where += (" AND " if where else " WHERE ") + "donor_key != ''"
+        rows = await self._read(
+            f"SELECT MAX(donor_name), SUM(amount), COUNT(*) FROM donations{where}"
+            " GROUP BY donor_key ORDER BY SUM(amount) DESC, MIN(timestamp) LIMIT ?",
+            params + [limit],
+        )
+        return [DonorTotal(*row) for row in rows]
+
+    async def totals(
+        self,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        jar_id: str | None = None,
+    ) -> HistoryTotals:
+        where, params = self._where(since, until, jar_id)
+        rows = await self._read(
+            f"SELECT COUNT(*), COALESCE(SUM(amount), 0), COUNT(DISTINCT NULLIF(donor_key, '')) FROM donations{where}",
+            params,
+        )
+        return HistoryTotals(*rows[0])
+
+    async def latest_timestamp(self, jar_id: str | None = None) -> int | None:
+        """Time of the newest stored donation, where a backfill can continue."""
+        where, params = self._where(None, None, jar_id)
+        rows = await self._read(f"SELECT MAX(timestamp) FROM donations{where}", params)
+        return rows[0][0]
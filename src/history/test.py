@@ -0,0 +1,361 @@
+import asyncio
+import csv
+import io
+import json
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.history import HistoryStore, HistorySearch, StatementBackfill, HistoryExport, ExportQuery
+from src.history.__main__ import main as history_main
+from src.history import history_store as history_store_module
+from src.notification import Donation
+
+START = datetime(2026, 3, 1, 12, 0)
+
+
+def test_history_store():
+    """Test batched writes, dedupe by Monobank id, range scans, top donors and totals."""
+    async def run(root: Path):
+        store = HistoryStore(root / "data" / "history.db", jar_id="jar1", batch_size=3, flush_interval=60)
+        await store.start()
+        try:
+            for i in range(5):
+                store.add(Donation(
+                    amount=(i + 1) * 1000,
+                    donor_name=["Alice", "bob", "Bob", None, "alice"][i],
+                    comment=f"c{i}",
+                    timestamp=START + timedelta(hours=i),
+                    tx_id=f"tx{i}",
+                ))
+                if i == 2:
+                    # Batch size reached: written without waiting for the interval
+                    await asyncio.sleep(0.2)
+                    assert len(await store.query()) == 3
+            await asyncio.sleep(0.2)
+            assert len(await store.query()) == 3, "Smaller batch waits for the interval"
+            assert await store.flush() == 2
+
+            # Same Monobank id again (e.g. from a backfill) is stored once
+            assert await store.add_many([Donation(amount=1000, tx_id="tx0", timestamp=START)]) == 0
+
+            records = await store.query(since=START + timedelta(hours=1), until=START + timedelta(hours=4))
+            assert [r.comment for r in records] == ["c3", "c2", "c1"], "Newest first, until exclusive"
+            assert records[0].jar_id == "jar1"
+
+            page = await store.query(limit=2)
+            rest = await store.query(limit=10, before=page[-1].cursor)
+            assert [r.comment for r in page + rest] == ["c4", "c3", "c2", "c1", "c0"]
+
+            assert [r.amount for r in await store.query(donor="BOB")] == [3000, 2000]
+            assert [r.amount for r in await store.query(min_amount=4000)] == [5000, 4000]
+
+            top = await store.top_donors()
+            assert [(d.donor_name.casefold(), d.amount, d.count) for d in top] == [("alice", 6000, 2), ("bob", 5000, 2)]
+
+            totals = await store.totals(since=START)
+            assert (totals.count, totals.amount, totals.donors) == (5, 15000, 2)
+            assert (await store.totals(jar_id="other")).count == 0
+            assert await store.latest_timestamp() == int((START + timedelta(hours=4)).timestamp())
+
+            store.add(Donation(amount=100, donor_name="Late", timestamp=START + timedelta(days=1)))
+        finally:
+            await store.stop()
+
+        # Queued donations are written on stop and survive a restart
+        reopened = HistoryStore(root / "data" / "history.db", batch_size=1)
+        try:
+            await reopened.add_many([Donation(amount=100, timestamp=START)])
+            assert False, "Written before start"
+        except RuntimeError:
+            pass
+        await reopened.start()
+        try:
+            assert (await reopened.totals()).count == 6
+
+            # Stopped while a batch is being written in a worker thread: the write finishes first
+            write = reopened._write
+
+            def slow_write(rows):
+                time.sleep(0.2)
+                return write(rows)
+
+            reopened._write = slow_write
+            reopened.add(Donation(amount=100, donor_name="Slow", timestamp=START + timedelta(days=2)))
+            await asyncio.sleep(0.05)
+        finally:
+            await reopened.stop()
+
+        reopened = HistoryStore(root / "data" / "history.db")
+        await reopened.start()
+        try:
+            assert (await reopened.totals()).count == 7
+        finally:
+            await reopened.stop()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(Path(tmp)))
+
+    print("[PASS] test_history_store")
+
+
+def test_history_search():
+    """Test prefix search, ranking, filters, paging and indexing of new and pre-existing rows."""
+    async def run(root: Path):
+        path = root / "history.db"
+        # Database from before the search index: indexed when opened
+        conn = sqlite3.connect(path)
+        conn.executescript(history_store_module.SCHEMA)
+        conn.execute(
+            "INSERT INTO donations (tx_id, jar_id, timestamp, amount, donor_name, donor_key, comment)"
+            " VALUES ('old', 'jar1', ?, 5000, 'Тарас', 'тарас', 'На дрони для побратимів')",
+            (int(START.timestamp()),),
+        )
+        conn.execute("PRAGMA user_version=1")
+        conn.commit()
+        conn.close()
+
+        # Read-only (web worker): searches by scanning, leaves migrating to the writer
+        reader = HistoryStore(path, read_only=True)
+        await reader.start()
+        try:
+            assert [r.tx_id for r in (await reader.search(HistorySearch("дрон")))[0]] == ["old"]
+            try:
+                reader.add(Donation(amount=100, timestamp=START))
+                assert False, "Read-only store accepted a donation"
+            except RuntimeError:
+                pass
+        finally:
+            await reader.stop()
+        conn = sqlite3.connect(path)
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == 1
+        conn.close()
+
+        store = HistoryStore(path, jar_id="jar1", batch_size=1)
+        await store.start()
+        try:
+            assert [r.tx_id for r in (await store.search(HistorySearch("дрон")))[0]] == ["old"]
+
+            await store.add_many([
+                Donation(amount=1000, donor_name="Marta", comment="Music please: Drones by Muse",
+                         timestamp=START + timedelta(hours=1), tx_id="tx1"),
+                Donation(amount=20000, donor_name="Dron", comment="привіт",
+                         timestamp=START + timedelta(hours=2), tx_id="tx2"),
+                Donation(amount=3000, donor_name="Olena", comment="на дрони",
+                         timestamp=START + timedelta(hours=3), tx_id="tx3"),
+            ])
+
+            records, next_offset = await store.search(HistorySearch("dro"))
+            assert [r.tx_id for r in records] == ["tx2", "tx1"], "Name match ranks first"
+            assert next_offset is None
+            assert [r.tx_id for r in (await store.search(HistorySearch("DRONES muse")))[0]] == ["tx1"]
+            assert (await store.search(HistorySearch('"); DROP')))[0] == [], "Query syntax is not interpreted"
+            assert (await store.search(HistorySearch("!!")))[0] == []
+
+            # Filters: time (until inclusive) and amount in UAH
+            since = int((START + timedelta(hours=1)).timestamp())
+            records, _ = await store.search(HistorySearch("дрон", since=since))
+            assert [r.tx_id for r in records] == ["tx3"]
+            records, _ = await store.search(HistorySearch("dro", max_amount=10, until=since))
+            assert [r.tx_id for r in records] == ["tx1"]
+            assert (await store.search(HistorySearch("dro", min_amount=200)))[0][0].tx_id == "tx2"
+
+            # Pages
+            page, next_offset = await store.search(HistorySearch("д", limit=1))
+            assert next_offset == 1
+            rest, next_offset = await store.search(HistorySearch("д", limit=10, offset=1))
+            assert next_offset is None
+            assert {r.tx_id for r in page + rest} == {"old", "tx3"}
+
+            # Queued donations are indexed when written
+            store.add(Donation(amount=100, comment="Дякую за стрім", timestamp=START, tx_id="tx4"))
+            await store.flush()
+            assert [r.tx_id for r in (await store.search(HistorySearch("стрі")))[0]] == ["tx4"]
+
+            # Broad search: the most recently stored matches are ranked, older ones follow
+            await store.add_many([Donation(amount=500, donor_name="Ira", comment="drone show",
+                                           timestamp=START + timedelta(hours=5), tx_id="tx5")])
+            store.RANKED_MATCHES = 2
+            assert [r.tx_id for r in (await store.search(HistorySearch("dro")))[0]] == ["tx2", "tx5", "tx1"]
+            page, next_offset = await store.search(HistorySearch("dro", limit=1, offset=1))
+            assert [r.tx_id for r in page] == ["tx5"] and next_offset == 2
+            page, next_offset = await store.search(HistorySearch("dro", limit=2, offset=1))
+            assert [r.tx_id for r in page] == ["tx5", "tx1"] and next_offset is None
+            # The window is taken after filtering: two matches left, both ranked
+            since = int((START + timedelta(hours=2)).timestamp())
+            assert [r.tx_id for r in (await store.search(HistorySearch("dro", since=since)))[0]] == ["tx2", "tx5"]
+            store.RANKED_MATCHES = HistoryStore.RANKED_MATCHES
+        finally:
+            await store.stop()
+
+    async def run_without_fts(root: Path):
+        store = HistoryStore(root / "plain.db")
+        await store.start()
+        try:
+            await store.add_many([
+                Donation(amount=100, comment="Drones by Muse", timestamp=START, tx_id="tx1"),
+                Donation(amount=100, comment="promo_code", timestamp=START, tx_id="tx2"),
+                Donation(amount=100, comment="promo-code", timestamp=START, tx_id="tx3"),
+            ])
+            assert [r.tx_id for r in (await store.search(HistorySearch("muse")))[0]] == ["tx1"]
+            assert [r.tx_id for r in (await store.search(HistorySearch("promo_code")))[0]] == ["tx2"], "'_' is no wildcard"
+        finally:
+            await store.stop()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(Path(tmp)))
+        # SQLite without FTS5: same results from a scan
+        has_fts5 = history_store_module.HAS_FTS5
+        history_store_module.HAS_FTS5 = False
+        try:
+            asyncio.run(run_without_fts(Path(tmp)))
+        finally:
+            history_store_module.HAS_FTS5 = has_fts5
+
+    try:
+        HistorySearch.from_params({"q": " "})
+        assert False, "Empty search accepted"
+    except ValueError:
+        pass
+    query = HistorySearch.from_params({"q": "кава", "limit": "5", "offset": "10", "min_amount": "50", "jar": "jar1"})
+    assert (query.limit, query.offset, query.min_amount, query.jar_id) == (5, 10, 50.0, "jar1")
+
+    print("[PASS] test_history_search")
+
+
+def test_history_export():
+    """Test CSV and JSON Lines export in batches, filters and the export command."""
+    async def run(root: Path):
+        store = HistoryStore(root / "history.db", jar_id="jar1")
+        await store.start()
+        try:
+            await store.add_many([
+                Donation(amount=1050, donor_name="Марія", comment="Дякую, ok", timestamp=START, tx_id="tx0"),
+                Donation(amount=200, donor_name=None, comment="=HYPERLINK(\"x\")", timestamp=START + timedelta(hours=1), tx_id="tx1"),
+                Donation(amount=300, donor_name="Bob", comment=None, timestamp=START + timedelta(hours=2), tx_id="tx2"),
+            ])
+            await store.add_many([Donation(amount=400, donor_name="Eve", timestamp=START, tx_id="other")], jar_id="jar2")
+
+            export = HistoryExport(store, ExportQuery(jar_id="jar1"), batch_size=2)
+            chunks = [chunk async for chunk in export.chunks()]
+            assert len(chunks) == 3, "Header, then one chunk per batch"
+            text = b"".join(chunks).decode("utf-8")
+            assert text.startswith("\ufeff")
+            rows = list(csv.reader(io.StringIO(text[1:])))
+            assert rows[0] == ["date", "amount", "donor_name", "comment", "jar_id", "tx_id"]
+            assert rows[1] == [START.isoformat(sep=" "), "10.50", "Марія", "Дякую, ok", "jar1", "tx0"]
+            assert rows[2][3] == "'=HYPERLINK(\"x\")", "Formulas are kept as text"
+            assert [row[5] for row in rows[1:]] == ["tx0", "tx1", "tx2"] and export.rows == 3
+
+            # JSON Lines, until inclusive
+            buffer = io.BytesIO()
+            until = int((START + timedelta(hours=1)).timestamp())
+            assert await HistoryExport(store, ExportQuery(format="jsonl", until=until)).write_to(buffer) == 3
+            lines = [json.loads(line) for line in buffer.getvalue().decode("utf-8").splitlines()]
+            assert [(d["tx_id"], d["amount"]) for d in lines] == [("tx0", 10.5), ("other", 4.0), ("tx1", 2.0)]
+        finally:
+            await store.stop()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        asyncio.run(run(root))
+
+        config_path = root / "config.yaml"
+        config_path.write_text(f"history:\n  file: {json.dumps(str(root / 'history.db'))}\n", encoding="utf-8")
+        output = root / "out.jsonl"
+        assert history_main([
+            "--config", str(config_path), "export", "--format", "jsonl",
+            "--since", START.date().isoformat(), "--until", (START + timedelta(hours=2)).isoformat(), "-o", str(output),
+        ]) == 0
+        assert [json.loads(line)["tx_id"] for line in output.read_text(encoding="utf-8").splitlines()] == ["tx0", "other", "tx1"]
+
+    try:
+        ExportQuery.from_params({"format": "xlsx"})
+        assert False, "Unknown format accepted"
+    except ValueError:
+        pass
+
+    print("[PASS] test_history_export")
+
+
+class _FakeStatementClient:
+    """Serves statement items (newest first, at most PAGE_SIZE) from a fixed list."""
+
+    def __init__(self, items: list[dict], page_size: int):
+        self.items = items
+        self.page_size = page_size
+        self.requests = []
+        self.fail_next = 0
+
+    async def get_statements(self, account_id: str, from_time: int, to_time: int | None = None) -> list[dict]:
+        self.requests.append((from_time, to_time))
+        if self.fail_next:
+            self.fail_next -= 1
+            raise Exception("Monobank API error 429: Too many requests")
+        matching = [item for item in self.items if from_time <= item["time"] <= to_time]
+        matching.sort(key=lambda item: item["time"], reverse=True)
+        return matching[:self.page_size]
+
+
+def test_statement_backfill():
+    """Test backfill windows, full-page continuation, rate limit waits and rerun."""
+    async def run(root: Path):
+        start = int(START.timestamp())
+        day = 24 * 3600
+        items = [
+            {"id": f"tx{i}", "time": start + i * day, "amount": 5000, "description": "Від: Alice", "comment": f"c{i}"}
+            for i in range(40)
+        ]
+        items.append({"id": "out", "time": start + 5, "amount": -100, "description": "Withdrawal"})
+
+        client = _FakeStatementClient(items, page_size=10)
+        sleeps = []
+
+        async def sleep(seconds: float) -> None:
+            sleeps.append(seconds)
+
+        store = HistoryStore(root / "history.db", jar_id="jar1")
+        await store.start()
+        try:
+            backfill = StatementBackfill(client, store, "jar1", sleep=sleep)
+            backfill.PAGE_SIZE = 10
+            client.fail_next = 1
+
+            until = START + timedelta(days=40)
+            assert await backfill.run(START, until) == 40
+            assert all(to - frm <= StatementBackfill.MAX_RANGE for frm, to in client.requests)
+            assert len(sleeps) == len(client.requests) - 1, "Every request after the first waits its turn"
+            assert all(0 < s <= StatementBackfill.REQUEST_INTERVAL for s in sleeps)
+
+            records = await store.query(limit=100)
+            assert len(records) == 40
+            assert records[-1].donor_name == "Alice" and records[-1].comment == "c0"
+
+            # Rerun imports nothing new
+            assert await StatementBackfill(client, store, "jar1", sleep=sleep).run(START, until) == 0
+        finally:
+            await store.stop()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(Path(tmp)))
+
+    print("[PASS] test_statement_backfill")
+
+
+if __name__ == "__main__":
+    print("History Tests")
+    print("=" * 50 + "\n")
+
+    test_history_store()
+    test_history_search()
+    test_history_export()
+    test_statement_backfill()
+
+    print("\nAll History tests passed!")
@@ -0,0 +1,3 @@
+from .leaderboard import Leaderboard, LeaderboardWindow, DonorStanding
+
+__all__ = ["Leaderboard", "LeaderboardWindow", "DonorStanding"]
@@ -0,0 +1,349 @@
+import asyncio
+import json
+import os
+import time
+from bisect import bisect_left, insort
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+try:
+    from sortedcontainers import SortedList
+    HAS_SORTEDCONTAINERS = True
+except ImportError:
+    HAS_SORTEDCONTAINERS = False
+
+from src.history.history_store import donor_key
+
+if TYPE_CHECKING:
+    from src.config import Config
+    from src.notification import Donation
+    from src.web_host import WebHost
+
+# Window kinds: calendar day, since app start, everything, last N seconds
+WINDOW_TODAY = "today"
+WINDOW_STREAM = "stream"
+WINDOW_ALL = "all"
+_ROLLING_UNITS = {"m": 60, "h": 3600, "d": 86400}
+
+
+@dataclass
+class DonorStanding:
+    donor_name: str
+    amount: int  # Kopecks
+    count: int
+    first_at: int  # Unix time of the donor's first donation in the window, breaks ties
+
+    def sort_key(self, key: str) -> tuple:
+        return (-self.amount, self.first_at, key)
+
+    def to_dict(self) -> dict:
+        return {"donor_name": self.donor_name, "amount": self.amount / 100, "count": self.count}
+
+
+class _Ranking:
+    """
+    Donor totals kept in amount order.
+    Updates are O(log n) with sortedcontainers (in requirements.txt); without
+    it a bisect-maintained list is used (O(log n) search plus an O(n) memmove,
+    fine for thousands of donors).
+    """
+
+    def __init__(self):
+        self._standings: dict[str, DonorStanding] = {}
+        self._order = SortedList() if HAS_SORTEDCONTAINERS else []
+
+    def __len__(self) -> int:
+        return len(self._standings)
+
+    def add(self, key: str, donor_name: str, amount: int, count: int, at: int) -> None:
+        """Add amount (negative when a donation expires) to the donor's total."""
+        standing = self._standings.get(key)
+        if standing:
+            self._discard(standing.sort_key(key))
+            standing.amount += amount
+            standing.count += count
+            standing.donor_name = donor_name or standing.donor_name
+        else:
+            standing = self._standings[key] = DonorStanding(donor_name, amount, count, at)
+
+        if standing.count <= 0:
+            del self._standings[key]
+            return
+        if HAS_SORTEDCONTAINERS:
+            self._order.add(standing.sort_key(key))
+        else:
+            insort(self._order, standing.sort_key(key))
+
+    def _discard(self, sort_key: tuple) -> None:
+        if HAS_SORTEDCONTAINERS:
+            self._order.remove(sort_key)
+        else:
+            del self._order[bisect_left(self._order, sort_key)]
+
+    def top(self, limit: int) -> list[DonorStanding]:
+        return [self._standings[sort_key[2]] for sort_key in self._order[:limit]]
+
+    def items(self):
+        return self._standings.items()
+
+
+class LeaderboardWindow:
+    """Totals and donor ranking of the donations in one time window."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.duration: int | None = None  # Rolling windows only
+        if name[:-1].isdigit() and name[-1] in _ROLLING_UNITS:
+            self.duration = int(name[:-1]) * _ROLLING_UNITS[name[-1]]
+        elif name not in (WINDOW_TODAY, WINDOW_STREAM, WINDOW_ALL):
+            raise ValueError(f"Unknown leaderboard window '{name}' (today, stream, all or e.g. 30m, 24h, 7d)")
+
+        self.count = 0
+        self.amount = 0
+        self.ranking = _Ranking()
+        self.starts_at = 0  # Donations before this are not counted
+        # Rolling windows remember each donation until it expires: (time, key, name, amount)
+        self._entries: deque[tuple[int, str, str, int]] = deque()
+
+    @property
+    def persistent(self) -> bool:
+        """"stream" starts over with the app, other windows survive restarts."""
+        return self.name != WINDOW_STREAM
+
+    def reset(self, starts_at: int) -> None:
+        self.count = self.amount = 0
+        self.ranking = _Ranking()
+        self._entries.clear()
+        self.starts_at = starts_at
+
+    def add(self, key: str, donor_name: str, amount: int, at: int) -> bool:
+        """Count donation. Returns False if it falls before the window."""
+        if at < self.starts_at:
+            return False
+        self.count += 1
+        self.amount += amount
+        if key:
+            self.ranking.add(key, donor_name, amount, 1, at)
+        if self.duration is not None:
+            self._entries.append((at, key, donor_name, amount))
+        return True
+
+    def expire(self, now: int) -> bool:
+        """Move window start to now. Returns True if anything dropped out."""
+        if self.name == WINDOW_TODAY:
+            midnight = int(datetime.fromtimestamp(now).replace(hour=0, minute=0, second=0, microsecond=0).timestamp())
+            if midnight > self.starts_at:
+                changed = self.count > 0
+                self.reset(midnight)
+                return changed
+            return False
+        if self.duration is None:
+            return False
+
+        self.starts_at = now - self.duration
+        changed = False
+        # Entries arrive roughly in time order; a late one expires when it reaches the front
+        while self._entries and self._entries[0][0] < self.starts_at:
+            at, key, donor_name, amount = self._entries.popleft()
+            self.count -= 1
+            self.amount -= amount
+            if key:
+                self.ranking.add(key, donor_name, -amount, -1, at)
+            changed = True
+        return changed
+
+    def view(self, top_size: int) -> dict:
+        return {
+            "totals": {"count": self.count, "amount": self.amount / 100, "donors": len(self.ranking)},
+            "top": [standing.to_dict() for standing in self.ranking.top(top_size)],
+        }
+
+    def to_checkpoint(self) -> dict:
+        data = {"starts_at": self.starts_at, "count": self.count, "amount": self.amount}
+        if self.duration is not None:
+            data["entries"] = list(self._entries)
+        else:
+            data["donors"] = [
+                [key, standing.donor_name, standing.amount, standing.count, standing.first_at]
+                for key, standing in self.ranking.items()
+            ]
+        return data
+
+    def load_checkpoint(self, data: dict) -> None:
+        self.reset(data["starts_at"])
+        if self.duration is not None:
+            for at, key, donor_name, amount in data.get("entries", []):
+                self.add(key, donor_name, amount, at)
+            return
+        self.count = data["count"]
+        self.amount = data["amount"]
+        for key, donor_name, amount, count, first_at in data.get("donors", []):
+            self.ranking.add(key, donor_name, amount, count, first_at)
+
+
+class Leaderboard:
+    """
+    Running totals and top donors per time window, updated per donation.
+
+    Each donation is an O(log n) update of every window's ranking, never a
+    scan of history. Rolling windows drop donations as they age and "today"
+    starts over at midnight. After each change only the windows whose totals
+    or top list changed are pushed to "leaderboard" subscribers, and only the
+    parts that changed. Windows other than "stream" are saved to a checkpoint
+    file, so they survive restarts.
+    """
+
+    # How often rolling windows and "today" are moved forward
+    EXPIRE_INTERVAL = 30.0
+
+    def __init__(
+        self,
+        windows: list[str],
+        top_size: int = 10,
+        checkpoint_path: Path | None = None,
+        checkpoint_interval: float = 30.0,
+    ):
+        self._windows: dict[str, LeaderboardWindow] = {}
+        for name in windows:
+            try:
+                self._windows[name] = LeaderboardWindow(name)
+            except ValueError as e:
+                print(f"[Leaderboard] {e}, skipped")
+        self._top_size = top_size
+        self._checkpoint_path = checkpoint_path
+        self._checkpoint_interval = checkpoint_interval
+        self._web_host: "WebHost | None" = None
+
+        # What subscribers have, per window: {"totals": ..., "top": ...}
+        self._published: dict[str, dict] = {}
+        self._dirty = False
+        self._tasks: list[asyncio.Task] = []
+
+    @classmethod
+    def from_config(cls, config: "Config", project_root: Path) -> "Leaderboard":
+        path = None
+        if config.get_leaderboard_checkpoint_file():
+            path = Path(config.get_leaderboard_checkpoint_file())
+            if not path.is_absolute():
+                path = project_root / path
+        return cls(
+            config.get_leaderboard_windows(),
+            top_size=config.get_leaderboard_top_size(),
+            checkpoint_path=path,
+            checkpoint_interval=config.get_leaderboard_checkpoint_interval(),
+        )
+
+    def set_web_host(self, web_host: "WebHost") -> None:
+        """Set web host the changes are pushed through."""
+        self._web_host = web_host
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        now = int(time.time())
+        for window in self._windows.values():
+            window.reset(now if window.name == WINDOW_STREAM else 0)
+        if self._checkpoint_path:
+            await asyncio.to_thread(self._load_checkpoint)
+        for window in self._windows.values():
+            window.expire(now)
+
+        await self._publish()
+        self._tasks = [asyncio.create_task(self._expire_loop())]
+        if self._checkpoint_path:
+            self._tasks.append(asyncio.create_task(self._checkpoint_loop()))
+        print(f"[Leaderboard] Started (windows: {', '.join(self._windows)})")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        if self._checkpoint_path and self._dirty:
+            await self._save_checkpoint()
+
+    async def add_donation(self, donation: "Donation") -> None:
+        """
+        Count donation in every window and push what changed.
+        Test donations (no Monobank id) are shown but not counted.
+        """
+        if donation.tx_id is None:
+            return
+        key = donor_key(donation.donor_name)
+        at = int(donation.timestamp.timestamp())
+        now = int(time.time())
+        changed = False
+        for window in self._windows.values():
+            # First donation after midnight must not land in yesterday's "today"
+            changed = window.expire(now) or changed
+            changed = window.add(key, donation.donor_name or "", donation.amount, at) or changed
+        if changed:
+            self._dirty = True
+            await self._publish()
+
+    def get_view(self) -> dict[str, dict]:
+        """Current totals and top donors of every window."""
+        return {name: window.view(self._top_size) for name, window in self._windows.items()}
+
+    async def _publish(self) -> None:
+        changes = {}
+        for name, window in self._windows.items():
+            view = window.view(self._top_size)
+            published = self._published.get(name, {})
+            diff = {part: value for part, value in view.items() if published.get(part) != value}
+            if diff:
+                changes[name] = diff
+                self._published[name] = view
+        if changes and self._web_host:
+            await self._web_host.publish_leaderboard(changes)
+
+    async def _expire_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.EXPIRE_INTERVAL)
+            now = int(time.time())
+            expired = [window.expire(now) for window in self._windows.values()]
+            if any(expired):
+                self._dirty = True
+                await self._publish()
+
+    async def _checkpoint_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._checkpoint_interval)
+            if self._dirty:
+                await self._save_checkpoint()
+
+    async def _save_checkpoint(self) -> None:
+        self._dirty = False
+        data = {
+            "saved_at": int(time.time()),
+            "windows": {name: window.to_checkpoint() for name, window in self._windows.items() if window.persistent},
+        }
+        try:
+            await asyncio.to_thread(self._write_checkpoint, json.dumps(data, ensure_ascii=False))
+        except Exception as e:
+            self._dirty = True
+            print(f"[Leaderboard] Error saving checkpoint: {e}")
+
+    def _write_checkpoint(self, content: str) -> None:
+        self._checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._checkpoint_path.with_name(self._checkpoint_path.name + ".tmp")
+        tmp_path.write_text(content, encoding="utf-8")
+        os.replace(tmp_path, self._checkpoint_path)
+
+    def _load_checkpoint(self) -> None:
+        if not self._checkpoint_path.exists():
+            return
+        try:
+            data = json.loads(self._checkpoint_path.read_text(encoding="utf-8"))
+            for name, window_data in data.get("windows", {}).items():
+                window = self._windows.get(name)
+                if window and window.persistent:
+                    window.load_checkpoint(window_data)
+        except Exception as e:
+            print(f"[Leaderboard] Error loading checkpoint: {e}")
@@ -0,0 +1,145 @@
+import asyncio
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.leaderboard import Leaderboard, LeaderboardWindow
+from src.leaderboard import leaderboard as leaderboard_module
+from src.notification import Donation
+
+
+class _FakeWebHost:
+    def __init__(self):
+        self.published = []
+
+    async def publish_leaderboard(self, windows: dict) -> None:
+        self.published.append(windows)
+
+
+def _donation(name: str | None, uah: int, tx_id: str | None = "tx", at: float | None = None) -> Donation:
+    return Donation(
+        amount=uah * 100,
+        donor_name=name,
+        timestamp=datetime.fromtimestamp(at if at is not None else time.time()),
+        tx_id=tx_id,
+    )
+
+
+def test_leaderboard_updates():
+    """Test rankings, totals and that only changed parts are pushed."""
+    async def run():
+        web_host = _FakeWebHost()
+        board = Leaderboard(["today", "stream", "all", "1h", "bogus"], top_size=2)
+        board.set_web_host(web_host)
+        await board.start()
+        try:
+            assert list(board.get_view()) == ["today", "stream", "all", "1h"], "Unknown window is skipped"
+            assert set(web_host.published[0]) == {"today", "stream", "all", "1h"}, "Start pushes everything"
+
+            await board.add_donation(_donation("Alice", 100, "tx1"))
+            await board.add_donation(_donation("Bob", 300, "tx2"))
+            await board.add_donation(_donation("alice", 250, "tx3"))
+            await board.add_donation(_donation(None, 50, "tx4"))
+            await board.add_donation(_donation("Test", 1000, tx_id=None))
+
+            view = board.get_view()["all"]
+            assert view["totals"] == {"count": 4, "amount": 700.0, "donors": 2}
+            assert [(d["donor_name"], d["amount"], d["count"]) for d in view["top"]] == [("alice", 350.0, 2), ("Bob", 300.0, 1)]
+
+            # Carol doesn't reach the top 2: only totals change
+            web_host.published.clear()
+            await board.add_donation(_donation("Carol", 10, "tx5"))
+            assert all(set(changes) == {"totals"} for changes in web_host.published[0].values())
+
+            # Old donation counts all-time, not in the last hour
+            await board.add_donation(_donation("Dave", 5000, "tx6", at=time.time() - 7200))
+            assert board.get_view()["all"]["top"][0]["donor_name"] == "Dave"
+            assert board.get_view()["1h"]["top"][0]["donor_name"] == "alice"
+        finally:
+            await board.stop()
+
+    asyncio.run(run())
+    print("[PASS] test_leaderboard_updates")
+
+
+def test_leaderboard_window_expiry():
+    """Test rolling windows dropping old donations and "today" starting over."""
+    now = int(time.time())
+
+    window = LeaderboardWindow("1h")
+    window.expire(now)
+    window.add("a", "A", 1000, now - 1800)
+    window.add("b", "B", 500, now - 600)
+    window.add("a", "A", 200, now - 60)
+    assert window.view(10)["top"][0] == {"donor_name": "A", "amount": 12.0, "count": 2}
+
+    assert window.expire(now + 1900)
+    view = window.view(10)
+    assert view["totals"] == {"count": 2, "amount": 7.0, "donors": 2}
+    assert [d["donor_name"] for d in view["top"]] == ["B", "A"]
+    assert not window.expire(now + 1900), "Nothing more to drop"
+
+    today = LeaderboardWindow("today")
+    today.expire(now)
+    today.add("a", "A", 1000, now)
+    assert today.expire(now + 86400)
+    assert today.view(10)["totals"]["count"] == 0
+
+    # Same results without sortedcontainers
+    has_sorted = leaderboard_module.HAS_SORTEDCONTAINERS
+    leaderboard_module.HAS_SORTEDCONTAINERS = False
+    try:
+        fallback = LeaderboardWindow("all")
+        for i, (key, amount) in enumerate([("a", 100), ("b", 300), ("c", 200), ("a", 250), ("b", -300)]):
+            if amount > 0:
+                fallback.add(key, key.upper(), amount, now + i)
+            else:
+                fallback.ranking.add(key, key.upper(), amount, -1, now + i)
+        assert [d["donor_name"] for d in fallback.view(10)["top"]] == ["A", "C"]
+    finally:
+        leaderboard_module.HAS_SORTEDCONTAINERS = has_sorted
+
+    print("[PASS] test_leaderboard_window_expiry")
+
+
+def test_leaderboard_checkpoint():
+    """Test standings surviving a restart, except the "stream" window."""
+    async def run(path: Path):
+        board = Leaderboard(["stream", "all", "24h"], checkpoint_path=path)
+        await board.start()
+        await board.add_donation(_donation("Alice", 100, "tx1"))
+        await board.add_donation(_donation("Bob", 40, "tx2", at=time.time() - 3600))
+        await board.stop()
+        assert path.exists()
+
+        restarted = Leaderboard(["stream", "all", "24h"], checkpoint_path=path)
+        await restarted.start()
+        try:
+            view = restarted.get_view()
+            assert view["all"] == board.get_view()["all"]
+            assert view["24h"]["totals"] == {"count": 2, "amount": 140.0, "donors": 2}
+            assert view["stream"]["totals"]["count"] == 0
+        finally:
+            await restarted.stop()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(Path(tmp) / "data" / "leaderboard.json"))
+
+    print("[PASS] test_leaderboard_checkpoint")
+
+
+if __name__ == "__main__":
+    print("Leaderboard Tests")
+    print("=" * 50 + "\n")
+
+    test_leaderboard_updates()
+    test_leaderboard_window_expiry()
+    test_leaderboard_checkpoint()
+
+    print("\nAll Leaderboard tests passed!")
@@ -1,3 +1,4 @@
 from .media_player import MediaPlayer, MediaSelection
+from .transcoder import MediaTranscoder, MediaVariants
 
-__all__ = ["MediaPlayer", "MediaSelection"]
+__all__ = ["MediaPlayer", "MediaSelection", "MediaTranscoder", "MediaVariants"]
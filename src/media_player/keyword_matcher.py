@@ -0,0 +1,181 @@
+import re
+from collections import deque
+
+# Backreferences and group conditionals: group numbers shift once patterns are merged
+_GROUP_REFERENCE = re.compile(r"\\[1-9]|\(\?P=|\(\?\(")
+
+
+class KeywordMatcher:
+    """
+    Match many comment triggers in a single pass.
+
+    Plain keywords are compiled into an Aho-Corasick automaton, so scanning a
+    comment costs O(len(comment) + matches) no matter how many keywords exist.
+    Regex patterns are merged into one expression scanned once: every pattern
+    is a named lookahead group, so patterns matching at the same position or
+    overlapping each other are all reported. Patterns that can't be merged
+    (inline global flags, group names, backreferences) are searched on
+    their own. Every trigger is tagged with the index of the rule it belongs to.
+    """
+
+    def __init__(self):
+        # Automaton: goto transitions, failure links and outputs per node.
+        # Outputs are (rule_index, keyword_length) pairs.
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[tuple[int, int]]] = [[]]
+        self._keywords: list[str] = []
+
+        self._patterns: list[tuple[str, int]] = []
+        # Built from _patterns: merged expression, rule index per group name, and the rest
+        self._merged: re.Pattern | None = None
+        self._group_rules: dict[str, int] = {}
+        self._merged_rules: set[int] = set()
+        self._separate: list[tuple[re.Pattern, int]] = []
+
+        self._built = False
+
+    def add_keyword(self, keyword: str, rule_index: int) -> None:
+        """Add keyword trigger (case-insensitive, whole words)."""
+        keyword = keyword.strip().casefold()
+        if not keyword:
+            return
+
+        node = 0
+        for char in keyword:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[node][char] = next_node
+            node = next_node
+
+        self._out[node].append((rule_index, len(keyword)))
+        self._keywords.append(keyword)
+        self._built = False
+
+    def add_pattern(self, pattern: str, rule_index: int) -> None:
+        """Add regex trigger (case-insensitive). Raises re.error on invalid patterns."""
+        re.compile(pattern, re.IGNORECASE)
+        self._patterns.append((pattern, rule_index))
+        self._built = False
+
+    def build(self) -> None:
+        """Compute failure links of the keyword automaton and merge regex patterns."""
+        self._build_patterns()
+
+        # Breadth-first pass over the trie to fill failure links
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            queue.append(child)
+
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+
+                # Inherit outputs of the longest proper suffix
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+        self._built = True
+
+    def _build_patterns(self) -> None:
+        mergeable: list[tuple[str, int]] = []
+        self._separate = []
+        for pattern, rule_index in self._patterns:
+            if self._is_mergeable(pattern):
+                mergeable.append((pattern, rule_index))
+            else:
+                self._separate.append((re.compile(pattern, re.IGNORECASE), rule_index))
+
+        self._merged = None
+        self._group_rules = {}
+        self._merged_rules = set()
+        if not mergeable:
+            return
+        # Guard finds positions where any pattern matches; there the optional
+        # lookaheads tell which ones do, each starting at that position
+        guard = "|".join(f"(?:{pattern})" for pattern, _ in mergeable)
+        groups = []
+        for position, (pattern, rule_index) in enumerate(mergeable):
+            name = f"r{position}"
+            self._group_rules[name] = rule_index
+            groups.append(f"(?:(?=(?P<{name}>{pattern})))?")
+        try:
+            self._merged = re.compile(f"(?=(?:{guard})){''.join(groups)}", re.IGNORECASE)
+            self._merged_rules = set(self._group_rules.values())
+        except re.error:
+            self._group_rules = {}
+            self._separate += [(re.compile(pattern, re.IGNORECASE), rule_index) for pattern, rule_index in mergeable]
+
+    @staticmethod
+    def _is_mergeable(pattern: str) -> bool:
+        if _GROUP_REFERENCE.search(pattern):
+            return False
+        try:
+            # Global flags are only valid at the start, named groups only once
+            re.compile(f"x(?:{pattern})(?:{pattern})")
+        except re.error:
+            return False
+        return True
+
+    def match(self, text: str | None) -> set[int]:
+        """Return indexes of all rules that have a trigger in text."""
+        if not text:
+            return set()
+
+        if not self._built:
+            self.build()
+
+        matched: set[int] = set()
+
+        if self._keywords:
+            folded = text.casefold()
+            goto = self._goto
+            fail = self._fail
+            out = self._out
+            node = 0
+
+            for pos, char in enumerate(folded):
+                while node and char not in goto[node]:
+                    node = fail[node]
+                node = goto[node].get(char, 0)
+
+                for rule_index, length in out[node]:
+                    if rule_index not in matched and self._is_whole_word(folded, pos - length + 1, pos + 1):
+                        matched.add(rule_index)
+
+        if self._merged is not None:
+            group_rules = self._group_rules
+            for found in self._merged.finditer(text):
+                for name, value in found.groupdict().items():
+                    if value is not None:
+                        matched.add(group_rules[name])
+                if self._merged_rules <= matched:
+                    break
+
+        for regex, rule_index in self._separate:
+            if rule_index not in matched and regex.search(text):
+                matched.add(rule_index)
+
+        return matched
+
+    @staticmethod
+    def _is_whole_word(text: str, start: int, end: int) -> bool:
+        """Check that match is not glued to letters or digits on either side."""
+        if start > 0 and text[start].isalnum() and text[start - 1].isalnum():
+            return False
+        if end < len(text) and text[end - 1].isalnum() and text[end].isalnum():
+            return False
+        return True
+
+    def is_empty(self) -> bool:
+        return not self._keywords and not self._patterns
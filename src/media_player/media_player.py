@@ -1,10 +1,16 @@
+import asyncio
 import random
+import re
 from dataclasses import dataclass
 from pathlib import Path
 from typing import TYPE_CHECKING
 
+from .keyword_matcher import KeywordMatcher
+from .rotation import MediaRotation
+
 if TYPE_CHECKING:
     from src.config import Config
+    from src.config.config import MediaRule
 
 IMAGE_EXTENSIONS = {".gif", ".png", ".jpg", ".jpeg", ".webp"}
 AUDIO_EXTENSIONS = {".mp3", ".wav", ".ogg", ".m4a"}
@@ -17,6 +23,9 @@ class MediaSelection:
 
 
 class MediaPlayer:
+    # Rotation state is saved at most this often (seconds), not on every pick
+    ROTATION_SAVE_INTERVAL = 5.0
+
     def __init__(self, config: "Config", project_root: Path | None = None):
         self._config = config
         self._project_root = project_root or Path.cwd()
@@ -24,8 +33,45 @@ class MediaPlayer:
         self._images: list[str] = []
         self._audio: list[str] = []
 
+        # Keyword matcher is rebuilt only when config rules change
+        self._matcher: KeywordMatcher | None = None
+        self._matcher_rules: list["MediaRule"] | None = None
+
+        # Shuffle bags per rule, so the same file doesn't play twice in a row
+        rotation_file = self._config.get_rotation_file()
+        state_path = None
+        if rotation_file:
+            state_path = Path(rotation_file)
+            if not state_path.is_absolute():
+                state_path = self._project_root / state_path
+        self._rotation = MediaRotation(state_path)
+        self._save_task: asyncio.Task | None = None
+
         self.reload_media_list()
 
+    async def start(self) -> None:
+        """Start saving rotation state in the background."""
+        if self._save_task is None:
+            self._save_task = asyncio.create_task(self._save_loop())
+
+    async def stop(self) -> None:
+        """Stop background saving and save what is left."""
+        if self._save_task:
+            self._save_task.cancel()
+            try:
+                await self._save_task
+            except asyncio.CancelledError:
+                pass
+            self._save_task = None
+        if self._rotation.dirty:
+            await self._rotation.save_async()
+
+    async def _save_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.ROTATION_SAVE_INTERVAL)
+            if self._rotation.dirty:
+                await self._rotation.save_async()
+
     def _get_media_path(self) -> Path:
         """Get absolute path to media folder."""
         media_path = Path(self._config.get_media_path())
@@ -33,6 +79,10 @@ class MediaPlayer:
             media_path = self._project_root / media_path
         return media_path.resolve()
 
+    def get_media_path(self) -> Path:
+        """Get absolute path to media folder."""
+        return self._get_media_path()
+
     def reload_media_list(self) -> None:
         """Scan media folder and reload file lists."""
         media_path = self._get_media_path()
@@ -69,35 +119,106 @@ class MediaPlayer:
             return None
         return random.choice(self._audio)
 
-    def select_media(self, amount: int | None = None) -> MediaSelection | None:
+    def _get_matcher(self, rules: list["MediaRule"]) -> KeywordMatcher:
+        """Get keyword matcher for current rules, building it on first use."""
+        if self._matcher is None or self._matcher_rules is not rules:
+            matcher = KeywordMatcher()
+            for index, rule in enumerate(rules):
+                for keyword in rule.keywords:
+                    matcher.add_keyword(keyword, index)
+                for pattern in rule.patterns:
+                    try:
+                        matcher.add_pattern(pattern, index)
+                    except re.error as e:
+                        # Dropped: the rule's other triggers still work
+                        print(f"[MediaPlayer] Invalid pattern '{pattern}' in rule {index}: {e}")
+            matcher.build()
+
+            self._matcher = matcher
+            self._matcher_rules = rules
+        return self._matcher
+
+    @staticmethod
+    def _amount_matches(rule: "MediaRule", amount: int | None) -> bool:
+        """Check amount against rule bounds."""
+        if amount is None:
+            return False
+        if rule.min_amount > amount:
+            return False
+        return rule.max_amount is None or amount <= rule.max_amount
+
+    def _find_keyword_rule(
+        self,
+        rules: list["MediaRule"],
+        amount: int | None,
+        comment: str | None,
+    ) -> int | None:
+        """Find index of first keyword rule triggered by comment (amount bounds still apply)."""
+        if not comment:
+            return None
+
+        matcher = self._get_matcher(rules)
+        if matcher.is_empty():
+            return None
+
+        for index in sorted(matcher.match(comment)):
+            # Keyword rules without amount set match any amount
+            if amount is None or self._amount_matches(rules[index], amount):
+                return index
+        return None
+
+    def _find_amount_rule(self, rules: list["MediaRule"], amount: int | None) -> int | None:
+        """Find index of first amount-only rule matching donation amount."""
+        for index, rule in enumerate(rules):
+            if not rule.is_keyword_rule and self._amount_matches(rule, amount):
+                return index
+        return None
+
+    def _media_from_rule(self, rule: "MediaRule", index: int) -> MediaSelection | None:
+        image = self._rotation.draw(f"rule{index}:images", rule.images, rule.image_weights, rule.no_repeat)
+        audio = self._rotation.draw(f"rule{index}:sounds", rule.sounds, rule.sound_weights, rule.no_repeat)
+
+        image = image or self.get_random_image()
+        audio = audio or self.get_random_audio()
+
+        if not image:
+            return None
+        return MediaSelection(image_path=image, audio_path=audio)
+
+    def select_media(self, amount: int | None = None, comment: str | None = None) -> MediaSelection | None:
         """
-        Select media based on donation amount.
-        If amount is None or no rules match, use random selection.
+        Select media based on donation amount and comment.
+        Keyword rules are matched against comment, amount rules against amount.
+        media.trigger_priority decides which kind wins when both match.
+        Files within a rule rotate through a shuffle bag (see MediaRotation).
+        If nothing matches, use random selection.
         Amount is in kopecks (1 UAH = 100 kopecks).
         """
         rules = self._config.get_media_rules()
 
-        # Try to find matching rule
-        if amount is not None and rules:
-            for rule in rules:
-                if rule.min_amount <= amount:
-                    if rule.max_amount is None or amount <= rule.max_amount:
-                        # Found matching rule
-                        image = random.choice(rule.images) if rule.images else self.get_random_image()
-                        audio = random.choice(rule.sounds) if rule.sounds else self.get_random_audio()
-
-                        if image:
-                            return MediaSelection(image_path=image, audio_path=audio)
-
-        # Fallback to random selection
-        image = self.get_random_image()
+        if rules:
+            if self._config.get_trigger_priority() == "amount":
+                index = self._find_amount_rule(rules, amount)
+                if index is None:
+                    index = self._find_keyword_rule(rules, amount, comment)
+            else:
+                index = self._find_keyword_rule(rules, amount, comment)
+                if index is None:
+                    index = self._find_amount_rule(rules, amount)
+
+            if index is not None:
+                selection = self._media_from_rule(rules[index], index)
+                if selection:
+                    return selection
+
+        # Fallback to rotation over whole media folder
+        image = self._rotation.draw("fallback:images", self._images)
         if not image:
             return None
 
-        return MediaSelection(
-            image_path=image,
-            audio_path=self.get_random_audio()
-        )
+        audio = self._rotation.draw("fallback:sounds", self._audio)
+
+        return MediaSelection(image_path=image, audio_path=audio)
 
     def get_all_images(self) -> list[str]:
         """Get list of all images."""
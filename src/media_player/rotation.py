@@ -0,0 +1,202 @@
+import asyncio
+import hashlib
+import json
+import random
+from collections import deque
+from pathlib import Path
+
+
+class ShuffleBag:
+    """
+    Weighted shuffle bag with a "no repeat within last K draws" window.
+
+    Every item goes into the bag `weight` times, the bag is shuffled and
+    drawn from the end. When it runs out it is refilled and shuffled again.
+    Draws are O(1); the recent window only swaps the next item with a random
+    one still in the bag.
+    """
+
+    MAX_SWAP_ATTEMPTS = 8
+
+    def __init__(
+        self,
+        items: list[str],
+        weights: list[int] | None = None,
+        no_repeat: int = 1,
+        rng: random.Random | None = None,
+    ):
+        self._items = list(items)
+        self._weights = self._normalize_weights(items, weights)
+        self._rng = rng or random.Random()
+
+        # Window can't cover every distinct item, otherwise nothing is drawable
+        window = max(0, min(no_repeat, len(set(self._items)) - 1))
+        self._recent: deque[str] = deque(maxlen=window or None)
+        self._window = window
+
+        self._bag: list[str] = []
+
+    @staticmethod
+    def _normalize_weights(items: list[str], weights: list[int] | None) -> list[int]:
+        if not weights:
+            return [1] * len(items)
+        # Missing weights default to 1, weight 0 disables item
+        return [max(0, int(weights[i])) if i < len(weights) else 1 for i in range(len(items))]
+
+    @property
+    def signature(self) -> str:
+        """Hash of items, weights and window - state is reset when it changes."""
+        raw = json.dumps([self._items, self._weights, self._window], ensure_ascii=False)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _new_round(self) -> list[str]:
+        bag = [item for item, weight in zip(self._items, self._weights) for _ in range(weight)]
+        self._rng.shuffle(bag)
+        return bag
+
+    def _swap_non_recent_to_top(self) -> bool:
+        """Move some item that isn't in recent window to the end of bag."""
+        bag = self._bag
+        for _ in range(min(len(bag), self.MAX_SWAP_ATTEMPTS)):
+            i = self._rng.randrange(len(bag))
+            if bag[i] not in self._recent:
+                bag[i], bag[-1] = bag[-1], bag[i]
+                return True
+
+        # Few eligible items left - fall back to a scan
+        for i in range(len(bag) - 1, -1, -1):
+            if bag[i] not in self._recent:
+                bag[i], bag[-1] = bag[-1], bag[i]
+                return True
+        return False
+
+    def draw(self) -> str | None:
+        """Draw next item."""
+        if not self._bag:
+            self._bag = self._new_round()
+            if not self._bag:
+                return None
+
+        if self._window and self._bag[-1] in self._recent:
+            if not self._swap_non_recent_to_top():
+                # Everything left was played recently - start next round early
+                self._bag = self._new_round() + self._bag
+                self._swap_non_recent_to_top()
+
+        item = self._bag.pop()
+        if self._window:
+            self._recent.append(item)
+        return item
+
+    def to_dict(self) -> dict:
+        return {
+            "signature": self.signature,
+            "bag": list(self._bag),  # Copy: may be written from a worker thread
+            "recent": list(self._recent),
+        }
+
+    def load_dict(self, data: dict) -> bool:
+        """Restore state saved by to_dict(). Returns False if items changed."""
+        if data.get("signature") != self.signature:
+            return False
+
+        known = set(self._items)
+        self._bag = [item for item in data.get("bag", []) if item in known]
+        self._recent.clear()
+        if self._window:
+            self._recent.extend(item for item in data.get("recent", []) if item in known)
+        return True
+
+
+class MediaRotation:
+    """
+    Keeps shuffle bags per rule and persists them to a JSON file.
+    Draws only mark the state dirty; the owner saves it off the event loop
+    with save_async() (see MediaPlayer.start).
+    """
+
+    def __init__(self, state_file: Path | None = None):
+        self._state_file = state_file
+        self._bags: dict[str, ShuffleBag] = {}
+        self._sources: dict[str, tuple[list[str], list[int] | None, int]] = {}
+        self._saved: dict[str, dict] = {}
+        # Drawn since last save
+        self.dirty = False
+
+        self.load()
+
+    def load(self) -> None:
+        """Load saved bag states from file."""
+        self._saved = {}
+        if not self._state_file or not self._state_file.exists():
+            return
+
+        try:
+            with open(self._state_file, "r", encoding="utf-8") as f:
+                self._saved = json.load(f)
+        except Exception as e:
+            print(f"[MediaRotation] Error loading state: {e}")
+            self._saved = {}
+
+    def save(self) -> None:
+        """Save bag states to file (blocking)."""
+        if not self._state_file:
+            return
+        self.dirty = False
+        if not self._write(self._snapshot()):
+            self.dirty = True
+
+    async def save_async(self) -> None:
+        """Save bag states to file in a worker thread; the state is copied first."""
+        if not self._state_file:
+            return
+        self.dirty = False
+        if not await asyncio.to_thread(self._write, self._snapshot()):
+            self.dirty = True
+
+    def _snapshot(self) -> dict:
+        data = dict(self._saved)
+        data.update({key: bag.to_dict() for key, bag in self._bags.items()})
+        return data
+
+    def _write(self, data: dict) -> bool:
+        try:
+            tmp_path = self._state_file.with_suffix(self._state_file.suffix + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            tmp_path.replace(self._state_file)
+            return True
+        except Exception as e:
+            print(f"[MediaRotation] Error saving state: {e}")
+            return False
+
+    def draw(
+        self,
+        key: str,
+        items: list[str],
+        weights: list[int] | None = None,
+        no_repeat: int = 1,
+    ) -> str | None:
+        """
+        Draw next item from bag identified by key.
+        The new state is persisted by the next save.
+        """
+        if not items:
+            return None
+
+        # Config lists are replaced on reload, so identity tells if the rule changed
+        bag = self._bags.get(key)
+        source = self._sources.get(key)
+
+        if bag is None or source is None or source[0] is not items or source[1] is not weights or source[2] != no_repeat:
+            candidate = ShuffleBag(items, weights, no_repeat)
+            if bag is None or bag.signature != candidate.signature:
+                saved = self._saved.pop(key, None)
+                if saved:
+                    candidate.load_dict(saved)
+                bag = candidate
+                self._bags[key] = bag
+            self._sources[key] = (items, weights, no_repeat)
+
+        self.dirty = True
+        return bag.draw()
@@ -219,6 +219,225 @@ def test_rule_boundaries():
         Path(temp_config_path).unlink()
 
 
+def test_keyword_matcher():
+    """Test multi-pattern keyword matcher."""
+    import re
+    from src.media_player.keyword_matcher import KeywordMatcher
+
+    matcher = KeywordMatcher()
+    matcher.add_keyword("gg", 0)
+    matcher.add_keyword("Dota", 1)
+    matcher.add_keyword("he", 2)
+    matcher.add_keyword("she", 3)
+    matcher.add_pattern(r"слава\s+україні", 4)
+    matcher.build()
+
+    assert matcher.match("GG wp") == {0}
+    assert matcher.match("eggs") == set(), "Keyword must match whole words only"
+    assert matcher.match("playing dota tonight") == {1}
+    assert matcher.match("she") == {3}, "Overlapping suffix must respect word boundaries"
+    assert matcher.match("Слава   Україні!") == {4}
+    assert matcher.match("gg, she said: dota") == {0, 1, 3}
+    assert matcher.match("") == set()
+    assert matcher.match(None) == set()
+
+    # Patterns valid on their own stay valid together; overlapping matches all count
+    matcher = KeywordMatcher()
+    matcher.add_pattern(r"(?i)gg", 0)
+    matcher.add_pattern(r"(?P<word>world)", 1)
+    matcher.add_pattern(r"hello (?P<word>world)", 2)
+    matcher.add_pattern(r"(a)\1", 3)
+    try:
+        matcher.add_pattern(r"x(?i)", 4)
+        assert False, "Invalid pattern accepted"
+    except re.error:
+        pass
+    assert matcher.match("hello world") == {1, 2}
+    assert matcher.match("GG aa") == {0, 3}
+    assert [rule for _, rule in matcher._separate] == [0, 1, 2, 3], "Flags, group names and backreferences stay separate"
+
+    # Merged patterns: overlapping and same-position triggers all match in one scan
+    matcher = KeywordMatcher()
+    for index, pattern in enumerate([r"^gg", r"^g", r"g+\b", r"\bgg wp", r"wp$", r"(g)(g)"]):
+        matcher.add_pattern(pattern, index)
+    matcher.add_pattern(r"(?i:WP)", 6)
+    matcher.build()
+    assert matcher._separate == [] and matcher._merged is not None
+    assert matcher.match("GG wp") == {0, 1, 2, 3, 4, 5, 6}
+    assert matcher.match("a gg") == {2, 5}
+    assert matcher.match("hello") == set()
+
+    print("[PASS] test_keyword_matcher")
+
+
+def test_keyword_rule_priority():
+    """Test keyword rules against amount rules with both priorities."""
+    import tempfile
+    import yaml
+
+    def make_config(priority: str) -> str:
+        config_data = {
+            "server": {"port": 8080},
+            "monobank": {"token": "test", "jar_id": "test", "poll_interval": 60},
+            "media": {
+                "path": "./media",
+                "default_duration": 5000,
+                "trigger_priority": priority,
+                "rules": [
+                    {"min": 0, "max": None, "images": ["video/amount.gif"], "sounds": ["audio/amount.mp3"]},
+                    {"keywords": ["бебра", "sus"], "images": ["video/meme.gif"], "sounds": ["audio/meme.mp3"]},
+                    {"min": 10000, "patterns": [r"^!big\b"], "images": ["video/big.gif"]},
+                    {"patterns": [r"x(?i)", r"(?i)!rare"], "images": ["video/rare.gif"]},
+                ],
+            },
+        }
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".yaml", delete=False) as f:
+            yaml.dump(config_data, f)
+            return f.name
+
+    keyword_path = make_config("keyword")
+    amount_path = make_config("amount")
+
+    try:
+        player = MediaPlayer(Config(keyword_path), project_root=PROJECT_ROOT)
+
+        assert player.select_media(1000, "Бебра!").image_path == "video/meme.gif"
+        assert player.select_media(1000, "so SUS").image_path == "video/meme.gif"
+        assert player.select_media(1000, "hello").image_path == "video/amount.gif"
+        assert player.select_media(1000, None).image_path == "video/amount.gif"
+
+        # Amount bounds still apply to keyword rules
+        assert player.select_media(20000, "!big wow").image_path == "video/big.gif"
+        assert player.select_media(5000, "!big wow").image_path == "video/amount.gif"
+
+        # Invalid pattern is dropped, the rule's valid one still works
+        assert player.select_media(1000, "!RARE").image_path == "video/rare.gif"
+
+        player = MediaPlayer(Config(amount_path), project_root=PROJECT_ROOT)
+        assert player.select_media(1000, "бебра").image_path == "video/amount.gif"
+
+        print("[PASS] test_keyword_rule_priority")
+    finally:
+        Path(keyword_path).unlink()
+        Path(amount_path).unlink()
+
+
+def test_shuffle_bag_rotation():
+    """Test shuffle bag: no repeats within window, weights and persisted state."""
+    import asyncio
+    import random
+    import tempfile
+    from src.media_player.rotation import ShuffleBag, MediaRotation
+
+    items = ["a.gif", "b.gif", "c.gif"]
+
+    # No item repeats within last 2 draws
+    bag = ShuffleBag(items, no_repeat=2, rng=random.Random(1))
+    draws = [bag.draw() for _ in range(300)]
+    for i in range(2, len(draws)):
+        assert draws[i] not in draws[i - 2:i], f"Repeat within window at {i}: {draws[i - 2:i + 1]}"
+
+    # Weights are respected over full bags
+    bag = ShuffleBag(items, weights=[3, 1, 0], no_repeat=0, rng=random.Random(2))
+    draws = [bag.draw() for _ in range(400)]
+    assert draws.count("a.gif") == 300
+    assert draws.count("b.gif") == 100
+    assert draws.count("c.gif") == 0
+
+    # Single item with window still works
+    assert ShuffleBag(["only.gif"], no_repeat=3).draw() == "only.gif"
+
+    # State persists across instances
+    with tempfile.TemporaryDirectory() as tmp:
+        state_file = Path(tmp) / "rotation.json"
+        rotation = MediaRotation(state_file)
+        first = [rotation.draw("rule0:images", items) for _ in range(2)]
+        assert rotation.dirty and not state_file.exists(), "Draws don't write the file"
+        asyncio.run(rotation.save_async())
+        assert not rotation.dirty and state_file.exists()
+
+        restored = MediaRotation(state_file)
+        third = restored.draw("rule0:images", items)
+        assert sorted(first + [third]) == sorted(items), "Restored bag should continue, not restart"
+
+    print("[PASS] test_shuffle_bag_rotation")
+
+
+def test_transcoder_variants():
+    """Test transcoder with a stub ffmpeg: variants are named by content hash."""
+    import asyncio
+    import hashlib
+    import os
+    import stat
+    import tempfile
+    import yaml
+    from src.media_player.transcoder import MediaTranscoder
+
+    if os.name == "nt":
+        print("[SKIP] test_transcoder_variants - shell stub needs POSIX")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = Path(tmp)
+        (tmp_path / "media" / "video").mkdir(parents=True)
+        gif = tmp_path / "media" / "video" / "big.gif"
+        gif.write_bytes(b"GIF89a" + b"\0" * 4096)
+
+        # Stub writes a tiny file to the last argument (output path)
+        ffmpeg = tmp_path / "ffmpeg"
+        ffmpeg.write_text('#!/bin/sh\nfor last; do :; done\nprintf x > "$last"\n')
+        ffmpeg.chmod(ffmpeg.stat().st_mode | stat.S_IEXEC)
+
+        config_path = tmp_path / "config.yaml"
+        config_path.write_text(yaml.dump({
+            "media": {"path": "./media", "ffmpeg_path": str(ffmpeg), "rotation_file": ""},
+        }))
+
+        config = Config(str(config_path))
+        player = MediaPlayer(config, project_root=tmp_path)
+        transcoder = MediaTranscoder(config, player, project_root=tmp_path)
+        assert transcoder.is_available()
+
+        async def run():
+            await transcoder.start()
+            await transcoder._task
+
+        asyncio.run(run())
+
+        content_hash = hashlib.sha256(gif.read_bytes()).hexdigest()
+        variants = transcoder.get_variants("video/big.gif")
+        assert variants is not None
+        assert variants.webm == f"{content_hash}.webm"
+        assert variants.mp4 == f"{content_hash}.mp4"
+        assert variants.poster == f"{content_hash}.png"
+        assert (tmp_path / "media_cache" / variants.webm).exists()
+
+        # Hung ffmpeg: killed on timeout and on stop, its temp output removed
+        (tmp_path / "media" / "video" / "other.gif").write_bytes(b"GIF89a" + b"\1" * 4096)
+        ffmpeg.write_text('#!/bin/sh\nfor last; do :; done\nprintf x > "$last"\nexec sleep 30\n')
+        player.reload_media_list()
+
+        async def run_hung():
+            hung = MediaTranscoder(config, player, project_root=tmp_path)
+            hung.FFMPEG_TIMEOUT = 0.3
+            await hung.start()
+            await hung._task
+            assert not hung.get_variants("video/other.gif").has_video()
+
+            hung.FFMPEG_TIMEOUT = 30
+            hung._variants.clear()
+            for name in ("webm", "mp4", "png"):
+                (tmp_path / "media_cache" / f"{content_hash}.{name}").unlink()
+            await hung.start()
+            await asyncio.sleep(0.3)
+            await hung.stop()
+
+        asyncio.run(run_hung())
+        assert not list((tmp_path / "media_cache").glob("tmp-*")), "Temp output left in the cache"
+
+    print("[PASS] test_transcoder_variants")
+
+
 if __name__ == "__main__":
     test_reload_media_list()
     test_random_selection()
@@ -227,4 +446,8 @@ if __name__ == "__main__":
     test_get_random_audio()
     test_amount_based_rule_selection()
     test_rule_boundaries()
+    test_keyword_matcher()
+    test_keyword_rule_priority()
+    test_shuffle_bag_rotation()
+    test_transcoder_variants()
     print("\nAll MediaPlayer tests passed!")
@@ -0,0 +1,223 @@
+import asyncio
+import hashlib
+import json
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.config import Config
+    from .media_player import MediaPlayer
+
+# Only animated formats benefit from video variants
+TRANSCODE_EXTENSIONS = {".gif"}
+
+
+@dataclass
+class MediaVariants:
+    """Transcoded variants of one media image (file names inside cache dir)."""
+    content_hash: str
+    webm: str | None = None
+    mp4: str | None = None
+    poster: str | None = None
+
+    def has_video(self) -> bool:
+        return bool(self.webm or self.mp4)
+
+
+class MediaTranscoder:
+    """
+    Background GIF -> WebM/MP4 transcoding with ffmpeg.
+
+    Variants are stored in the cache folder under the SHA-256 of the source
+    file, so renamed or duplicated GIFs are transcoded once and edited GIFs
+    get fresh variants. Without ffmpeg the transcoder does nothing and
+    overlays keep using the original images.
+    """
+
+    MANIFEST_NAME = "manifest.json"
+    # ffmpeg still running after this long is killed, so one file can't hold up the rest
+    FFMPEG_TIMEOUT = 300.0
+
+    def __init__(self, config: "Config", media_player: "MediaPlayer", project_root: Path | None = None):
+        self._config = config
+        self._media_player = media_player
+        self._project_root = project_root or Path.cwd()
+
+        self._ffmpeg = self._find_ffmpeg()
+        self._cache_dir = self._resolve(self._config.get_transcode_cache())
+
+        # rel_path -> {"mtime", "size", "hash"} to avoid rehashing unchanged files
+        self._hashes: dict[str, dict] = {}
+        self._variants: dict[str, MediaVariants] = {}
+
+        self._task: asyncio.Task | None = None
+
+    def _resolve(self, path: str) -> Path:
+        result = Path(path)
+        if not result.is_absolute():
+            result = self._project_root / result
+        return result.resolve()
+
+    def _find_ffmpeg(self) -> str | None:
+        configured = self._config.get_ffmpeg_path()
+        if configured:
+            return configured if Path(configured).exists() else shutil.which(configured)
+        return shutil.which("ffmpeg")
+
+    def is_available(self) -> bool:
+        return self._ffmpeg is not None and self._config.is_transcode_enabled()
+
+    def get_cache_dir(self) -> Path:
+        return self._cache_dir
+
+    def get_variants(self, rel_path: str) -> MediaVariants | None:
+        """Get ready variants for media image, None if not transcoded (yet)."""
+        return self._variants.get(rel_path)
+
+    async def start(self) -> None:
+        """Start transcoding all media images in background."""
+        if not self.is_available():
+            if self._config.is_transcode_enabled():
+                print("[MediaTranscoder] ffmpeg not found, serving original images")
+            return
+        if self._task and not self._task.done():
+            return
+
+        self._cache_dir.mkdir(parents=True, exist_ok=True)
+        self._load_manifest()
+        self._task = asyncio.create_task(self._transcode_all())
+        print(f"[MediaTranscoder] Started (ffmpeg: {self._ffmpeg})")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _load_manifest(self) -> None:
+        manifest = self._cache_dir / self.MANIFEST_NAME
+        if not manifest.exists():
+            return
+        try:
+            with open(manifest, "r", encoding="utf-8") as f:
+                self._hashes = json.load(f)
+        except Exception as e:
+            print(f"[MediaTranscoder] Error loading manifest: {e}")
+            self._hashes = {}
+
+    def _save_manifest(self) -> None:
+        try:
+            with open(self._cache_dir / self.MANIFEST_NAME, "w", encoding="utf-8") as f:
+                json.dump(self._hashes, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"[MediaTranscoder] Error saving manifest: {e}")
+
+    def _content_hash(self, rel_path: str, file: Path) -> str:
+        """Get SHA-256 of file, reusing manifest entry if file is unchanged."""
+        stat = file.stat()
+        cached = self._hashes.get(rel_path)
+        if cached and cached.get("mtime") == stat.st_mtime and cached.get("size") == stat.st_size:
+            return cached["hash"]
+
+        digest = hashlib.sha256()
+        with open(file, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+
+        content_hash = digest.hexdigest()
+        self._hashes[rel_path] = {"mtime": stat.st_mtime, "size": stat.st_size, "hash": content_hash}
+        return content_hash
+
+    async def _transcode_all(self) -> None:
+        media_path = self._media_player.get_media_path()
+
+        for rel_path in self._media_player.get_all_images():
+            if Path(rel_path).suffix.lower() not in TRANSCODE_EXTENSIONS:
+                continue
+            try:
+                await self._transcode_one(rel_path, media_path / rel_path)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[MediaTranscoder] Error transcoding {rel_path}: {e}")
+
+        self._save_manifest()
+        ready = sum(1 for v in self._variants.values() if v.has_video())
+        print(f"[MediaTranscoder] {ready} image(s) have video variants")
+
+    async def _transcode_one(self, rel_path: str, source: Path) -> None:
+        content_hash = await asyncio.to_thread(self._content_hash, rel_path, source)
+        source_size = source.stat().st_size
+
+        variants = MediaVariants(content_hash=content_hash)
+
+        targets = [
+            # VP9 keeps the alpha channel, so transparent GIFs stay transparent
+            ("webm", f"{content_hash}.webm", [
+                "-c:v", "libvpx-vp9", "-b:v", "0", "-crf", "38",
+                "-pix_fmt", "yuva420p", "-row-mt", "1", "-an",
+            ]),
+            ("mp4", f"{content_hash}.mp4", [
+                "-c:v", "libx264", "-crf", "26", "-preset", "slow",
+                "-pix_fmt", "yuv420p", "-movflags", "+faststart",
+                "-vf", "scale=trunc(iw/2)*2:trunc(ih/2)*2", "-an",
+            ]),
+            ("poster", f"{content_hash}.png", ["-frames:v", "1"]),
+        ]
+
+        for attr, name, args in targets:
+            output = self._cache_dir / name
+            if not output.exists():
+                if not await self._run_ffmpeg(source, output, args):
+                    continue
+
+            # A video that isn't smaller than the GIF isn't worth serving
+            if attr != "poster" and output.stat().st_size >= source_size:
+                continue
+            setattr(variants, attr, name)
+
+        self._variants[rel_path] = variants
+
+    async def _run_ffmpeg(self, source: Path, output: Path, args: list[str]) -> bool:
+        # Write to temp file first so a half-written variant is never served
+        tmp_output = output.with_name(f"tmp-{output.name}")
+        process = await asyncio.create_subprocess_exec(
+            self._ffmpeg, "-y", "-loglevel", "error", "-i", str(source), *args, str(tmp_output),
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            _, stderr = await asyncio.wait_for(process.communicate(), self.FFMPEG_TIMEOUT)
+        except asyncio.TimeoutError:
+            await self._discard(process, tmp_output)
+            print(f"[MediaTranscoder] ffmpeg timed out for {source.name} -> {output.suffix}")
+            return False
+        except (asyncio.CancelledError, Exception):
+            # Stopped mid-transcode: no ffmpeg left running, no temp file left in the cache
+            await self._discard(process, tmp_output)
+            raise
+
+        if process.returncode != 0 or not tmp_output.exists():
+            print(f"[MediaTranscoder] ffmpeg failed for {source.name} -> {output.suffix}: "
+                  f"{stderr.decode(errors='replace').strip()[:200]}")
+            tmp_output.unlink(missing_ok=True)
+            return False
+
+        tmp_output.replace(output)
+        print(f"[MediaTranscoder] Created {output.name} from {source.name}")
+        return True
+
+    @staticmethod
+    async def _discard(process: asyncio.subprocess.Process, tmp_output: Path) -> None:
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+            await process.wait()
+        tmp_output.unlink(missing_ok=True)
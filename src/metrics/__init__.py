@@ -0,0 +1,6 @@
+from .registry import MetricsRegistry, Counter, Gauge, Histogram
+from .loop_monitor import EventLoopMonitor
+from . import metrics
+from .metrics import REGISTRY
+
+__all__ = ["MetricsRegistry", "Counter", "Gauge", "Histogram", "EventLoopMonitor", "metrics", "REGISTRY"]
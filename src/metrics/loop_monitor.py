@@ -0,0 +1,45 @@
+import asyncio
+import time
+
+from .metrics import EVENT_LOOP_LAG, EVENT_LOOP_LAG_MAX
+
+
+class EventLoopMonitor:
+    """
+    Measures event loop lag: sleeps for a fixed interval and records how much
+    later than requested it was woken up. Anything blocking the loop (sync I/O,
+    heavy JSON encoding) shows up here.
+    """
+
+    def __init__(self, interval: float = 0.5):
+        self._interval = interval
+        self._task: asyncio.Task | None = None
+        self._max_lag = 0.0
+        EVENT_LOOP_LAG_MAX.set_function(self._take_max_lag)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _take_max_lag(self) -> float:
+        """Max lag since previous scrape; resets on read."""
+        value, self._max_lag = self._max_lag, 0.0
+        return value
+
+    async def _run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self._interval)
+            lag = max(0.0, time.perf_counter() - started - self._interval)
+            EVENT_LOOP_LAG.observe(lag)
+            if lag > self._max_lag:
+                self._max_lag = lag
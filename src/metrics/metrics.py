@@ -0,0 +1,101 @@
+from .registry import MetricsRegistry
+
+# Process-wide registry served at /metrics
+REGISTRY = MetricsRegistry()
+
+# Metrics describing the process itself rather than the donation pipeline.
+# In multi-process mode web workers report these (and serve the searches),
+# the main process the rest.
+PER_PROCESS_PREFIXES = ("ws_", "event_loop_", "history_search_")
+
+
+def is_per_process(name: str) -> bool:
+    return name.startswith(PER_PROCESS_PREFIXES)
+
+
+# Seconds from a donation reaching us (or the bank) until it is on the overlay
+DISPLAY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+# Queue waits include whole notifications shown before the donation
+QUEUE_WAIT_BUCKETS = (0.01, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+# WebSocket/SSE frame writes are usually well under a millisecond
+SEND_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+YTDLP_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+LOOP_LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+# Indexed history queries take milliseconds
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+# Poller
+POLL_DURATION = REGISTRY.histogram(
+    "poller_poll_duration_seconds", "Duration of one Monobank poll including dedupe and queueing"
+)
+POLL_RESULTS = REGISTRY.counter(
+    "poller_polls", "Polls by result (new, empty, error)", ("result",)
+)
+POLL_DONATIONS = REGISTRY.counter("poller_new_donations", "New donations found by polling")
+
+# Monobank API
+MONOBANK_REQUEST_DURATION = REGISTRY.histogram(
+    "monobank_request_duration_seconds", "Monobank API request latency", ("endpoint",)
+)
+MONOBANK_RESPONSES = REGISTRY.counter(
+    "monobank_responses", "Monobank API responses by HTTP status (\"error\" if no response)", ("endpoint", "status")
+)
+
+# Notifications
+NOTIFICATION_QUEUE_DEPTH = REGISTRY.gauge(
+    "notification_queue_depth", "Donations waiting to be shown"
+)
+NOTIFICATION_QUEUE_WAIT = REGISTRY.histogram(
+    "notification_queue_wait_seconds", "Time a donation waited in the notification queue", buckets=QUEUE_WAIT_BUCKETS
+)
+DONATION_DISPLAY_LATENCY = REGISTRY.histogram(
+    "donation_display_latency_seconds",
+    "Time until a donation is broadcast to the overlay, from when it was received (source=received) or booked by the bank (source=bank)",
+    ("source",),
+    buckets=DISPLAY_BUCKETS,
+)
+
+# Donation history
+HISTORY_WRITE_DURATION = REGISTRY.histogram(
+    "history_write_duration_seconds", "Time to write one batch of donations to the history database"
+)
+HISTORY_ROWS_WRITTEN = REGISTRY.counter("history_rows_written", "Donations written to the history database")
+HISTORY_SEARCH_DURATION = REGISTRY.histogram(
+    "history_search_duration_seconds", "Time of one donation search query", buckets=QUERY_BUCKETS
+)
+
+# WebSocket / SSE clients
+WS_CLIENTS = REGISTRY.gauge(
+    "ws_clients", "Connected clients per hub and transport", ("hub", "transport")
+)
+WS_SEND_DURATION = REGISTRY.histogram(
+    "ws_send_duration_seconds", "Time to write one frame to a client", ("hub",), buckets=SEND_BUCKETS
+)
+WS_MESSAGES_PUBLISHED = REGISTRY.counter(
+    "ws_messages_published", "Messages published per hub", ("hub",)
+)
+WS_CLIENTS_EVICTED = REGISTRY.counter(
+    "ws_clients_evicted", "Slow clients disconnected per hub", ("hub",)
+)
+WS_MAX_LAG = REGISTRY.gauge(
+    "ws_max_lag_seconds", "Age of the oldest undelivered message across clients of a hub", ("hub",)
+)
+
+# YouTube
+YTDLP_DURATION = REGISTRY.histogram(
+    "ytdlp_call_duration_seconds", "yt-dlp subprocess duration", ("operation", "outcome"), buckets=YTDLP_BUCKETS
+)
+YOUTUBE_QUEUE_ITEMS = REGISTRY.gauge(
+    "youtube_queue_items", "YouTube queue items by download state", ("state",)
+)
+YOUTUBE_DOWNLOADS_ACTIVE = REGISTRY.gauge(
+    "youtube_downloads_in_progress", "YouTube downloads currently running"
+)
+
+# Event loop
+EVENT_LOOP_LAG = REGISTRY.histogram(
+    "event_loop_lag_seconds", "How late the event loop woke up a periodic timer", buckets=LOOP_LAG_BUCKETS
+)
+EVENT_LOOP_LAG_MAX = REGISTRY.gauge(
+    "event_loop_lag_max_seconds", "Largest event loop lag seen since the previous scrape"
+)
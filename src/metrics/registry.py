@@ -0,0 +1,231 @@
+import math
+import time
+from bisect import bisect_left
+from typing import Callable, Iterator
+
+# Seconds; covers sub-millisecond sends up to slow Monobank/yt-dlp calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+class _Metric:
+    """Base of all metric types: name, help text and children per label set."""
+
+    TYPE = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._children: dict[tuple[str, ...], "_Metric"] = {}
+        self._label_pairs: tuple[tuple[str, str], ...] = ()
+
+    def labels(self, *values: str, **kwargs: str):
+        """Get child for label values. Keep the result around on hot paths."""
+        if kwargs:
+            values = tuple(str(kwargs[name]) for name in self.labelnames)
+        else:
+            values = tuple(str(v) for v in values)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+
+        child = self._children.get(values)
+        if child is None:
+            child = self._new_child()
+            child._label_pairs = tuple(zip(self.labelnames, values))
+            self._children[values] = child
+        return child
+
+    def _new_child(self) -> "_Metric":
+        raise NotImplementedError
+
+    def _series(self) -> Iterator["_Metric"]:
+        if self.labelnames:
+            yield from self._children.values()
+        else:
+            yield self
+
+    def _samples(self) -> Iterator[tuple[str, tuple[tuple[str, str], ...], float]]:
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.TYPE}"]
+        for series in self._series():
+            for suffix, labels, value in series._samples():
+                lines.append(f"{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    TYPE = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._value = 0.0
+
+    def _new_child(self) -> "Counter":
+        return Counter(self.name, self.documentation)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._value += amount
+
+    def get(self) -> float:
+        return self._value
+
+    def _samples(self):
+        yield "_total", self._label_pairs, self._value
+
+
+class Gauge(_Metric):
+    """Value that goes up and down. set_function() reads it only when scraped."""
+
+    TYPE = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._value = 0.0
+        self._function: Callable[[], float] | None = None
+
+    def _new_child(self) -> "Gauge":
+        return Gauge(self.name, self.documentation)
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._value -= amount
+
+    def set_function(self, function: Callable[[], float] | None) -> None:
+        self._function = function
+
+    def get(self) -> float:
+        if self._function is not None:
+            try:
+                return float(self._function())
+            except Exception:
+                return math.nan
+        return self._value
+
+    def _samples(self):
+        yield "", self._label_pairs, self.get()
+
+
+class Histogram(_Metric):
+    """Cumulative buckets rendered like prometheus_client. observe() is one bisect and two adds."""
+
+    TYPE = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._upper_bounds = tuple(sorted(buckets))
+        self._counts = [0] * (len(self._upper_bounds) + 1)  # Last one is +Inf
+        self._sum = 0.0
+
+    def _new_child(self) -> "Histogram":
+        return Histogram(self.name, self.documentation, buckets=self._upper_bounds)
+
+    def observe(self, value: float) -> None:
+        self._counts[bisect_left(self._upper_bounds, value)] += 1
+        self._sum += value
+
+    def time(self) -> "_Timer":
+        """Context manager observing elapsed seconds."""
+        return _Timer(self)
+
+    def get_count(self) -> int:
+        return sum(self._counts)
+
+    def get_sum(self) -> float:
+        return self._sum
+
+    def _samples(self):
+        cumulative = 0
+        for bound, count in zip(self._upper_bounds + (math.inf,), self._counts):
+            cumulative += count
+            yield "_bucket", self._label_pairs + (("le", _format_value(float(bound))),), cumulative
+        yield "_sum", self._label_pairs, self._sum
+        yield "_count", self._label_pairs, cumulative
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_started")
+
+    def __init__(self, histogram: Histogram):
+        self._histogram = histogram
+        self._started = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._histogram.observe(time.perf_counter() - self._started)
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered in Prometheus text exposition format."""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> _Metric | None:
+        return self._metrics.get(name)
+
+    def render(self, include: Callable[[str], bool] | None = None) -> str:
+        """Text exposition of all metrics, or of those whose name passes include."""
+        lines = []
+        for metric in self._metrics.values():
+            if include is None or include(metric.name):
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,79 @@
+import asyncio
+import sys
+from pathlib import Path
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.metrics import MetricsRegistry, EventLoopMonitor, metrics
+
+
+def test_registry_render():
+    """Test counters, gauges and histograms in Prometheus text format."""
+    registry = MetricsRegistry()
+    polls = registry.counter("polls", "Polls by result", ("result",))
+    depth = registry.gauge("depth", "Queue depth")
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+
+    polls.labels("new").inc()
+    polls.labels(result="new").inc(2)
+    polls.labels("error").inc()
+    depth.set_function(lambda: 7)
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE polls counter" in lines
+    assert 'polls_total{result="new"} 3' in lines
+    assert 'polls_total{result="error"} 1' in lines
+    assert "depth 7" in lines
+    # Buckets are cumulative, le is inclusive
+    assert 'latency_seconds_bucket{le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{le="1"} 3' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+    assert "latency_seconds_count 4" in lines
+    assert "latency_seconds_sum 3.65" in lines
+
+    assert registry.render(lambda name: name == "depth").splitlines() == [
+        "# HELP depth Queue depth", "# TYPE depth gauge", "depth 7",
+    ]
+
+    try:
+        registry.counter("polls", "Duplicate")
+        assert False, "Duplicate name must be rejected"
+    except ValueError:
+        pass
+
+    print("[PASS] test_registry_render")
+
+
+def test_event_loop_monitor():
+    """Test that blocking the loop shows up as lag."""
+    import time
+
+    async def run():
+        monitor = EventLoopMonitor(interval=0.01)
+        before = metrics.EVENT_LOOP_LAG.get_count()
+        monitor.start()
+        await asyncio.sleep(0.02)
+        time.sleep(0.1)  # Block the loop
+        await asyncio.sleep(0.03)
+        await monitor.stop()
+
+        assert metrics.EVENT_LOOP_LAG.get_count() > before
+        assert metrics.EVENT_LOOP_LAG_MAX.get() >= 0.05
+        assert metrics.EVENT_LOOP_LAG_MAX.get() == 0, "Max lag resets on scrape"
+
+    asyncio.run(run())
+    print("[PASS] test_event_loop_monitor")
+
+
+if __name__ == "__main__":
+    print("Metrics Tests")
+    print("=" * 50 + "\n")
+
+    test_registry_render()
+    test_event_loop_monitor()
+
+    print("\nAll Metrics tests passed!")
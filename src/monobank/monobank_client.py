@@ -1,14 +1,22 @@
+import time
 import aiohttp
 from dataclasses import dataclass
 from datetime import datetime
 from typing import TYPE_CHECKING
 
+from src.metrics import metrics
+
 if TYPE_CHECKING:
     from src.config import Config
 
 BASE_URL = "https://api.monobank.ua"
 
 
+def _endpoint_label(endpoint: str) -> str:
+    """Endpoint without ids and timestamps, e.g. /personal/statement."""
+    return "/" + "/".join(endpoint.strip("/").split("/")[:2])
+
+
 @dataclass
 class JarInfo:
     id: str
@@ -36,6 +44,7 @@ class JarTransaction:
     description: str
     comment: str | None
     donor_name: str | None = None
+    balance: int | None = None  # Jar balance after this transaction, in kopecks
 
     @property
     def amount_uah(self) -> float:
@@ -58,6 +67,8 @@ class MonobankClient:
     def __init__(self, config: "Config"):
         self._config = config
         self._token = config.get_monobank_token()
+        # Last client-info response and when it was fetched (monotonic)
+        self._client_info: tuple[float, dict] | None = None
 
     def _get_headers(self) -> dict:
         return {"X-Token": self._token}
@@ -65,22 +76,38 @@ class MonobankClient:
     async def _request(self, endpoint: str) -> dict | list:
         """Make GET request to Monobank API."""
         url = f"{BASE_URL}{endpoint}"
+        label = _endpoint_label(endpoint)
+        status = "error"
+        started = time.perf_counter()
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=self._get_headers()) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    raise Exception(f"Monobank API error {response.status}: {error_text}")
-
-                return await response.json()
-
-    async def get_client_info(self) -> dict:
-        """Get client info including accounts and jars."""
-        return await self._request("/personal/client-info")
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(url, headers=self._get_headers()) as response:
+                    status = str(response.status)
+                    if response.status != 200:
+                        error_text = await response.text()
+                        raise Exception(f"Monobank API error {response.status}: {error_text}")
+
+                    return await response.json()
+        finally:
+            metrics.MONOBANK_REQUEST_DURATION.labels(label).observe(time.perf_counter() - started)
+            metrics.MONOBANK_RESPONSES.labels(label, status).inc()
+
+    async def get_client_info(self, max_age: float = 0.0) -> dict:
+        """
+        Get client info including accounts and jars.
+        A response fetched less than max_age seconds ago is reused
+        (Monobank allows one client-info request per 60 seconds).
+        """
+        if self._client_info and time.monotonic() - self._client_info[0] < max_age:
+            return self._client_info[1]
+        info = await self._request("/personal/client-info")
+        self._client_info = (time.monotonic(), info)
+        return info
 
-    async def get_jars(self) -> list[JarInfo]:
+    async def get_jars(self, max_age: float = 0.0) -> list[JarInfo]:
         """Get list of all jars (банки)."""
-        info = await self.get_client_info()
+        info = await self.get_client_info(max_age)
         jars_raw = info.get("jars", [])
 
         return [
@@ -96,9 +123,9 @@ class MonobankClient:
             for jar in jars_raw
         ]
 
-    async def get_jar_by_id(self, jar_id: str) -> JarInfo | None:
+    async def get_jar_by_id(self, jar_id: str, max_age: float = 0.0) -> JarInfo | None:
         """Get jar by ID."""
-        jars = await self.get_jars()
+        jars = await self.get_jars(max_age)
         for jar in jars:
             if jar.id == jar_id:
                 return jar
@@ -130,11 +157,12 @@ class MonobankClient:
         jar_id: str | None = None,
         from_time: datetime | None = None,
         to_time: datetime | None = None,
+        incoming_only: bool = True,
     ) -> list[JarTransaction]:
         """
         Get transactions for a jar.
         If jar_id is None, uses jar_id from config.
-        Returns only incoming transactions (donations).
+        Returns only incoming transactions (donations) unless incoming_only is False.
         """
         jar_id = jar_id or self._config.get_jar_id()
 
@@ -155,11 +183,24 @@ class MonobankClient:
             print(f"[MonobankClient] Error getting statements: {e}")
             return []
 
+        transactions = self.parse_transactions(statements, incoming_only)
+
+        # Sort by time descending (newest first)
+        transactions.sort(key=lambda t: t.time, reverse=True)
+
+        return transactions
+
+    @staticmethod
+    def parse_transactions(statements: list[dict], incoming_only: bool = True) -> list[JarTransaction]:
+        """
+        Transactions of raw statement items, in the same order. By default only
+        incoming ones (donations); withdrawals carry the jar balance too.
+        """
         transactions = []
         for stmt in statements:
-            # Only incoming transactions (positive amount)
+            # Incoming transactions have a positive amount
             amount = stmt.get("amount", 0)
-            if amount <= 0:
+            if incoming_only and amount <= 0:
                 continue
 
             description = stmt.get("description", "")
@@ -173,12 +214,9 @@ class MonobankClient:
                     description=description,
                     comment=stmt.get("comment"),
                     donor_name=donor_name,
+                    balance=stmt.get("balance"),
                 )
             )
-
-        # Sort by time descending (newest first)
-        transactions.sort(key=lambda t: t.time, reverse=True)
-
         return transactions
 
     async def get_jar_balance(self, jar_id: str | None = None) -> int:
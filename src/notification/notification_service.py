@@ -1,14 +1,20 @@
 import asyncio
+import time
+from collections import deque
 from dataclasses import dataclass, field
 from datetime import datetime
 from typing import TYPE_CHECKING
 
+from src.metrics import metrics
+from src.tracing import TRACER, new_trace_id
+
 if TYPE_CHECKING:
     from src.web_host import WebHost
-    from src.media_player import MediaPlayer
+    from src.media_player import MediaPlayer, MediaSelection
     from src.config import Config
     from src.donations_feed import DonationsFeed
     from src.youtube_player import YouTubePlayer
+    from src.leaderboard import Leaderboard
 
 
 @dataclass
@@ -18,6 +24,12 @@ class Donation:
     comment: str | None = None
     timestamp: datetime = field(default_factory=datetime.now)
     donor_name: str | None = None
+    # Monobank statement item id, None for test donations
+    tx_id: str | None = None
+    # Monotonic time the donation entered the app, for latency metrics
+    received_at: float = field(default_factory=time.monotonic, repr=False, compare=False)
+    # Ties together the spans of this donation's lifecycle (see src/tracing)
+    trace_id: str = field(default_factory=new_trace_id, repr=False, compare=False)
 
     @property
     def amount_uah(self) -> float:
@@ -29,6 +41,10 @@ class Donation:
         return f"{name}: {self.amount_uah:.2f} {self.currency}"
 
 
+_DISPLAY_LATENCY_RECEIVED = metrics.DONATION_DISPLAY_LATENCY.labels("received")
+_DISPLAY_LATENCY_BANK = metrics.DONATION_DISPLAY_LATENCY.labels("bank")
+
+
 class NotificationService:
     def __init__(
         self,
@@ -41,11 +57,19 @@ class NotificationService:
         self._config = config
         self._donations_feed: "DonationsFeed | None" = None
         self._youtube_player: "YouTubePlayer | None" = None
+        self._leaderboard: "Leaderboard | None" = None
 
-        self._queue: asyncio.Queue[Donation] = asyncio.Queue()
+        # Media is selected when donation is queued, so it can be preloaded
+        self._queue: asyncio.Queue[tuple[Donation, "MediaSelection | None"]] = asyncio.Queue()
+        # Monotonic enqueue time of every queued donation, same order as _queue
+        self._queued_at: deque[float] = deque()
+        self._upcoming: deque["MediaSelection | None"] = deque()
+        self._last_preload: tuple[str, ...] = ()
         self._processing = False
         self._process_task: asyncio.Task | None = None
 
+        metrics.NOTIFICATION_QUEUE_DEPTH.set_function(self._queue.qsize)
+
     def set_donations_feed(self, feed: "DonationsFeed") -> None:
         """Set donations feed for broadcasting new donations."""
         self._donations_feed = feed
@@ -54,6 +78,10 @@ class NotificationService:
         """Set YouTube player for adding tracks from donations."""
         self._youtube_player = player
 
+    def set_leaderboard(self, leaderboard: "Leaderboard") -> None:
+        """Set leaderboard counting shown donations."""
+        self._leaderboard = leaderboard
+
     async def start(self) -> None:
         """Start processing notification queue."""
         if self._processing:
@@ -77,17 +105,22 @@ class NotificationService:
 
         print("[NotificationService] Stopped")
 
-    async def notify(self, donation: Donation) -> None:
+    async def notify(self, donation: Donation, media: "MediaSelection | None" = None) -> None:
         """
         Show notification for donation immediately.
         Use queue_notification() for queued processing.
+        If media is None, it is selected here.
         """
         print(f"[NotificationService] Showing notification: {donation}")
 
         # Add to donations feed
         if self._donations_feed:
-            self._donations_feed.add_donation(donation)
-            await self._donations_feed.broadcast_new_donation(donation)
+            with TRACER.span(donation.trace_id, "feed_update"):
+                self._donations_feed.add_donation(donation)
+                await self._donations_feed.broadcast_new_donation(donation)
+
+        if self._leaderboard:
+            await self._leaderboard.add_donation(donation)
 
         # Check for YouTube links in donation comment
         print(f"[NotificationService] YouTube player set: {self._youtube_player is not None}")
@@ -96,7 +129,7 @@ class NotificationService:
         if self._youtube_player and donation.comment:
             print(f"[NotificationService] Checking for YouTube link in: {donation.comment[:80]}")
             try:
-                result = await self._youtube_player.add_from_comment(donation.comment)
+                result = await self._youtube_player.add_from_comment(donation.comment, trace_id=donation.trace_id)
                 if result:
                     print(f"[NotificationService] Added YouTube track from donation comment")
                 else:
@@ -111,41 +144,102 @@ class NotificationService:
             if not donation.comment:
                 print(f"[NotificationService] No comment in donation")
 
-        # Select media based on amount
-        media = self._media_player.select_media(donation.amount)
+        # Select media based on amount and comment triggers
+        if media is None:
+            media = self._select_media(donation)
 
         if media is None:
             print("[NotificationService] Warning: No media available")
+            TRACER.finish(donation.trace_id)
             return
 
         # Show on web host with donation info
         duration = self._config.get_default_duration()
-        await self._web_host.show_media(
-            image_path=media.image_path,
-            audio_path=media.audio_path,
-            duration_ms=duration,
-            donor_name=donation.donor_name,
-            comment=donation.comment,
-            amount=donation.amount,
-        )
+        with TRACER.span(donation.trace_id, "broadcast"):
+            await self._web_host.show_media(
+                image_path=media.image_path,
+                audio_path=media.audio_path,
+                duration_ms=duration,
+                donor_name=donation.donor_name,
+                comment=donation.comment,
+                amount=donation.amount,
+                trace_id=donation.trace_id,
+            )
+        self._observe_display_latency(donation)
+        # Completed by the first overlay acknowledging the alert, or after the timeout
+        TRACER.finish(donation.trace_id, linger=self._config.get_trace_ack_timeout())
+
+    @staticmethod
+    def _observe_display_latency(donation: Donation) -> None:
+        _DISPLAY_LATENCY_RECEIVED.observe(time.monotonic() - donation.received_at)
+        since_bank = (datetime.now() - donation.timestamp).total_seconds()
+        if since_bank >= 0:
+            _DISPLAY_LATENCY_BANK.observe(since_bank)
+
+    def _select_media(self, donation: Donation) -> "MediaSelection | None":
+        with TRACER.span(donation.trace_id, "media_selection"):
+            return self._media_player.select_media(donation.amount, donation.comment)
+
+    async def _send_preload(self) -> None:
+        """Send media of next queued donations to overlay so it is cached before display."""
+        ahead = self._config.get_preload_ahead()
+        if ahead <= 0:
+            return
+
+        images: list[str] = []
+        audio: list[str] = []
+        for media in list(self._upcoming)[:ahead]:
+            if media is None:
+                continue
+            if media.image_path not in images:
+                images.append(media.image_path)
+            if media.audio_path and media.audio_path not in audio:
+                audio.append(media.audio_path)
+
+        # Skip if window didn't change since last hint
+        window = tuple(images + audio)
+        if window == self._last_preload:
+            return
+        self._last_preload = window
+        if not window:
+            return
+
+        await self._web_host.preload_media(images, audio)
 
     async def queue_notification(self, donation: Donation) -> None:
         """Add donation to notification queue."""
-        await self._queue.put(donation)
+        media = self._select_media(donation)
+        self._queued_at.append(time.monotonic())
+        await self._queue.put((donation, media))
+        self._upcoming.append(media)
         print(f"[NotificationService] Queued: {donation} (queue size: {self._queue.qsize()})")
 
+        await self._send_preload()
+
     async def _process_queue(self) -> None:
         """Process notifications from queue one by one."""
         while self._processing:
             try:
                 # Wait for donation with timeout to check _processing flag
                 try:
-                    donation = await asyncio.wait_for(self._queue.get(), timeout=1.0)
+                    donation, media = await asyncio.wait_for(self._queue.get(), timeout=1.0)
                 except asyncio.TimeoutError:
                     continue
 
+                if self._queued_at:
+                    waited = time.monotonic() - self._queued_at.popleft()
+                    metrics.NOTIFICATION_QUEUE_WAIT.observe(waited)
+                    now = time.time()
+                    TRACER.record(donation.trace_id, "queue_wait", now - waited, now)
+
+                if self._upcoming:
+                    self._upcoming.popleft()
+
                 # Show notification
-                await self.notify(donation)
+                await self.notify(donation, media=media)
+
+                # Next donations moved into preload window
+                await self._send_preload()
 
                 # Wait for notification to finish (duration + buffer)
                 duration = self._config.get_default_duration()
@@ -174,6 +268,7 @@ class NotificationService:
             comment=comment,
             donor_name=donor_name,
         )
+        TRACER.annotate(donation.trace_id, source="test", amount=donation.amount_uah)
         await self.notify(donation)
 
     def get_queue_size(self) -> int:
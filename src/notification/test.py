@@ -123,8 +123,51 @@ async def test_test_donation():
     print("[PASS] test_test_donation")
 
 
+def test_preload_hints():
+    """Test that queued donations send preload hints with their selected media."""
+    from src.media_player import MediaSelection
+
+    class FakeWebHost:
+        def __init__(self):
+            self.preloads = []
+            self.shown = []
+
+        async def preload_media(self, images, audio=None):
+            self.preloads.append((images, audio))
+
+        async def show_media(self, image_path, **kwargs):
+            self.shown.append(image_path)
+
+    class FakeMediaPlayer:
+        def __init__(self):
+            self.count = 0
+
+        def select_media(self, amount, comment=None):
+            self.count += 1
+            return MediaSelection(image_path=f"video/{self.count}.gif", audio_path="audio/a.mp3")
+
+    async def run():
+        config = Config(str(PROJECT_ROOT / "config.yaml"))
+        web_host = FakeWebHost()
+        service = NotificationService(web_host, FakeMediaPlayer(), config)
+
+        await service.queue_notification(Donation(amount=100, donor_name="A"))
+        await service.queue_notification(Donation(amount=200, donor_name="B"))
+
+        assert web_host.preloads[-1] == (["video/1.gif", "video/2.gif"], ["audio/a.mp3"])
+
+        # Media chosen at queue time is the one shown
+        donation, media = await service._queue.get()
+        await service.notify(donation, media=media)
+        assert web_host.shown == ["video/1.gif"]
+
+    asyncio.run(run())
+    print("[PASS] test_preload_hints")
+
+
 if __name__ == "__main__":
     test_donation_dataclass()
+    test_preload_hints()
 
     print("\n" + "=" * 50)
     print("Running integration test (requires browser)...")
@@ -1,16 +1,24 @@
 import asyncio
+import time
 from datetime import datetime, timedelta
 from typing import TYPE_CHECKING, Callable, Any
 import inspect
 
 from src.notification import Donation
+from src.metrics import metrics
+from src.tracing import TRACER
 
 if TYPE_CHECKING:
     from src.config import Config
-    from src.monobank import MonobankClient
+    from src.monobank import MonobankClient, JarTransaction
     from src.notification import NotificationService
 
 
+_POLLS_NEW = metrics.POLL_RESULTS.labels("new")
+_POLLS_EMPTY = metrics.POLL_RESULTS.labels("empty")
+_POLLS_ERROR = metrics.POLL_RESULTS.labels("error")
+
+
 class DonationPoller:
     def __init__(
         self,
@@ -30,6 +38,8 @@ class DonationPoller:
 
         # Callbacks for new donations (sync or async)
         self._callbacks: list[Callable[[Donation], Any]] = []
+        # Callbacks for every fetched batch of jar transactions, seen or not, withdrawals included (sync or async)
+        self._transaction_callbacks: list[Callable[[list["JarTransaction"]], Any]] = []
 
         # Track last poll time
         self._last_poll: datetime | None = None
@@ -69,17 +79,34 @@ class DonationPoller:
         """Register callback for new donations."""
         self._callbacks.append(callback)
 
+    def on_transactions(self, callback: Callable[[list["JarTransaction"]], Any]) -> None:
+        """Register callback for each batch of fetched transactions, withdrawals included (e.g. to read jar balance)."""
+        self._transaction_callbacks.append(callback)
+
+    async def _notify_transactions(self, transactions: list["JarTransaction"]) -> None:
+        if not transactions:
+            return
+        for callback in self._transaction_callbacks:
+            try:
+                if inspect.iscoroutinefunction(callback):
+                    await callback(transactions)
+                else:
+                    callback(transactions)
+            except Exception as e:
+                print(f"[DonationPoller] Callback error: {e}")
+
     async def _initial_load(self) -> None:
         """Load recent transactions and mark them as seen."""
         try:
             # Get transactions from last hour to avoid showing old donations
             from_time = datetime.now() - timedelta(hours=1)
-            transactions = await self._monobank.get_jar_transactions(from_time=from_time)
+            transactions = await self._monobank.get_jar_transactions(from_time=from_time, incoming_only=False)
 
             for tx in transactions:
                 self._seen_tx_ids.add(tx.id)
 
             print(f"[DonationPoller] Initial load: marked {len(transactions)} transactions as seen")
+            await self._notify_transactions(transactions)
 
         except Exception as e:
             print(f"[DonationPoller] Error during initial load: {e}")
@@ -99,6 +126,17 @@ class DonationPoller:
 
     async def _poll_once(self) -> list[Donation]:
         """Check for new donations once."""
+        started = time.perf_counter()
+        try:
+            new_donations = await self._poll_transactions()
+        except Exception:
+            _POLLS_ERROR.inc()
+            raise
+        finally:
+            metrics.POLL_DURATION.observe(time.perf_counter() - started)
+        return new_donations
+
+    async def _poll_transactions(self) -> list[Donation]:
         # Get recent transactions
         from_time = self._last_poll or (datetime.now() - timedelta(hours=1))
         poll_start = datetime.now()
@@ -106,17 +144,25 @@ class DonationPoller:
 
         print(f"[DonationPoller] Polling Monobank at {poll_start.strftime('%H:%M:%S')}...")
 
+        fetch_start = time.time()
         try:
-            transactions = await self._monobank.get_jar_transactions(from_time=from_time)
+            transactions = await self._monobank.get_jar_transactions(from_time=from_time, incoming_only=False)
         except Exception as e:
             print(f"[DonationPoller] Error getting transactions: {e}")
+            _POLLS_ERROR.inc()
             return []
+        fetch_end = time.time()
 
         print(f"[DonationPoller] Received {len(transactions)} transaction(s) from Monobank")
+        await self._notify_transactions(transactions)
 
         new_donations = []
 
         for tx in transactions:
+            # Withdrawals only matter for their balance (see on_transactions)
+            if tx.amount <= 0:
+                continue
+
             # Skip already seen transactions
             if tx.id in self._seen_tx_ids:
                 continue
@@ -131,6 +177,7 @@ class DonationPoller:
                 comment=tx.comment or tx.description,
                 timestamp=tx.time,
                 donor_name=tx.donor_name,
+                tx_id=tx.id,
             )
 
             new_donations.append(donation)
@@ -138,7 +185,16 @@ class DonationPoller:
         # Sort by timestamp ascending (old to new)
         new_donations.sort(key=lambda d: d.timestamp)
 
+        # Spans are recorded now that the donations (and their trace ids) exist
+        dedupe_end = time.time()
+        for donation in new_donations:
+            TRACER.annotate(donation.trace_id, source="monobank", amount=donation.amount_uah, donor=donation.donor_name)
+            TRACER.record(donation.trace_id, "poll", fetch_start, fetch_end, transactions=len(transactions))
+            TRACER.record(donation.trace_id, "dedupe", fetch_end, dedupe_end)
+
         if new_donations:
+            _POLLS_NEW.inc()
+            metrics.POLL_DONATIONS.inc(len(new_donations))
             print(f"[DonationPoller] Status: CHANGED - Found {len(new_donations)} new donation(s)")
             for donation in new_donations:
                 print(f"[DonationPoller]   > {donation}")
@@ -156,6 +212,7 @@ class DonationPoller:
                     except Exception as e:
                         print(f"[DonationPoller] Callback error: {e}")
         else:
+            _POLLS_EMPTY.inc()
             print(f"[DonationPoller] Status: No changes")
 
         return new_donations
@@ -0,0 +1,4 @@
+from .tracer import Tracer, Trace, Span, TRACER, new_trace_id
+from .report import render_html
+
+__all__ = ["Tracer", "Trace", "Span", "TRACER", "new_trace_id", "render_html"]
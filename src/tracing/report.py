@@ -0,0 +1,54 @@
+from datetime import datetime
+from html import escape
+
+# Order spans appear in a donation's life
+SPAN_ORDER = ("poll", "dedupe", "media_selection", "queue_wait", "feed_update", "music_ingestion", "broadcast", "client_ack")
+
+_STYLE = """
+body { font-family: sans-serif; margin: 20px; background: #111; color: #ddd; }
+table { border-collapse: collapse; margin-bottom: 30px; }
+th, td { padding: 4px 10px; border-bottom: 1px solid #333; text-align: right; }
+th:first-child, td:first-child, td.attrs { text-align: left; }
+td.slow { color: #f66; }
+"""
+
+
+def _format_trace_row(trace: dict) -> str:
+    spans = {span["name"]: span for span in trace["spans"]}
+    attrs = ", ".join(f"{escape(str(k))}={escape(str(v))}" for k, v in trace.get("attrs", {}).items())
+    started = datetime.fromtimestamp(trace["start"]).strftime("%Y-%m-%d %H:%M:%S") if trace["start"] else "-"
+
+    cells = [
+        f"<td>{escape(trace['trace_id'])}</td>",
+        f"<td>{started}</td>",
+        f"<td><b>{trace['duration_ms']:.0f}</b></td>",
+    ]
+    slowest = max(trace["spans"], key=lambda span: span["duration_ms"], default=None)
+    for name in SPAN_ORDER:
+        span = spans.get(name)
+        if span is None:
+            cells.append("<td>-</td>")
+            continue
+        css = ' class="slow"' if span is slowest else ""
+        cells.append(f"<td{css}>{span['duration_ms']:.0f}</td>")
+    cells.append(f'<td class="attrs">{attrs}</td>')
+    return "<tr>" + "".join(cells) + "</tr>"
+
+
+def _format_table(title: str, traces: list[dict]) -> str:
+    header = "".join(f"<th>{name}</th>" for name in ("trace", "started", "total ms", *SPAN_ORDER, "attrs"))
+    rows = "".join(_format_trace_row(trace) for trace in traces) or f'<tr><td colspan="{len(SPAN_ORDER) + 4}">No traces yet</td></tr>'
+    return f"<h2>{escape(title)}</h2><table><tr>{header}</tr>{rows}</table>"
+
+
+def render_html(report: dict) -> str:
+    """Page with recent and slowest traces from Tracer.get_report(). Span columns are in ms."""
+    return (
+        "<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>Donation traces</title>"
+        f"<style>{_STYLE}</style></head><body>"
+        f"<h1>Donation traces</h1><p>In progress: {report.get('active', 0)}. "
+        "Span columns are milliseconds; the longest span of each trace is highlighted.</p>"
+        + _format_table("Slowest", report.get("slowest", []))
+        + _format_table("Recent", report.get("recent", []))
+        + "</body></html>"
+    )
@@ -0,0 +1,73 @@
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.tracing import Tracer, render_html
+
+
+def test_trace_lifecycle():
+    """Test spans, lingering for client ack and the rotating trace file."""
+
+    async def run(path: Path):
+        tracer = Tracer()
+        tracer.configure(path, max_bytes=1024, backups=2)
+
+        now = time.time()
+        tracer.annotate("t1", amount=100.0)
+        tracer.record("t1", "poll", now - 2.0, now - 1.5)
+        tracer.record("t1", "broadcast", now - 0.1, now)
+        with tracer.span("t1", "feed_update") as span:
+            span.set(clients=3)
+        tracer.record(None, "poll", now, now)  # No trace id: ignored
+
+        tracer.finish("t1", linger=5)
+        assert tracer.get_recent() == [], "Trace waits for client ack"
+        assert tracer.ack("t1", now + 0.5)
+        assert not tracer.ack("t1"), "Only the first ack counts"
+
+        trace = tracer.get_recent()[0]
+        assert [s.name for s in trace.spans] == ["poll", "broadcast", "feed_update", "client_ack"]
+        assert abs(trace.get_span("client_ack").duration_ms - 500) < 1
+        assert abs(trace.duration_ms - 2500) < 1
+
+        # Without an ack the trace is finished after linger
+        tracer.record("t2", "poll", now, now + 0.01)
+        tracer.finish("t2", linger=0.05)
+        await asyncio.sleep(0.1)
+        assert [t.trace_id for t in tracer.get_recent()] == ["t2", "t1"]
+        assert [t.trace_id for t in tracer.get_slowest()] == ["t1", "t2"]
+
+        # Rotation keeps the file small
+        for i in range(30):
+            tracer.record(f"bulk{i}", "poll", now, now + 0.001, padding="x" * 50)
+            tracer.finish(f"bulk{i}")
+        tracer.close()
+
+        first = json.loads(path.read_text(encoding="utf-8").splitlines()[0])
+        assert first["spans"][0]["name"] == "poll"
+        assert path.stat().st_size <= 1024
+        assert (path.parent / (path.name + ".1")).exists()
+
+        html = render_html(tracer.get_report())
+        assert "Slowest" in html and "t1" in html
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(Path(tmp) / "logs" / "traces.jsonl"))
+
+    print("[PASS] test_trace_lifecycle")
+
+
+if __name__ == "__main__":
+    print("Tracing Tests")
+    print("=" * 50 + "\n")
+
+    test_trace_lifecycle()
+
+    print("\nAll Tracing tests passed!")
@@ -0,0 +1,254 @@
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+@dataclass
+class Span:
+    name: str
+    start: float  # Unix time, so spans from worker processes line up
+    end: float
+    attrs: dict = field(default_factory=dict)
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end - self.start) * 1000
+
+    def to_dict(self, trace_start: float) -> dict:
+        data = {
+            "name": self.name,
+            "offset_ms": round((self.start - trace_start) * 1000, 2),
+            "duration_ms": round(self.duration_ms, 2),
+        }
+        if self.attrs:
+            data["attrs"] = self.attrs
+        return data
+
+
+@dataclass
+class Trace:
+    trace_id: str
+    spans: list[Span] = field(default_factory=list)
+    attrs: dict = field(default_factory=dict)
+
+    @property
+    def start(self) -> float:
+        return min((span.start for span in self.spans), default=0.0)
+
+    @property
+    def end(self) -> float:
+        return max((span.end for span in self.spans), default=0.0)
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end - self.start) * 1000
+
+    def get_span(self, name: str) -> Span | None:
+        for span in self.spans:
+            if span.name == name:
+                return span
+        return None
+
+    def to_dict(self) -> dict:
+        start = self.start
+        return {
+            "trace_id": self.trace_id,
+            "start": start,
+            "duration_ms": round(self.duration_ms, 2),
+            "attrs": self.attrs,
+            "spans": [span.to_dict(start) for span in sorted(self.spans, key=lambda s: s.start)],
+        }
+
+
+class _SpanTimer:
+    __slots__ = ("_tracer", "_trace_id", "_name", "_attrs", "_start")
+
+    def __init__(self, tracer: "Tracer", trace_id: str | None, name: str, attrs: dict):
+        self._tracer = tracer
+        self._trace_id = trace_id
+        self._name = name
+        self._attrs = attrs
+        self._start = 0.0
+
+    def __enter__(self) -> "_SpanTimer":
+        self._start = time.time()
+        return self
+
+    def set(self, **attrs) -> None:
+        """Add span attributes known only inside the block."""
+        self._attrs.update(attrs)
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self._attrs["error"] = exc_type.__name__
+        self._tracer.record(self._trace_id, self._name, self._start, **self._attrs)
+
+
+class Tracer:
+    """
+    In-process tracing of the donation lifecycle.
+
+    Spans are collected per trace id (one trace per donation). A finished
+    trace goes to the in-memory recent and slowest lists and is appended
+    as one JSON line to a rotating file; file writes happen on a background
+    thread, so recording never blocks the event loop.
+
+    A trace can linger after the donation was broadcast, waiting for the
+    first overlay to acknowledge it (the client_ack span).
+    """
+
+    RECENT_SIZE = 100
+    SLOWEST_SIZE = 20
+    # Traces never finished (e.g. donation dropped) are forgotten past this
+    MAX_ACTIVE = 1000
+
+    def __init__(self):
+        self.enabled = True
+        self._active: dict[str, Trace] = {}
+        self._lingering: dict[str, asyncio.TimerHandle] = {}
+        self._recent: deque[Trace] = deque(maxlen=self.RECENT_SIZE)
+        # Min-heap of (duration, counter, trace): the fastest of the slowest is evicted first
+        self._slowest: list[tuple[float, int, Trace]] = []
+        self._counter = itertools.count()
+
+        self._logger: logging.Logger | None = None
+        self._listener: logging.handlers.QueueListener | None = None
+
+    def configure(self, path: Path | None, max_bytes: int = 5 * 1024 * 1024, backups: int = 3) -> None:
+        """Write finished traces to path (JSON lines), rotating at max_bytes. None = memory only."""
+        self.close()
+        if path is None:
+            return
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._listener = logging.handlers.QueueListener(log_queue, handler)
+        self._listener.start()
+
+        self._logger = logging.getLogger(f"donation_traces.{id(self)}")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._logger.handlers = [logging.handlers.QueueHandler(log_queue)]
+        print(f"[Tracer] Writing traces to {path}")
+
+    def close(self) -> None:
+        if self._listener:
+            self._listener.stop()
+            self._listener = None
+        if self._logger:
+            self._logger.handlers = []
+            self._logger = None
+
+    def _get_trace(self, trace_id: str) -> Trace:
+        trace = self._active.get(trace_id)
+        if trace is None:
+            if len(self._active) >= self.MAX_ACTIVE:
+                self._active.pop(next(iter(self._active)))
+            trace = Trace(trace_id)
+            self._active[trace_id] = trace
+        return trace
+
+    def annotate(self, trace_id: str | None, **attrs) -> None:
+        """Add attributes describing the whole trace (amount, donor...)."""
+        if trace_id and self.enabled:
+            self._get_trace(trace_id).attrs.update(attrs)
+
+    def record(self, trace_id: str | None, name: str, start: float, end: float | None = None, **attrs) -> None:
+        """Add span that ran from start to end (unix time, end defaults to now)."""
+        if not trace_id or not self.enabled:
+            return
+        self._get_trace(trace_id).spans.append(Span(name, start, end if end is not None else time.time(), attrs))
+
+    def span(self, trace_id: str | None, name: str, **attrs) -> _SpanTimer:
+        """Context manager recording the enclosed block as a span."""
+        return _SpanTimer(self, trace_id, name, attrs)
+
+    def finish(self, trace_id: str | None, linger: float = 0.0) -> None:
+        """
+        Mark trace as complete. With linger > 0 it stays open that many
+        seconds for a client_ack, finishing as soon as one arrives.
+        """
+        if not trace_id or trace_id not in self._active or trace_id in self._lingering:
+            return
+        if linger > 0:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+            if loop is not None:
+                self._lingering[trace_id] = loop.call_later(linger, self._finalize, trace_id)
+                return
+        self._finalize(trace_id)
+
+    def ack(self, trace_id: str | None, at: float | None = None, **attrs) -> bool:
+        """
+        Record first client acknowledgement: span from end of broadcast to at.
+        Returns False if the trace is unknown or already finished.
+        """
+        trace = self._active.get(trace_id) if trace_id else None
+        if trace is None or trace.get_span("client_ack"):
+            return False
+
+        broadcast = trace.get_span("broadcast")
+        at = at if at is not None else time.time()
+        self.record(trace_id, "client_ack", broadcast.end if broadcast else at, at, **attrs)
+
+        handle = self._lingering.get(trace_id)
+        if handle:
+            handle.cancel()
+            self._finalize(trace_id)
+        return True
+
+    def _finalize(self, trace_id: str) -> None:
+        self._lingering.pop(trace_id, None)
+        trace = self._active.pop(trace_id, None)
+        if trace is None or not trace.spans:
+            return
+
+        self._recent.append(trace)
+        entry = (trace.duration_ms, next(self._counter), trace)
+        if len(self._slowest) < self.SLOWEST_SIZE:
+            heapq.heappush(self._slowest, entry)
+        elif entry[0] > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+
+        if self._logger:
+            self._logger.info(json.dumps(trace.to_dict(), ensure_ascii=False))
+
+    def get_recent(self, limit: int = 20) -> list[Trace]:
+        """Newest first."""
+        return list(reversed(self._recent))[:limit]
+
+    def get_slowest(self, limit: int = 20) -> list[Trace]:
+        """Slowest first."""
+        return [trace for _, _, trace in sorted(self._slowest, reverse=True, key=lambda e: (e[0], e[1]))][:limit]
+
+    def get_active_count(self) -> int:
+        return len(self._active)
+
+    def get_report(self, limit: int = 20) -> dict:
+        return {
+            "recent": [trace.to_dict() for trace in self.get_recent(limit)],
+            "slowest": [trace.to_dict() for trace in self.get_slowest(limit)],
+            "active": self.get_active_count(),
+        }
+
+
+# Process-wide tracer; configured from the tracing section of config.yaml
+TRACER = Tracer()
@@ -0,0 +1,552 @@
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Callable
+
+from aiohttp import web, WSMsgType, WSCloseCode
+
+from src.metrics import metrics
+from .protocol import FORMAT_MSGPACK, json_to_msgpack, msgpack_batch, to_msgpack
+
+
+class Envelope:
+    """
+    One message encoded for the wire.
+    JSON is encoded once on publish; other formats are derived on first use
+    and shared by every client of that format.
+    """
+
+    __slots__ = ("seq", "expires_at", "json", "topics", "_sse", "_msgpack", "_message", "_batch")
+
+    def __init__(
+        self,
+        json_payload: bytes,
+        seq: int | None = None,
+        expires_at: float | None = None,
+        sse: bytes | None = None,
+        message: dict | None = None,
+        batch: "list[Envelope] | None" = None,
+        topics: tuple[str, ...] = (),
+    ):
+        self.seq = seq
+        self.expires_at = expires_at
+        self.json = json_payload
+        # Subscribers of any of these get the message (see topics.py)
+        self.topics = topics
+        self._sse = sse
+        self._msgpack: bytes | None = None
+        # Source of json_payload if known, so other formats skip parsing it back
+        self._message = message
+        # Envelopes packed into this batch frame; their encodings are reused
+        self._batch = batch
+
+    def sse(self, epoch: str) -> bytes:
+        """Server-Sent Events frame. The id lets EventSource resume via Last-Event-ID."""
+        if self._sse is None and self._batch is not None:
+            # EventSource has no use for the batch envelope: its messages go as separate events in one write
+            self._sse = b"".join(envelope.sse(epoch) for envelope in self._batch)
+        elif self._sse is None:
+            event_id = f"id: {epoch}-{self.seq}\n".encode("ascii") if self.seq is not None else b""
+            # json.dumps escapes newlines, so the payload always fits one data line
+            self._sse = event_id + b"data: " + self.json + b"\n\n"
+        return self._sse
+
+    def msgpack(self) -> bytes:
+        """MessagePack binary frame (see protocol.py)."""
+        if self._msgpack is None:
+            if self._batch is not None:
+                self._msgpack = msgpack_batch([envelope.msgpack() for envelope in self._batch])
+            elif self._message is not None:
+                self._msgpack = to_msgpack(self._message)
+            else:
+                self._msgpack = json_to_msgpack(self.json)
+            self._message = None
+        return self._msgpack
+
+    def encoded(self, fmt: str, epoch: str) -> bytes:
+        if fmt == "sse":
+            return self.sse(epoch)
+        if fmt == FORMAT_MSGPACK:
+            return self.msgpack()
+        return self.json
+
+
+# SSE comment line: ignored by EventSource, keeps proxies from closing the stream
+SSE_KEEPALIVE = Envelope(b"", sse=b": keep-alive\n\n")
+
+
+class SseConnection:
+    """Server-Sent Events response with the small interface HubClient writes to."""
+
+    def __init__(self, response: web.StreamResponse):
+        self.response = response
+        self.closed = False
+        self._closed_event = asyncio.Event()
+
+    async def send_frame(self, payload: bytes, opcode: WSMsgType) -> None:
+        await self.response.write(payload)
+
+    async def close(self, code: int = WSCloseCode.GOING_AWAY, message: bytes = b"") -> None:
+        self.closed = True
+        self._closed_event.set()
+
+    async def wait_closed(self, timeout: float | None) -> bool:
+        """Wait until connection is closed. Returns False on timeout."""
+        try:
+            await asyncio.wait_for(self._closed_event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class HubClient:
+    """One connected client with its own bounded send queue and writer task."""
+
+    def __init__(
+        self,
+        hub: "BroadcastHub",
+        conn: web.WebSocketResponse | SseConnection,
+        max_queue: int,
+        fmt: str = "json",
+        topics: frozenset[str] | None = None,
+    ):
+        self.hub = hub
+        self.conn = conn
+        self.format = fmt
+        # None = every message
+        self.topics = topics
+        self.connected_at = time.monotonic()
+        # Last seq published before this client joined; a pending batch only brings it newer messages
+        self.joined_seq = hub.last_seq
+
+        # (enqueued_at, envelope) - oldest first
+        self._queue: deque[tuple[float, Envelope]] = deque()
+        self._max_queue = max_queue
+        self._wakeup = asyncio.Event()
+        self._writer_task: asyncio.Task | None = None
+
+        self.sent = 0
+        self.last_send_ms = 0.0
+        self.evicted = False
+
+    def start(self) -> None:
+        self._writer_task = asyncio.create_task(self._writer())
+
+    def accepts(self, envelope: Envelope) -> bool:
+        return self.topics is None or not self.topics.isdisjoint(envelope.topics)
+
+    def enqueue(self, envelope: Envelope) -> bool:
+        """Queue message for sending. Returns False if client is too far behind."""
+        if len(self._queue) >= self._max_queue:
+            return False
+        self._queue.append((time.monotonic(), envelope))
+        self._wakeup.set()
+        return True
+
+    @property
+    def queue_size(self) -> int:
+        return len(self._queue)
+
+    @property
+    def lag_ms(self) -> float:
+        """How long the oldest queued message has been waiting."""
+        return self.lag_at(time.monotonic()) * 1000
+
+    def lag_at(self, now: float) -> float:
+        """Seconds the oldest queued message has been waiting at time now."""
+        if not self._queue:
+            return 0.0
+        return now - self._queue[0][0]
+
+    async def _send(self, envelope: Envelope) -> None:
+        payload = envelope.encoded(self.format, self.hub.epoch)
+        binary = self.format == FORMAT_MSGPACK
+        if hasattr(self.conn, "send_frame"):
+            # Payload is already encoded, skip re-encoding per client
+            await self.conn.send_frame(payload, WSMsgType.BINARY if binary else WSMsgType.TEXT)
+        elif binary:
+            await self.conn.send_bytes(payload)
+        else:
+            await self.conn.send_str(payload.decode("utf-8"))
+
+    async def _writer(self) -> None:
+        try:
+            while True:
+                if not self._queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+
+                _, envelope = self._queue[0]
+                if self.conn.closed:
+                    break
+
+                started = time.monotonic()
+                await self._send(envelope)
+                elapsed = time.monotonic() - started
+                self.last_send_ms = elapsed * 1000
+                self.hub.send_duration.observe(elapsed)
+
+                self._queue.popleft()
+                self.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[BroadcastHub:{self.hub.name}] Send failed: {e}")
+            await self.close(WSCloseCode.GOING_AWAY, b"send failed")
+
+    async def close(self, code: int = WSCloseCode.GOING_AWAY, message: bytes = b"") -> None:
+        self._queue.clear()
+        if not self.conn.closed:
+            try:
+                await self.conn.close(code=code, message=message)
+            except Exception:
+                pass
+
+    async def stop(self) -> None:
+        if self._writer_task:
+            self._writer_task.cancel()
+            try:
+                await self._writer_task
+            except asyncio.CancelledError:
+                pass
+            self._writer_task = None
+
+
+class BroadcastHub:
+    """
+    Fan-out of JSON messages to many WebSocket and SSE clients.
+
+    Each message is serialized once. Publishing only appends the encoded
+    payload to every client's bounded queue, so one stalled client never
+    delays the others. Clients whose queue overflows, or whose oldest
+    message waits longer than send_timeout, are disconnected.
+
+    Published messages get a sequence number ("seq") and are kept in a
+    bounded replay ring, so a reconnecting client can ask for everything
+    after the last seq it saw. "epoch" changes on every server start, which
+    tells clients that old sequence numbers are meaningless.
+
+    With batch_window > 0, messages published within that many seconds are
+    sent as one {"type": "batch", "messages": [...]} frame, built once for
+    all clients from the already encoded payloads. SSE clients get the same
+    messages as separate events in one write.
+
+    Clients may subscribe to topics; messages are routed through an index
+    from topic to subscribers, clients without topics get everything.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_queue: int = 256,
+        send_timeout: float = 10.0,
+        replay_size: int = 256,
+        batch_window: float = 0.0,
+    ):
+        self.name = name
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.batch_window = batch_window
+        self.epoch = f"{time.time_ns():x}"
+
+        self._clients: dict[web.WebSocketResponse | SseConnection, HubClient] = {}
+        # Topic -> subscribed clients; clients without topics are in _unfiltered
+        self._by_topic: dict[str, set[HubClient]] = {}
+        self._unfiltered: set[HubClient] = set()
+        self._close_tasks: set[asyncio.Task] = set()
+
+        # Oldest first; each envelope keeps its seq and expiry
+        self._replay: deque[Envelope] = deque(maxlen=replay_size or None)
+        self._replay_enabled = replay_size > 0
+        self._seq = 0
+
+        # Called with (envelope, ttl) for every published message
+        self._listeners: list[Callable[[Envelope, float | None], None]] = []
+
+        # Published during the current batch window, not yet queued for clients
+        self._pending: list[Envelope] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+
+        self.published = 0
+        self.evicted = 0
+        self.batches = 0
+
+        self.send_duration = metrics.WS_SEND_DURATION.labels(name)
+        self._published_total = metrics.WS_MESSAGES_PUBLISHED.labels(name)
+        self._evicted_total = metrics.WS_CLIENTS_EVICTED.labels(name)
+        self._register_metrics()
+
+    def _register_metrics(self) -> None:
+        """Gauges read from hub state at scrape time - nothing extra on publish."""
+        metrics.WS_CLIENTS.labels(self.name, "websocket").set_function(
+            lambda: sum(1 for client in self._clients.values() if client.format != "sse")
+        )
+        metrics.WS_CLIENTS.labels(self.name, "sse").set_function(
+            lambda: sum(1 for client in self._clients.values() if client.format == "sse")
+        )
+        metrics.WS_MAX_LAG.labels(self.name).set_function(
+            lambda: max((client.lag_ms for client in self._clients.values()), default=0.0) / 1000
+        )
+
+    def add_websocket(
+        self,
+        ws: web.WebSocketResponse,
+        fmt: str = "json",
+        topics: frozenset[str] | None = None,
+    ) -> HubClient:
+        """Register prepared WebSocket and start its writer. fmt: "json" or "msgpack"."""
+        return self._add(ws, fmt, topics)
+
+    def add_sse(self, conn: SseConnection, topics: frozenset[str] | None = None) -> HubClient:
+        """Register prepared Server-Sent Events stream and start its writer."""
+        return self._add(conn, "sse", topics)
+
+    def _add(self, conn: web.WebSocketResponse | SseConnection, fmt: str, topics: frozenset[str] | None) -> HubClient:
+        client = HubClient(self, conn, self.max_queue, fmt, topics)
+        self._clients[conn] = client
+        if topics is None:
+            self._unfiltered.add(client)
+        else:
+            for topic in topics:
+                self._by_topic.setdefault(topic, set()).add(client)
+        client.start()
+        return client
+
+    def _forget(self, client: HubClient) -> None:
+        self._clients.pop(client.conn, None)
+        self._unfiltered.discard(client)
+        for topic in client.topics or ():
+            subscribers = self._by_topic.get(topic)
+            if subscribers is not None:
+                subscribers.discard(client)
+                if not subscribers:
+                    del self._by_topic[topic]
+
+    async def remove_client(self, conn: web.WebSocketResponse | SseConnection) -> None:
+        client = self._clients.get(conn)
+        if client:
+            self._forget(client)
+            await client.stop()
+
+    def get_client(self, conn: web.WebSocketResponse | SseConnection) -> HubClient | None:
+        return self._clients.get(conn)
+
+    def client_count(self) -> int:
+        return len(self._clients)
+
+    @staticmethod
+    def encode(message: dict) -> bytes:
+        return json.dumps(message, ensure_ascii=False).encode("utf-8")
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    def parse_event_id(self, event_id: str | None) -> int | None:
+        """Get seq from SSE Last-Event-ID ("<epoch>-<seq>"), None if it's from another epoch."""
+        if not event_id:
+            return None
+        epoch, _, seq = event_id.strip().rpartition("-")
+        if epoch != self.epoch:
+            return None
+        try:
+            return int(seq)
+        except ValueError:
+            return None
+
+    def add_listener(self, listener: Callable[[Envelope, float | None], None]) -> None:
+        """Get every published message, e.g. to forward it to other processes."""
+        self._listeners.append(listener)
+
+    def sync(self, epoch: str, seq: int) -> None:
+        """Continue a stream sequenced elsewhere (worker process mirroring the main one)."""
+        if epoch != self.epoch:
+            self._replay.clear()
+        self.epoch = epoch
+        self._seq = seq
+
+    def publish(self, message: dict, ttl: float | None = None, topics: tuple[str, ...] = ()) -> int:
+        """
+        Queue message for all clients. Returns number of clients it was queued for.
+        ttl: seconds after which the message is no longer worth replaying.
+        topics: besides the message type, which subscribers get it.
+        """
+        message = {**message, "seq": self._seq + 1}
+        topics = (message["type"], *topics) if "type" in message else tuple(topics)
+        return self.publish_encoded(self.encode(message), self._seq + 1, ttl, message, topics)
+
+    def publish_encoded(
+        self,
+        payload: bytes,
+        seq: int,
+        ttl: float | None = None,
+        message: dict | None = None,
+        topics: tuple[str, ...] = (),
+    ) -> int:
+        """Publish message that already is encoded JSON with its seq (message: the decoded payload, if at hand)."""
+        self._seq = seq
+        now = time.monotonic()
+        envelope = Envelope(
+            payload, seq=seq, expires_at=now + ttl if ttl is not None else None, message=message, topics=tuple(topics)
+        )
+        self.published += 1
+        self._published_total.inc()
+
+        for listener in self._listeners:
+            listener(envelope, ttl)
+
+        if self._replay_enabled:
+            self._replay.append(envelope)
+
+        if not self._clients:
+            return 0
+
+        if self.batch_window > 0:
+            self._pending.append(envelope)
+            if self._flush_handle is None:
+                self._flush_handle = asyncio.get_running_loop().call_later(self.batch_window, self._flush)
+            return len(self._clients)
+
+        return self._deliver(envelope, now)
+
+    def _recipients(self, envelope: Envelope) -> list[HubClient]:
+        """Clients subscribed to any topic of envelope, looked up in the topic index."""
+        if not self._by_topic:
+            return list(self._clients.values())
+
+        recipients = list(self._unfiltered)
+        matched = [self._by_topic[topic] for topic in envelope.topics if topic in self._by_topic]
+        if len(matched) == 1:
+            recipients.extend(matched[0])
+        elif matched:
+            recipients.extend(set().union(*matched))
+        return recipients
+
+    def _deliver(self, envelope: Envelope, now: float) -> int:
+        queued = 0
+        for client in self._recipients(envelope):
+            if self._queue_for(client, envelope, now):
+                queued += 1
+        return queued
+
+    def _queue_for(self, client: HubClient, envelope: Envelope, now: float) -> bool:
+        if client.lag_at(now) > self.send_timeout or not client.enqueue(envelope):
+            self._evict(client)
+            return False
+        return True
+
+    def _flush(self) -> None:
+        """End of batch window: one frame per client with everything it gets from the window."""
+        self._flush_handle = None
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        per_client: dict[HubClient, list[Envelope]] = {}
+        for envelope in pending:
+            for client in self._recipients(envelope):
+                # Joined during the window: init or replay already covered older messages
+                if client.joined_seq < envelope.seq:
+                    per_client.setdefault(client, []).append(envelope)
+
+        # Clients with the same subscriptions share one encoded frame
+        frames: dict[tuple[int, ...], Envelope] = {}
+        now = time.monotonic()
+        for client, envelopes in per_client.items():
+            key = tuple(envelope.seq for envelope in envelopes)
+            frame = frames.get(key)
+            if frame is None:
+                frame = frames[key] = envelopes[0] if len(envelopes) == 1 else self._batch(envelopes)
+            self._queue_for(client, frame, now)
+
+    def _batch(self, envelopes: list[Envelope]) -> Envelope:
+        self.batches += 1
+        payload = b'{"type":"batch","messages":[' + b",".join(envelope.json for envelope in envelopes) + b"]}"
+        return Envelope(payload, seq=envelopes[-1].seq, batch=envelopes)
+
+    def replay(self, client: HubClient, since: int, epoch: str | None = None) -> bool:
+        """
+        Queue messages published after seq `since` for client, skipping expired ones.
+        Returns False if they are no longer all in the ring (or epoch changed),
+        then the caller should send full state instead.
+        Call right after adding the client, before awaiting anything.
+        """
+        if epoch != self.epoch or since > self._seq:
+            return False
+        if since == self._seq:
+            return True
+        if not self._replay or self._replay[0].seq > since + 1:
+            return False
+
+        now = time.monotonic()
+        for envelope in self._replay:
+            if envelope.seq <= since or (envelope.expires_at is not None and envelope.expires_at < now):
+                continue
+            if not client.accepts(envelope):
+                continue
+            if not client.enqueue(envelope):
+                self._evict(client)
+                break
+        return True
+
+    def send_to(self, client: HubClient, message: dict) -> bool:
+        """Queue message for one client (keeps order with broadcasts)."""
+        return self.send_envelope(client, Envelope(self.encode(message), message=message))
+
+    def send_envelope(self, client: HubClient, envelope: Envelope) -> bool:
+        if client.enqueue(envelope):
+            return True
+        self._evict(client)
+        return False
+
+    def _evict(self, client: HubClient) -> None:
+        """Disconnect client that fell too far behind."""
+        if client.evicted:
+            return
+        client.evicted = True
+        self.evicted += 1
+        self._evicted_total.inc()
+        self._forget(client)
+        print(f"[BroadcastHub:{self.name}] Evicting slow client ({client.queue_size} queued, {client.lag_ms:.0f} ms behind)")
+
+        async def close() -> None:
+            await client.stop()
+            await client.close(WSCloseCode.TRY_AGAIN_LATER, b"slow consumer")
+
+        task = asyncio.create_task(close())
+        self._close_tasks.add(task)
+        task.add_done_callback(self._close_tasks.discard)
+
+    async def close_all(self) -> None:
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._pending.clear()
+        clients = list(self._clients.values())
+        self._clients.clear()
+        self._by_topic.clear()
+        self._unfiltered.clear()
+        for client in clients:
+            await client.stop()
+            await client.close()
+
+    def get_stats(self) -> dict:
+        """Client count, delivery counters and per-client lag."""
+        clients = list(self._clients.values())
+        lags = [client.lag_ms for client in clients]
+        return {
+            "clients": len(clients),
+            "sse_clients": sum(1 for client in clients if client.format == "sse"),
+            "published": self.published,
+            "seq": self._seq,
+            "replay_size": len(self._replay),
+            "evicted": self.evicted,
+            "batches": self.batches,
+            "topics": {topic: len(subscribers) for topic, subscribers in self._by_topic.items()},
+            "max_queue_size": max((client.queue_size for client in clients), default=0),
+            "max_lag_ms": max(lags, default=0.0),
+            "client_lag_ms": lags,
+            "client_send_ms": [client.last_send_ms for client in clients],
+        }
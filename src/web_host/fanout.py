@@ -0,0 +1,199 @@
+import asyncio
+import json
+from pathlib import Path
+from typing import Awaitable, Callable
+
+# Frame: one JSON header line, then header["size"] raw payload bytes and a newline
+FrameHandler = Callable[[dict, bytes], Awaitable[None]]
+
+
+async def write_frame(writer: asyncio.StreamWriter, header: dict, payload: bytes = b"") -> None:
+    if payload:
+        header = {**header, "size": len(payload)}
+    writer.write(json.dumps(header).encode("utf-8") + b"\n")
+    if payload:
+        writer.write(payload + b"\n")
+    await writer.drain()
+
+
+async def read_frame(reader: asyncio.StreamReader) -> tuple[dict, bytes] | None:
+    """Read next frame, None when the other side closed the socket."""
+    line = await reader.readline()
+    if not line:
+        return None
+    header = json.loads(line)
+    size = header.get("size", 0)
+    payload = (await reader.readexactly(size + 1))[:-1] if size else b""
+    return header, payload
+
+
+class FanoutServer:
+    """
+    Main process side of the event channel to web workers.
+
+    Workers connect over a Unix socket, get a snapshot of the current state
+    and then every published message in order. Requests from workers (like
+    a test donation click) are passed to the request handler.
+    """
+
+    # Worker that stopped reading is dropped; it resyncs from a snapshot on reconnect
+    MAX_BUFFER = 32 * 1024 * 1024
+
+    def __init__(
+        self,
+        socket_path: Path,
+        snapshot: Callable[[], dict],
+        on_request: FrameHandler,
+    ):
+        self._socket_path = socket_path
+        self._snapshot = snapshot
+        self._on_request = on_request
+
+        self._server: asyncio.Server | None = None
+        self._writers: set[asyncio.StreamWriter] = set()
+        # Connection handler tasks, cancelled and awaited on stop
+        self._handlers: set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        self._socket_path.unlink(missing_ok=True)
+        self._server = await asyncio.start_unix_server(self._handle_worker, path=str(self._socket_path))
+        print(f"[Fanout] Listening on {self._socket_path}")
+
+    async def stop(self) -> None:
+        if self._server:
+            self._server.close()
+        handlers = list(self._handlers)
+        for task in handlers:
+            task.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+        for writer in list(self._writers):
+            writer.close()
+        self._writers.clear()
+        if self._server:
+            await self._server.wait_closed()
+            self._server = None
+        self._socket_path.unlink(missing_ok=True)
+
+    def worker_count(self) -> int:
+        return len(self._writers)
+
+    async def _handle_worker(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # Snapshot is buffered and the writer registered in one step, so no publish can slip in between
+        snapshot = json.dumps({"op": "snapshot", **self._snapshot()}, ensure_ascii=False)
+        writer.write(snapshot.encode("utf-8") + b"\n")
+        self._writers.add(writer)
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        print(f"[Fanout] Worker connected. Total: {len(self._writers)}")
+
+        try:
+            await writer.drain()
+            while True:
+                frame = await read_frame(reader)
+                if frame is None:
+                    break
+                await self._on_request(*frame)
+        except (ConnectionError, OSError, asyncio.IncompleteReadError, ValueError) as e:
+            print(f"[Fanout] Worker connection error: {e}")
+        except asyncio.CancelledError:
+            # Server stopping; returning normally keeps asyncio from logging the cancellation
+            pass
+        finally:
+            self._handlers.discard(task)
+            self._writers.discard(writer)
+            writer.close()
+            print(f"[Fanout] Worker disconnected. Total: {len(self._writers)}")
+
+    def publish(self, hub: str, payload: bytes, seq: int, ttl: float | None, topics: tuple[str, ...] = ()) -> None:
+        """Send encoded hub message to all workers."""
+        self.send_all({"op": "publish", "hub": hub, "seq": seq, "ttl": ttl, "topics": topics}, payload)
+
+    def send_all(self, header: dict, payload: bytes = b"") -> None:
+        """Send frame to all workers without waiting for any of them."""
+        if not self._writers:
+            return
+
+        header = json.dumps({**header, "size": len(payload)})
+        frame = header.encode("utf-8") + b"\n" + payload + b"\n"
+        for writer in list(self._writers):
+            # Writes are buffered by the transport, publishing never waits for a worker
+            if writer.transport.get_write_buffer_size() > self.MAX_BUFFER:
+                print("[Fanout] Worker is not reading, disconnecting it")
+                self._writers.discard(writer)
+                writer.close()
+                continue
+            try:
+                writer.write(frame)
+            except (ConnectionError, OSError):
+                self._writers.discard(writer)
+
+
+class FanoutClient:
+    """Worker side of the event channel. Reconnects until stopped."""
+
+    RECONNECT_DELAY = 1.0
+
+    def __init__(self, socket_path: Path, on_frame: FrameHandler):
+        self._socket_path = socket_path
+        self._on_frame = on_frame
+
+        self._writer: asyncio.StreamWriter | None = None
+        self._task: asyncio.Task | None = None
+        self._connected = asyncio.Event()
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+
+    async def wait_connected(self, timeout: float | None = None) -> bool:
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def request(self, header: dict) -> bool:
+        """Send request to main process. Returns False if not connected."""
+        if not self._writer:
+            return False
+        try:
+            await write_frame(self._writer, header)
+            return True
+        except (ConnectionError, OSError):
+            return False
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                reader, self._writer = await asyncio.open_unix_connection(str(self._socket_path))
+                while True:
+                    frame = await read_frame(reader)
+                    if frame is None:
+                        break
+                    await self._on_frame(*frame)
+                    # First frame is the snapshot - from here on state is in sync
+                    self._connected.set()
+                print("[Fanout] Main process closed the channel")
+            except asyncio.CancelledError:
+                raise
+            except (ConnectionError, OSError, asyncio.IncompleteReadError, ValueError) as e:
+                if self._connected.is_set():
+                    print(f"[Fanout] Channel error: {e}")
+            finally:
+                self._connected.clear()
+                if self._writer:
+                    self._writer.close()
+                    self._writer = None
+
+            await asyncio.sleep(self.RECONNECT_DELAY)
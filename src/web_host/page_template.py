@@ -0,0 +1,77 @@
+import json
+import os
+from pathlib import Path
+
+from .static_assets import StaticAssets, TEMPLATE_ASSET_RE
+
+# Where the inline state goes; a template without it gets it before </body>
+SNAPSHOT_MARKER = "<!--snapshot-->"
+
+
+class PageTemplate:
+    """
+    HTML page compiled once into literal chunks and slots.
+
+    Slots are static asset references (filled with fingerprinted URLs, which
+    follow file changes) and the snapshot: page state as inline JSON, so the
+    page can paint before its socket connects. The file is compiled again
+    when its mtime or size changes.
+    """
+
+    def __init__(self, path: Path, assets: StaticAssets):
+        self._path = path
+        self._assets = assets
+        self._stat: tuple[int, int] | None = None
+        # str = literal HTML, tuple = (prefix, rel_path) asset, None = snapshot
+        self._parts: list[str | tuple[str, str] | None] = []
+
+    def exists(self) -> bool:
+        return self._path.exists()
+
+    def render(self, snapshot: dict | None = None) -> str:
+        self._reload_if_changed()
+        script = self.snapshot_script(snapshot) if snapshot is not None else ""
+        out = []
+        for part in self._parts:
+            if isinstance(part, str):
+                out.append(part)
+            elif part is None:
+                out.append(script)
+            else:
+                prefix, rel_path = part
+                out.append(self._assets.url(prefix, rel_path))
+        return "".join(out)
+
+    @staticmethod
+    def snapshot_script(snapshot: dict) -> str:
+        # "<" escaped, so no string in the state can close the script element
+        data = json.dumps(snapshot, ensure_ascii=False, separators=(",", ":")).replace("<", "\\u003c")
+        return f'<script id="snapshot" type="application/json">{data}</script>'
+
+    def _reload_if_changed(self) -> None:
+        stat = os.stat(self._path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        if key == self._stat:
+            return
+        self._parts = self._compile(self._path.read_text(encoding="utf-8"))
+        self._stat = key
+        print(f"[PageTemplate] Compiled {self._path.name}")
+
+    @staticmethod
+    def _compile(content: str) -> list[str | tuple[str, str] | None]:
+        if SNAPSHOT_MARKER not in content:
+            content = content.replace("</body>", SNAPSHOT_MARKER + "\n</body>", 1)
+
+        parts: list[str | tuple[str, str] | None] = []
+        for i, chunk in enumerate(content.split(SNAPSHOT_MARKER)):
+            if i:
+                parts.append(None)
+            pos = 0
+            for match in TEMPLATE_ASSET_RE.finditer(chunk):
+                attr, prefix, rel_path = match.groups()
+                parts.append(chunk[pos:match.start()] + f'{attr}="')
+                parts.append((prefix, rel_path))
+                parts.append('"')
+                pos = match.end()
+            parts.append(chunk[pos:])
+        return parts
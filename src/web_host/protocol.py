@@ -0,0 +1,68 @@
+"""
+Wire formats of the overlay and feed sockets.
+
+A client picks the format with the WebSocket subprotocol header
+(Sec-WebSocket-Protocol: donations.v1.msgpack, donations.v1.json) or with
+?format=msgpack. The schema version is part of the subprotocol name and is
+sent in "hello", so either side can tell when messages change shape.
+MessagePack needs the optional msgpack package; without it clients get JSON.
+Client-to-server messages (ping, ack) are always JSON text.
+"""
+import json
+
+from aiohttp import web
+
+try:
+    import msgpack
+    HAS_MSGPACK = True
+except ImportError:
+    HAS_MSGPACK = False
+
+SCHEMA_VERSION = 1
+
+FORMAT_JSON = "json"
+FORMAT_MSGPACK = "msgpack"
+
+
+def available_formats() -> tuple[str, ...]:
+    if HAS_MSGPACK:
+        return (FORMAT_JSON, FORMAT_MSGPACK)
+    return (FORMAT_JSON,)
+
+
+def subprotocol(fmt: str) -> str:
+    return f"donations.v{SCHEMA_VERSION}.{fmt}"
+
+
+def subprotocols() -> tuple[str, ...]:
+    """Offered to clients; aiohttp picks the first one in the client's order that matches."""
+    return tuple(subprotocol(fmt) for fmt in available_formats())
+
+
+def negotiate(request: web.Request, selected_protocol: str | None) -> str:
+    """Format for a prepared WebSocket: subprotocol first, then ?format=, else JSON."""
+    for fmt in available_formats():
+        if selected_protocol == subprotocol(fmt):
+            return fmt
+    fmt = request.query.get("format")
+    if fmt in available_formats():
+        return fmt
+    return FORMAT_JSON
+
+
+def to_msgpack(message: dict) -> bytes:
+    return msgpack.packb(message, use_bin_type=True)
+
+
+def msgpack_batch(parts: list[bytes]) -> bytes:
+    """{"type": "batch", "messages": [...]} around already encoded messages."""
+    packer = msgpack.Packer(use_bin_type=True)
+    return (
+        packer.pack_map_header(2) + packer.pack("type") + packer.pack("batch")
+        + packer.pack("messages") + packer.pack_array_header(len(parts)) + b"".join(parts)
+    )
+
+
+def json_to_msgpack(payload: bytes) -> bytes:
+    """Re-encode a JSON payload (worker processes and batches only have the bytes)."""
+    return to_msgpack(json.loads(payload))
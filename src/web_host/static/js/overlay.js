@@ -1,6 +1,7 @@
 (function() {
     const mediaContainer = document.getElementById('media-container');
     const mediaImage = document.getElementById('media-image');
+    const mediaVideo = document.getElementById('media-video');
     const mediaAudio = document.getElementById('media-audio');
     const donorNameEl = document.getElementById('donor-name');
     const donationCommentEl = document.getElementById('donation-comment');
@@ -15,6 +16,20 @@
     const maxDelay = 30000;
     let reconnectTimeout = null;
 
+    // Client heartbeat: the server drops connections that stay silent,
+    // and we reconnect if the server stops answering. Server sends interval in "hello".
+    let heartbeatInterval = 15000;
+    let heartbeatTimer = null;
+    let lastMessageAt = 0;
+
+    // Position in server stream: reconnects ask only for messages after lastSeq
+    let streamEpoch = null;
+    let lastSeq = null;
+
+    // Preloaded media: url -> Image/Audio element, oldest first
+    const PRELOAD_CACHE_SIZE = 8;
+    const preloadCache = new Map();
+
     function updateStatus(connected) {
         if (statusEl) {
             statusEl.textContent = connected ? 'WebSocket: connected' : 'WebSocket: disconnected';
@@ -27,22 +42,35 @@
 
     function connect() {
         const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-        const wsUrl = `${protocol}//${window.location.host}/ws`;
+        const params = new URLSearchParams();
+        // Scene subscribes with its own ?topics=, e.g. /?topics=tier:big
+        const topics = new URLSearchParams(window.location.search).get('topics');
+        if (topics) {
+            params.set('topics', topics);
+        }
+        if (lastSeq !== null) {
+            params.set('since', lastSeq);
+            params.set('epoch', streamEpoch);
+        }
+        const query = params.toString();
+        const wsUrl = `${protocol}//${window.location.host}/ws` + (query ? `?${query}` : '');
 
         console.log('[Overlay] Connecting to', wsUrl);
-        ws = new WebSocket(wsUrl);
+        ws = new WebSocket(wsUrl, MessagePack.subprotocols());
+        ws.binaryType = 'arraybuffer';
 
         ws.onopen = function() {
             console.log('[Overlay] WebSocket connected successfully');
             reconnectAttempts = 0;
             updateStatus(true);
+            startHeartbeat();
         };
 
         ws.onmessage = function(event) {
+            lastMessageAt = Date.now();
             console.log('[Overlay] Raw message:', event.data);
             try {
-                const data = JSON.parse(event.data);
-                handleMessage(data);
+                dispatch(MessagePack.parse(event.data));
             } catch (e) {
                 console.error('[Overlay] Failed to parse message:', e);
             }
@@ -50,6 +78,7 @@
 
         ws.onclose = function() {
             console.log('[Overlay] WebSocket disconnected');
+            stopHeartbeat();
             updateStatus(false);
             scheduleReconnect();
         };
@@ -60,6 +89,79 @@
         };
     }
 
+    function dispatch(data) {
+        if (data.type === 'batch') {
+            // Broadcasts of a burst packed into one frame, each keeps its own seq
+            data.messages.forEach(dispatch);
+            return;
+        }
+        if (trackSequence(data)) {
+            handleMessage(data);
+        }
+    }
+
+    // Returns false for messages already received before a reconnect
+    function trackSequence(data) {
+        if (data.type === 'init') {
+            streamEpoch = data.epoch;
+            lastSeq = data.seq;
+            return true;
+        }
+        if (data.type === 'hello') {
+            if (data.epoch !== streamEpoch) {
+                // Server restarted, old sequence numbers mean nothing
+                streamEpoch = data.epoch;
+                lastSeq = data.seq;
+            }
+            return true;
+        }
+        if (typeof data.seq === 'number') {
+            if (lastSeq !== null && data.seq <= lastSeq) {
+                return false;
+            }
+            lastSeq = data.seq;
+        }
+        return true;
+    }
+
+    function startHeartbeat() {
+        stopHeartbeat();
+        lastMessageAt = Date.now();
+        heartbeatTimer = setInterval(function() {
+            if (!ws || ws.readyState !== WebSocket.OPEN) {
+                return;
+            }
+            if (Date.now() - lastMessageAt > heartbeatInterval * 3) {
+                // Half-open connection: close() could wait for a handshake that never comes
+                console.warn('[Overlay] Server not responding, reconnecting');
+                const deadWs = ws;
+                deadWs.onclose = null;
+                deadWs.close();
+                stopHeartbeat();
+                updateStatus(false);
+                scheduleReconnect();
+                return;
+            }
+            ws.send(JSON.stringify({ type: 'ping', t: Date.now() }));
+        }, heartbeatInterval);
+    }
+
+    function sendAck(traceId) {
+        // Sent once the alert is painted; closes the donation's trace on the server
+        requestAnimationFrame(function() {
+            if (ws && ws.readyState === WebSocket.OPEN) {
+                ws.send(JSON.stringify({ type: 'ack', trace_id: traceId }));
+            }
+        });
+    }
+
+    function stopHeartbeat() {
+        if (heartbeatTimer) {
+            clearInterval(heartbeatTimer);
+            heartbeatTimer = null;
+        }
+    }
+
     function scheduleReconnect() {
         // Calculate exponential backoff, but cap at maxDelay
         const delay = Math.min(baseDelay * Math.pow(2, reconnectAttempts), maxDelay);
@@ -73,25 +175,145 @@
         console.log('[Overlay] Handling message:', data);
 
         switch (data.type) {
+            case 'hello':
+                if (data.heartbeat_ms > 0 && data.heartbeat_ms !== heartbeatInterval) {
+                    heartbeatInterval = data.heartbeat_ms;
+                    startHeartbeat();
+                }
+                break;
+            case 'pong':
+                break;
             case 'show_image':
-                showImage(data.image, data.duration);
+                showImage(data.image, data.duration, data.video);
                 break;
             case 'show_media':
-                showMedia(data.image, data.audio, data.duration, data.donor_name, data.comment, data.amount);
+                showMedia(data.image, data.audio, data.duration, data.donor_name, data.comment, data.amount, data.video);
+                if (data.trace_id) {
+                    sendAck(data.trace_id);
+                }
                 break;
             case 'clear':
                 hideMedia();
                 break;
+            case 'preload':
+                preloadMedia(data.images || [], data.audio || [], data.videos || []);
+                break;
+            case 'leaderboard':
+                // For leaderboard widgets (?topics=leaderboard), the alert overlay doesn't show it
+                break;
+            case 'goal_progress':
+                // For goal bar widgets (?topics=goal_progress)
+                break;
             default:
                 console.warn('[Overlay] Unknown message type:', data.type);
         }
     }
 
-    function showImage(imageSrc, duration) {
-        showMedia(imageSrc, null, duration);
+    function rememberPreload(url, element) {
+        // Re-insert to mark as recently used
+        preloadCache.delete(url);
+        preloadCache.set(url, element);
+
+        while (preloadCache.size > PRELOAD_CACHE_SIZE) {
+            const oldest = preloadCache.keys().next().value;
+            preloadCache.delete(oldest);
+        }
     }
 
-    function showMedia(imageSrc, audioSrc, duration, donorName, comment, amount) {
+    function pickVideoSource(video) {
+        // Sources come best first, take the first one this browser can play
+        if (!video || !video.sources || !mediaVideo) {
+            return null;
+        }
+        for (const source of video.sources) {
+            if (mediaVideo.canPlayType(source.type)) {
+                return source.src;
+            }
+        }
+        return null;
+    }
+
+    function preloadMedia(images, audio, videos) {
+        images.forEach(url => {
+            if (preloadCache.has(url)) {
+                rememberPreload(url, preloadCache.get(url));
+                return;
+            }
+            const img = new Image();
+            img.decoding = 'async';
+            img.src = url;
+            if (img.decode) {
+                img.decode().catch(() => {});
+            }
+            rememberPreload(url, img);
+        });
+
+        audio.forEach(url => {
+            if (preloadCache.has(url)) {
+                rememberPreload(url, preloadCache.get(url));
+                return;
+            }
+            const el = new Audio();
+            el.preload = 'auto';
+            el.src = url;
+            el.load();
+            rememberPreload(url, el);
+        });
+
+        videos.forEach(video => {
+            const url = pickVideoSource(video);
+            if (!url) {
+                return;
+            }
+            if (preloadCache.has(url)) {
+                rememberPreload(url, preloadCache.get(url));
+                return;
+            }
+            const el = document.createElement('video');
+            el.muted = true;
+            el.preload = 'auto';
+            el.src = url;
+            el.load();
+            rememberPreload(url, el);
+        });
+
+        console.log('[Overlay] Preloading:', images, audio, videos, 'cache size:', preloadCache.size);
+    }
+
+    function showImage(imageSrc, duration, video) {
+        showMedia(imageSrc, null, duration, null, null, null, video);
+    }
+
+    function showVisual(imageSrc, video) {
+        const videoSrc = pickVideoSource(video);
+
+        if (videoSrc) {
+            // Video variant: much cheaper to decode than the GIF
+            mediaImage.classList.add('hidden-media');
+            mediaImage.src = '';
+            mediaVideo.poster = video.poster || '';
+            mediaVideo.src = videoSrc;
+            mediaVideo.classList.remove('hidden-media');
+            mediaVideo.currentTime = 0;
+            mediaVideo.play().catch(e => {
+                console.warn('[Overlay] Video play failed, falling back to image:', e.message);
+                showVisual(imageSrc, null);
+            });
+            console.log('[Overlay] Video src set to:', videoSrc);
+            return;
+        }
+
+        if (mediaVideo) {
+            mediaVideo.pause();
+            mediaVideo.removeAttribute('src');
+            mediaVideo.classList.add('hidden-media');
+        }
+        mediaImage.classList.remove('hidden-media');
+        mediaImage.src = imageSrc;
+        console.log('[Overlay] Image src set to:', imageSrc);
+    }
+
+    function showMedia(imageSrc, audioSrc, duration, donorName, comment, amount, video) {
         console.log('[Overlay] showMedia:', { imageSrc, audioSrc, duration, donorName, comment, amount });
 
         // Clear any pending hide
@@ -100,9 +322,8 @@
             hideTimeout = null;
         }
 
-        // Set image source
-        mediaImage.src = imageSrc;
-        console.log('[Overlay] Image src set to:', imageSrc);
+        // Set image or video source
+        showVisual(imageSrc, video);
 
         // Set donation info
         if (donorNameEl) {
@@ -158,6 +379,11 @@
             mediaContainer.classList.remove('visible', 'animate-out');
             mediaContainer.classList.add('hidden');
             mediaImage.src = '';
+            if (mediaVideo) {
+                mediaVideo.pause();
+                mediaVideo.removeAttribute('src');
+                mediaVideo.load();
+            }
             if (donorNameEl) donorNameEl.textContent = '';
             if (donationCommentEl) donationCommentEl.textContent = '';
             if (donationAmountEl) donationAmountEl.textContent = '';
@@ -175,7 +401,25 @@
         });
     }
 
+    // State inlined by the server: page config and stream position at render time
+    function applySnapshot() {
+        const el = document.getElementById('snapshot');
+        if (el) {
+            const snapshot = JSON.parse(el.textContent);
+            const testPanel = document.getElementById('test-panel');
+            if (testPanel) {
+                testPanel.style.display = snapshot.config.show_test_button ? 'block' : 'none';
+            }
+            // First connect resumes from here instead of starting the stream over
+            streamEpoch = snapshot.stream.epoch;
+            lastSeq = snapshot.stream.seq;
+        }
+        // Page is configured now: reveal what the template kept hidden
+        document.body.classList.remove('snapshot-pending');
+    }
+
     // Start connection
+    applySnapshot();
     updateStatus(false);
     connect();
 })();
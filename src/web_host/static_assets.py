@@ -0,0 +1,238 @@
+import asyncio
+import gzip
+import hashlib
+import mimetypes
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+from aiohttp import web
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+# Small text assets kept in memory with precompressed variants
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".html", ".svg", ".json", ".txt"}
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+# Static references inside templates: href="/static/..." or src="/feed/static/..."
+TEMPLATE_ASSET_RE = re.compile(r'(href|src)="(/static|/feed/static)/([^"?#]+)"')
+
+
+@dataclass
+class _Fingerprint:
+    mtime_ns: int
+    size: int
+    digest: str  # Short SHA-256 hex of content
+
+
+@dataclass
+class _TextAsset:
+    fingerprint: _Fingerprint
+    content_type: str
+    identity: bytes
+    gzip: bytes
+    br: bytes | None
+
+
+class StaticAssets:
+    """
+    Static file serving with content fingerprints.
+
+    url() returns "/prefix/path?v=<hash>". Requests carrying the current hash
+    are served as immutable (cached by the browser forever), requests without
+    it must revalidate with ETag / If-None-Match. CSS/JS are served from memory
+    with gzip and brotli variants; other files go through FileResponse, which
+    also handles Range requests for audio and video.
+    """
+
+    HASH_LENGTH = 16
+
+    def __init__(self):
+        # URL prefix -> (directory, names_are_hashes)
+        self._mounts: dict[str, tuple[Path, bool]] = {}
+        self._fingerprints: dict[Path, _Fingerprint] = {}
+        self._text_assets: dict[Path, _TextAsset] = {}
+
+    def add_route(self, app: web.Application, prefix: str, directory: Path, hashed_names: bool = False) -> None:
+        """
+        Serve directory under URL prefix.
+        hashed_names=True marks folders whose file names already are content hashes.
+        """
+        directory = directory.resolve()
+        self._mounts[prefix] = (directory, hashed_names)
+
+        async def handler(request: web.Request) -> web.StreamResponse:
+            return await self._handle(request, directory, hashed_names)
+
+        app.router.add_get(prefix + "/{path:.+}", handler)
+
+    def url(self, prefix: str, rel_path: str) -> str:
+        """Get fingerprinted URL of file (plain URL if file is missing)."""
+        mount = self._mounts.get(prefix)
+        if not mount:
+            return f"{prefix}/{rel_path}"
+
+        directory, hashed_names = mount
+        if hashed_names:
+            return f"{prefix}/{rel_path}"
+
+        path = self._resolve(directory, rel_path)
+        fingerprint = self._fingerprint(path) if path else None
+        if not fingerprint:
+            return f"{prefix}/{rel_path}"
+        return f"{prefix}/{rel_path}?v={fingerprint.digest}"
+
+    async def warm(self) -> None:
+        """Hash all mounted files in background thread, so first URLs don't block the loop."""
+        def hash_all() -> int:
+            count = 0
+            for directory, hashed_names in self._mounts.values():
+                if hashed_names or not directory.exists():
+                    continue
+                for file in directory.rglob("*"):
+                    if file.is_file() and self._fingerprint(file):
+                        count += 1
+            return count
+
+        count = await asyncio.to_thread(hash_all)
+        print(f"[StaticAssets] Fingerprinted {count} file(s)")
+
+    def _fingerprint(self, path: Path) -> _Fingerprint | None:
+        """Get content hash of file, recomputed only when mtime or size changes."""
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+
+        cached = self._fingerprints.get(path)
+        if cached and cached.mtime_ns == stat.st_mtime_ns and cached.size == stat.st_size:
+            return cached
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+
+        fingerprint = _Fingerprint(stat.st_mtime_ns, stat.st_size, digest.hexdigest()[:self.HASH_LENGTH])
+        self._fingerprints[path] = fingerprint
+        return fingerprint
+
+    def _text_asset(self, path: Path, fingerprint: _Fingerprint) -> _TextAsset:
+        cached = self._text_assets.get(path)
+        if cached and cached.fingerprint is fingerprint:
+            return cached
+
+        identity = path.read_bytes()
+        content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type in ("application/javascript", "application/json"):
+            content_type += "; charset=utf-8"
+
+        asset = _TextAsset(
+            fingerprint=fingerprint,
+            content_type=content_type,
+            identity=identity,
+            gzip=gzip.compress(identity, compresslevel=9, mtime=0),
+            br=brotli.compress(identity) if HAS_BROTLI else None,
+        )
+        self._text_assets[path] = asset
+        return asset
+
+    @staticmethod
+    def _resolve(directory: Path, rel_path: str) -> Path | None:
+        """Resolve path inside directory, None on traversal or missing file."""
+        try:
+            path = (directory / rel_path).resolve()
+        except (OSError, ValueError):
+            return None
+        if not path.is_relative_to(directory) or not path.is_file():
+            return None
+        return path
+
+    @staticmethod
+    def _accepted_encodings(request: web.Request) -> set[str]:
+        accepted = set()
+        for part in request.headers.get("Accept-Encoding", "").lower().split(","):
+            name, _, params = part.strip().partition(";")
+            quality = 1.0
+            params = params.strip().replace(" ", "")
+            if params.startswith("q="):
+                try:
+                    quality = float(params[2:])
+                except ValueError:
+                    pass
+            if name and quality > 0:
+                accepted.add(name)
+        return accepted
+
+    @staticmethod
+    def etag_matches(request: web.Request, etag: str) -> bool:
+        """Check If-None-Match against ETag (weak comparison)."""
+        header = request.headers.get("If-None-Match")
+        if not header:
+            return False
+        if header.strip() == "*":
+            return True
+        for value in header.split(","):
+            value = value.strip()
+            if value.startswith("W/"):
+                value = value[2:]
+            if value == etag:
+                return True
+        return False
+
+    async def _handle(self, request: web.Request, directory: Path, hashed_names: bool) -> web.StreamResponse:
+        path = self._resolve(directory, request.match_info["path"])
+        if path is None:
+            raise web.HTTPNotFound()
+
+        if hashed_names:
+            # File name is the content hash - always safe to cache forever
+            return web.FileResponse(path, headers={"Cache-Control": IMMUTABLE_CACHE})
+
+        fingerprint = self._fingerprint(path)
+        if fingerprint is None:
+            raise web.HTTPNotFound()
+
+        # Only the current hash may be cached forever - stale ?v= must revalidate
+        version = request.query.get("v")
+        cache_control = IMMUTABLE_CACHE if version == fingerprint.digest else REVALIDATE_CACHE
+
+        if path.suffix.lower() not in COMPRESSIBLE_EXTENSIONS:
+            # FileResponse handles Range, If-None-Match and If-Modified-Since
+            return web.FileResponse(path, headers={"Cache-Control": cache_control})
+
+        asset = self._text_asset(path, fingerprint)
+        accepted = self._accepted_encodings(request)
+
+        if asset.br is not None and "br" in accepted:
+            body, encoding = asset.br, "br"
+        elif "gzip" in accepted:
+            body, encoding = asset.gzip, "gzip"
+        else:
+            body, encoding = asset.identity, None
+
+        etag = f'"{fingerprint.digest}-{encoding}"' if encoding else f'"{fingerprint.digest}"'
+        headers = {
+            "Cache-Control": cache_control,
+            "ETag": etag,
+            "Vary": "Accept-Encoding",
+        }
+
+        if self.etag_matches(request, etag):
+            return web.Response(status=304, headers=headers)
+
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return self._body_response(body, asset.content_type, headers)
+
+    @staticmethod
+    def _body_response(body: bytes, content_type: str, headers: dict) -> web.Response:
+        headers = dict(headers)
+        headers["Content-Type"] = content_type
+        return web.Response(body=body, headers=headers)
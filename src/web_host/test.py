@@ -62,6 +62,919 @@ async def test_show_media():
     print("[PASS] test_show_media")
 
 
+def test_static_assets_caching():
+    """Test fingerprinted URLs, conditional GET, compression and ranges."""
+    import tempfile
+    from aiohttp import web, ClientSession
+    from aiohttp.test_utils import TestServer
+    from src.web_host.static_assets import StaticAssets
+
+    async def run(root: Path):
+        (root / "app.js").write_text("console.log('hello');" * 50)
+        (root / "sound.mp3").write_bytes(bytes(range(256)) * 4)
+
+        assets = StaticAssets()
+        app = web.Application()
+        assets.add_route(app, "/static", root)
+
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            async with ClientSession(auto_decompress=False) as session:
+                url = assets.url("/static", "app.js")
+                assert "?v=" in url
+
+                resp = await session.get(server.make_url(url), headers={"Accept-Encoding": "gzip"})
+                assert resp.status == 200
+                assert resp.headers["Content-Encoding"] == "gzip"
+                assert "immutable" in resp.headers["Cache-Control"]
+                etag = resp.headers["ETag"]
+
+                resp = await session.get(server.make_url(url), headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+                assert resp.status == 304
+
+                # Without fingerprint the browser must revalidate
+                resp = await session.get(server.make_url("/static/app.js"))
+                assert resp.headers["Cache-Control"] == "no-cache"
+
+                resp = await session.get(server.make_url(assets.url("/static", "sound.mp3")), headers={"Range": "bytes=0-9"})
+                assert resp.status == 206
+                assert len(await resp.read()) == 10
+
+                # Changed file gets a new fingerprint
+                (root / "app.js").write_text("console.log('changed');")
+                assert assets.url("/static", "app.js") != url
+
+                resp = await session.get(server.make_url("/static/../secret.txt"))
+                assert resp.status == 404
+        finally:
+            await server.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(Path(tmp)))
+
+    print("[PASS] test_static_assets_caching")
+
+
+class _FakeWebSocket:
+    def __init__(self, stalled: bool = False):
+        self.stalled = stalled
+        self.frames = []
+        self.closed = False
+        self.close_code = None
+
+    async def send_frame(self, payload, opcode):
+        if self.stalled:
+            await asyncio.sleep(3600)
+        self.frames.append(payload)
+
+    async def close(self, code=1000, message=b""):
+        self.closed = True
+        self.close_code = code
+
+
+def test_broadcast_hub_slow_consumer():
+    """Test that a stalled client is evicted without delaying others."""
+    from src.web_host.broadcast_hub import BroadcastHub
+
+    async def run():
+        hub = BroadcastHub("test", max_queue=4, send_timeout=30)
+        fast = _FakeWebSocket()
+        slow = _FakeWebSocket(stalled=True)
+        hub.add_websocket(fast)
+        hub.add_websocket(slow)
+
+        for i in range(10):
+            hub.publish({"type": "tick", "n": i})
+            await asyncio.sleep(0.001)
+
+        await asyncio.sleep(0.05)
+
+        assert len(fast.frames) == 10, f"Fast client got {len(fast.frames)} frames"
+        assert fast.frames[0] == b'{"type": "tick", "n": 0, "seq": 1}', "Payload should be pre-encoded JSON"
+        assert slow.closed and slow.close_code == 1013, "Slow client should be evicted"
+        assert hub.client_count() == 1
+        assert hub.get_stats()["evicted"] == 1
+
+        await hub.close_all()
+
+    asyncio.run(run())
+    print("[PASS] test_broadcast_hub_slow_consumer")
+
+
+def test_broadcast_hub_replay():
+    """Test sequence numbers and replay of missed messages."""
+    import json
+    from src.web_host.broadcast_hub import BroadcastHub
+
+    async def run():
+        hub = BroadcastHub("test", replay_size=4)
+        hub.publish({"type": "a"})
+        hub.publish({"type": "expired"}, ttl=0)
+        hub.publish({"type": "b"}, ttl=60)
+        assert hub.last_seq == 3
+
+        await asyncio.sleep(0.01)
+        ws = _FakeWebSocket()
+        client = hub.add_websocket(ws)
+        assert hub.replay(client, 0, hub.epoch)
+        hub.publish({"type": "c"})
+        await asyncio.sleep(0.01)
+
+        received = [json.loads(frame) for frame in ws.frames]
+        assert [m["type"] for m in received] == ["a", "b", "c"], "Expired message should be skipped"
+        assert [m["seq"] for m in received] == [1, 3, 4]
+
+        # Other epoch (server restart) or seq that fell out of the ring can't be replayed
+        assert not hub.replay(client, 2, "old-epoch")
+        hub.publish({"type": "d"})
+        hub.publish({"type": "e"})
+        assert not hub.replay(client, 1, hub.epoch)
+        assert hub.replay(client, hub.last_seq, hub.epoch)
+
+        await hub.close_all()
+
+    asyncio.run(run())
+    print("[PASS] test_broadcast_hub_replay")
+
+
+def test_broadcast_hub_batching():
+    """Test that a burst within the batch window reaches each client as one frame."""
+    import json
+    from src.web_host.broadcast_hub import BroadcastHub
+    from src.web_host.protocol import HAS_MSGPACK
+
+    async def run():
+        hub = BroadcastHub("test", batch_window=0.02)
+        early = _FakeWebSocket()
+        hub.add_websocket(early)
+        binary = _FakeWebSocket()
+        if HAS_MSGPACK:
+            hub.add_websocket(binary, "msgpack")
+        sse = _FakeWebSocket()
+        hub.add_sse(sse)
+
+        hub.publish({"type": "a"})
+        hub.publish({"type": "b"})
+        # Joins mid-window: already has "a" and "b" from its init state, gets only "c"
+        late = _FakeWebSocket()
+        hub.add_websocket(late)
+        hub.publish({"type": "c"})
+        assert not early.frames, "Nothing is sent before the window ends"
+
+        await asyncio.sleep(0.05)
+        assert len(early.frames) == 1
+        batch = json.loads(early.frames[0])
+        assert batch["type"] == "batch"
+        assert [(m["type"], m["seq"]) for m in batch["messages"]] == [("a", 1), ("b", 2), ("c", 3)]
+        assert [json.loads(frame)["type"] for frame in late.frames] == ["c"]
+        if HAS_MSGPACK:
+            import msgpack
+            assert msgpack.unpackb(binary.frames[0]) == batch, "MessagePack batch is built from the same messages"
+        # EventSource gets no batch envelope: one write, one event per message with its own id
+        assert len(sse.frames) == 1
+        events = sse.frames[0].decode("utf-8").split("\n\n")[:-1]
+        assert [event.split("\n")[0] for event in events] == [f"id: {hub.epoch}-{seq}" for seq in (1, 2, 3)]
+        assert [json.loads(event.split("data: ")[1])["type"] for event in events] == ["a", "b", "c"]
+
+        # A lone message is sent as is
+        hub.publish({"type": "d"})
+        await asyncio.sleep(0.05)
+        assert json.loads(early.frames[-1]) == {"type": "d", "seq": 4}
+        assert hub.get_stats()["batches"] == 1
+
+        await hub.close_all()
+
+    asyncio.run(run())
+    print("[PASS] test_broadcast_hub_batching")
+
+
+def test_broadcast_hub_topics():
+    """Test routing by topic subscriptions, with and without batching, and filtered replay."""
+    import json
+    from src.web_host.broadcast_hub import BroadcastHub
+    from src.web_host.topics import parse_topics, tier_for
+
+    assert parse_topics({}) is None
+    assert parse_topics({"topics": "show_media, tier:big,"}) == {"show_media", "tier:big"}
+    assert tier_for({"small": 0, "big": 500}, 499.99) == "small"
+    assert tier_for({"small": 0, "big": 500}, 500) == "big"
+    assert tier_for({"big": 500}, 10) is None
+
+    def types(ws):
+        messages = []
+        for frame in ws.frames:
+            message = json.loads(frame)
+            messages.extend(message["messages"] if message["type"] == "batch" else [message])
+        return [m["type"] + (f":{m['tier']}" if "tier" in m else "") for m in messages]
+
+    async def run(batch_window: float):
+        hub = BroadcastHub("test", batch_window=batch_window)
+        everything, big, big2, preload = (_FakeWebSocket() for _ in range(4))
+        hub.add_websocket(everything)
+        hub.add_websocket(big, topics=frozenset({"tier:big"}))
+        hub.add_websocket(big2, topics=frozenset({"tier:big", "show_media"}))
+        hub.add_websocket(preload, topics=frozenset({"preload"}))
+        assert hub.get_stats()["topics"] == {"tier:big": 2, "show_media": 1, "preload": 1}
+
+        hub.publish({"type": "show_media", "tier": "big"}, topics=("tier:big",))
+        hub.publish({"type": "show_media", "tier": "small"}, topics=("tier:small",))
+        hub.publish({"type": "preload"})
+        await asyncio.sleep(0.05)
+
+        assert types(everything) == ["show_media:big", "show_media:small", "preload"]
+        assert types(big) == ["show_media:big"]
+        assert types(big2) == ["show_media:big", "show_media:small"]
+        assert types(preload) == ["preload"]
+
+        # Reconnecting subscriber only gets its topics replayed
+        late = _FakeWebSocket()
+        assert hub.replay(hub.add_websocket(late, topics=frozenset({"tier:big"})), 0, hub.epoch)
+        await asyncio.sleep(0.01)
+        assert types(late) == ["show_media:big"]
+
+        await hub.remove_client(big)
+        assert hub.get_stats()["topics"]["tier:big"] == 2  # big2 and late
+        await hub.close_all()
+        assert hub.get_stats()["topics"] == {}
+
+    asyncio.run(run(0))
+    asyncio.run(run(0.01))
+    print("[PASS] test_broadcast_hub_topics")
+
+
+def test_websocket_heartbeat():
+    """Test hello/ping/pong exchange and closing of idle connections."""
+    import tempfile
+    import yaml
+    from aiohttp import web, ClientSession, WSMsgType
+    from aiohttp.test_utils import TestServer
+
+    async def run(config_path: Path):
+        web_host = WebHost(Config(str(config_path)))
+        app = web.Application()
+        web_host._setup_routes(app)
+
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            async with ClientSession() as session:
+                ws = await session.ws_connect(server.make_url("/ws"))
+                hello = await ws.receive_json(timeout=2)
+                assert hello["type"] == "hello"
+                assert hello["heartbeat_ms"] == 100
+                assert web_host.get_connection_counts()["overlay"] == 1
+
+                # Heartbeats keep the connection alive past the idle timeout
+                for i in range(4):
+                    await ws.send_json({"type": "ping", "t": i})
+                    pong = await ws.receive_json(timeout=2)
+                    assert pong == {"type": "pong", "t": i}
+                    await asyncio.sleep(0.15)
+
+                resp = await session.get(server.make_url("/api/connections"))
+                assert (await resp.json())["overlay"] == 1
+
+                # Silent client is dropped
+                msg = await ws.receive(timeout=2)
+                assert msg.type in (WSMsgType.CLOSE, WSMsgType.CLOSED)
+                await ws.close()
+                await asyncio.sleep(0.05)
+                assert web_host.get_connection_counts()["overlay"] == 0
+        finally:
+            await server.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(PROJECT_ROOT / "config.example.yaml", "r", encoding="utf-8") as f:
+            raw = yaml.safe_load(f)
+        raw["server"]["ws_idle_timeout"] = 0.3
+        config_path = Path(tmp) / "config.yaml"
+        with open(config_path, "w", encoding="utf-8") as f:
+            yaml.safe_dump(raw, f)
+        asyncio.run(run(config_path))
+
+    print("[PASS] test_websocket_heartbeat")
+
+
+def test_leaderboard_endpoint():
+    """Test leaderboard REST endpoint, full standings for new subscribers and deltas after."""
+    from aiohttp import web, ClientSession
+    from aiohttp.test_utils import TestServer
+
+    async def run():
+        web_host = WebHost(Config(str(PROJECT_ROOT / "config.example.yaml")))
+        app = web.Application()
+        web_host._setup_routes(app)
+
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            async with ClientSession() as session:
+                resp = await session.get(server.make_url("/api/leaderboard"))
+                assert resp.status == 500, "No leaderboard running"
+
+                alice = {"donor_name": "Alice", "amount": 100.0, "count": 1}
+                await web_host.publish_leaderboard({
+                    "today": {"totals": {"count": 1, "amount": 100.0, "donors": 1}, "top": [alice]},
+                    "all": {"totals": {"count": 1, "amount": 100.0, "donors": 1}, "top": [alice]},
+                })
+                await web_host.publish_leaderboard({"all": {"totals": {"count": 2, "amount": 110.0, "donors": 2}}})
+
+                resp = await session.get(server.make_url("/api/leaderboard"))
+                windows = (await resp.json())["windows"]
+                assert windows["all"] == {"totals": {"count": 2, "amount": 110.0, "donors": 2}, "top": [alice]}
+                resp = await session.get(server.make_url("/api/leaderboard?window=today"))
+                assert (await resp.json())["top"] == [alice]
+                resp = await session.get(server.make_url("/api/leaderboard?window=week"))
+                assert resp.status == 404
+
+                ws = await session.ws_connect(server.make_url("/ws?topics=leaderboard"))
+                assert (await ws.receive_json(timeout=2))["type"] == "hello"
+                full = await ws.receive_json(timeout=2)
+                assert full["full"] and full["windows"] == windows
+
+                await web_host.publish_leaderboard({"today": {"totals": {"count": 2, "amount": 110.0, "donors": 2}}})
+                delta = await ws.receive_json(timeout=2)
+                assert delta["type"] == "leaderboard" and "full" not in delta
+                assert delta["windows"] == {"today": {"totals": {"count": 2, "amount": 110.0, "donors": 2}}}
+                await ws.close()
+        finally:
+            await server.close()
+
+    asyncio.run(run())
+    print("[PASS] test_leaderboard_endpoint")
+
+
+def test_goal_endpoint():
+    """Test goal progress endpoint and current progress for new subscribers."""
+    from aiohttp import web, ClientSession
+    from aiohttp.test_utils import TestServer
+
+    async def run():
+        web_host = WebHost(Config(str(PROJECT_ROOT / "config.example.yaml")))
+        app = web.Application()
+        web_host._setup_routes(app)
+
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            async with ClientSession() as session:
+                resp = await session.get(server.make_url("/api/goal"))
+                assert resp.status == 500, "No balance yet"
+
+                progress = {"jar_id": "jar1", "balance": 250.0, "goal": 1000.0, "percent": 25.0, "source": "statement", "updated_at": 1}
+                await web_host.publish_goal_progress(progress)
+                resp = await session.get(server.make_url("/api/goal"))
+                assert await resp.json() == progress
+
+                ws = await session.ws_connect(server.make_url("/ws?topics=goal_progress"))
+                assert (await ws.receive_json(timeout=2))["type"] == "hello"
+                assert await ws.receive_json(timeout=2) == {"type": "goal_progress", **progress}
+                await ws.close()
+        finally:
+            await server.close()
+
+    asyncio.run(run())
+    print("[PASS] test_goal_endpoint")
+
+
+def test_donation_search_endpoint():
+    """Test history search API (validation, results, paging) and export download."""
+    import json
+    import tempfile
+    from datetime import datetime
+    from aiohttp import web, ClientSession
+    from aiohttp.test_utils import TestServer
+    from src.history import HistoryStore
+    from src.notification import Donation
+
+    async def run(root: Path):
+        web_host = WebHost(Config(str(PROJECT_ROOT / "config.example.yaml")))
+        app = web.Application()
+        web_host._setup_routes(app)
+
+        server = TestServer(app)
+        await server.start_server()
+        store = HistoryStore(root / "history.db", jar_id="jar1")
+        try:
+            async with ClientSession() as session:
+                resp = await session.get(server.make_url("/api/donations/search?q=x"))
+                assert resp.status == 500, "No history store"
+
+                await store.start()
+                web_host.set_history_store(store)
+                await store.add_many([
+                    Donation(amount=i * 1000, donor_name="Марія", comment=f"Кава #{i}", timestamp=datetime(2026, 3, 1, i), tx_id=f"tx{i}")
+                    for i in range(1, 4)
+                ])
+
+                resp = await session.get(server.make_url("/api/donations/search?q=кав&limit=2"))
+                data = await resp.json()
+                assert [d["comment"] for d in data["donations"]] == ["Кава #3", "Кава #2"]
+                assert data["donations"][0]["amount"] == 30.0
+                assert data["next_offset"] == 2
+
+                resp = await session.get(server.make_url("/api/donations/search?q=кав&offset=2"))
+                assert [d["comment"] for d in (await resp.json())["donations"]] == ["Кава #1"]
+
+                for bad in ("", "?q=", "?q=a&limit=0", "?q=a&offset=-1", "?q=a&since=yesterday"):
+                    resp = await session.get(server.make_url(f"/api/donations/search{bad}"))
+                    assert resp.status == 400, bad
+
+                # Export of the same history, streamed
+                resp = await session.get(server.make_url("/api/donations/export?format=jsonl&jar=jar1"))
+                assert resp.headers["Transfer-Encoding"] == "chunked"
+                assert resp.headers["Content-Type"].startswith("application/x-ndjson")
+                assert "attachment" in resp.headers["Content-Disposition"]
+                lines = (await resp.text()).splitlines()
+                assert [json.loads(line)["comment"] for line in lines] == ["Кава #1", "Кава #2", "Кава #3"]
+
+                resp = await session.get(server.make_url("/api/donations/export?jar=other"))
+                assert (await resp.text()).lstrip("\ufeff").splitlines() == ["date,amount,donor_name,comment,jar_id,tx_id"]
+                resp = await session.get(server.make_url("/api/donations/export?format=pdf"))
+                assert resp.status == 400
+        finally:
+            await server.close()
+            await store.stop()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(Path(tmp)))
+    print("[PASS] test_donation_search_endpoint")
+
+
+def test_msgpack_protocol():
+    """Test MessagePack negotiation by subprotocol and query parameter, and the shared encoding."""
+    from aiohttp import web, ClientSession, WSMsgType
+    from aiohttp.test_utils import TestServer
+    from src.donations_feed import DonationsFeed
+    from src.notification import Donation
+    from src.web_host.protocol import HAS_MSGPACK
+
+    if not HAS_MSGPACK:
+        print("[SKIP] test_msgpack_protocol (msgpack not installed)")
+        return
+    import msgpack
+
+    async def run():
+        config = Config(str(PROJECT_ROOT / "config.example.yaml"))
+        web_host = WebHost(config)
+        feed = DonationsFeed(config, max_donations=10)
+        feed.add_donation(Donation(amount=5000, donor_name="Марія", comment="Привіт"))
+        web_host.set_donations_feed(feed)
+        app = web.Application()
+        web_host._setup_routes(app)
+
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            async with ClientSession() as session:
+                binary = await session.ws_connect(server.make_url("/ws"), protocols=("donations.v1.msgpack", "donations.v1.json"))
+                assert binary.protocol == "donations.v1.msgpack"
+                msg = await binary.receive(timeout=2)
+                assert msg.type == WSMsgType.BINARY
+                hello = msgpack.unpackb(msg.data)
+                assert (hello["type"], hello["schema"], hello["format"]) == ("hello", 1, "msgpack")
+
+                text = await session.ws_connect(server.make_url("/ws"))
+                assert (await text.receive_json(timeout=2))["format"] == "json"
+
+                # Same message, both formats
+                await web_host.show_media("video/bebra.gif", donor_name="Тарас", amount=100)
+                alert = msgpack.unpackb((await binary.receive(timeout=2)).data)
+                assert alert == await text.receive_json(timeout=2)
+                assert alert["donor_name"] == "Тарас"
+
+                # Query parameter works without subprotocol
+                feed_ws = await session.ws_connect(server.make_url("/feed/ws?format=msgpack"))
+                init = msgpack.unpackb((await feed_ws.receive(timeout=2)).data)
+                assert init["type"] == "init"
+                assert init["donations"][0]["donor_name"] == "Марія"
+
+                for ws in (binary, text, feed_ws):
+                    await ws.close()
+        finally:
+            await server.close()
+
+    asyncio.run(run())
+    print("[PASS] test_msgpack_protocol")
+
+
+def test_sse_events():
+    """Test SSE stream, keep-alives and resume with Last-Event-ID."""
+    import json
+    import tempfile
+    import yaml
+    from aiohttp import web, ClientSession
+    from aiohttp.test_utils import TestServer
+
+    async def read_event(resp) -> dict:
+        """Read next event with data, skipping retry and comment lines."""
+        fields = {}
+        while True:
+            line = (await asyncio.wait_for(resp.content.readline(), 2)).decode("utf-8").rstrip("\n")
+            if not line:
+                if "data" in fields:
+                    return fields
+                continue
+            name, _, value = line.partition(": ")
+            fields[name] = value
+
+    async def run(config_path: Path):
+        web_host = WebHost(Config(str(config_path)))
+        app = web.Application()
+        web_host._setup_routes(app)
+
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            async with ClientSession() as session:
+                resp = await session.get(server.make_url("/events"))
+                assert resp.headers["Content-Type"] == "text/event-stream"
+                await asyncio.sleep(0.05)
+
+                await web_host.clear()
+                event = await read_event(resp)
+                assert json.loads(event["data"]) == {"type": "clear", "seq": 1}
+                last_id = event["id"]
+
+                # Idle stream gets keep-alive comments
+                line = await asyncio.wait_for(resp.content.readline(), 2)
+                assert line.startswith(b": keep-alive"), line
+                resp.close()
+
+                # Missed while disconnected: replayed after Last-Event-ID only
+                await web_host.clear()
+                await web_host.clear()
+                resp = await session.get(server.make_url("/events"), headers={"Last-Event-ID": last_id})
+                seqs = [json.loads((await read_event(resp))["data"])["seq"] for _ in range(2)]
+                assert seqs == [2, 3]
+                resp.close()
+        finally:
+            await server.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(PROJECT_ROOT / "config.example.yaml", "r", encoding="utf-8") as f:
+            raw = yaml.safe_load(f)
+        raw["server"]["sse_keepalive"] = 0.1
+        config_path = Path(tmp) / "config.yaml"
+        with open(config_path, "w", encoding="utf-8") as f:
+            yaml.safe_dump(raw, f)
+        asyncio.run(run(config_path))
+
+    print("[PASS] test_sse_events")
+
+
+def test_hydrated_pages():
+    """Test inline page snapshots and template recompilation."""
+    import json
+    import os
+    import re
+    import tempfile
+    from aiohttp import web, ClientSession
+    from aiohttp.test_utils import TestServer
+    from src.donations_feed import DonationsFeed
+    from src.notification import Donation
+    from src.web_host.page_template import PageTemplate
+    from src.web_host.static_assets import StaticAssets
+
+    def snapshot_of(html: str) -> dict:
+        match = re.search(r'<script id="snapshot" type="application/json">(.*?)</script>', html)
+        assert match, "Page must carry a snapshot"
+        return json.loads(match.group(1))
+
+    async def run():
+        config = Config(str(PROJECT_ROOT / "config.example.yaml"))
+        feed = DonationsFeed(config)
+        feed.add_donation(Donation(amount=10000, donor_name="Alice", comment="</script><b>hi</b>"))
+        feed.add_donation(Donation(amount=90000, donor_name="Bob"))
+
+        web_host = WebHost(config)
+        web_host.set_donations_feed(feed)
+        app = web.Application()
+        web_host._setup_routes(app)
+
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            async with ClientSession() as session:
+                resp = await session.get(server.make_url("/feed"))
+                html = await resp.text()
+                assert "/static/js/msgpack.js?v=" in html, "Assets must be fingerprinted"
+                assert "</script><b>" not in html, "State must not close the script element"
+                snapshot = snapshot_of(html)
+                assert snapshot["config"]["show_test_button"] == config.show_test_button()
+                assert [d["donor_name"] for d in snapshot["init"]["donations"]] == ["Alice", "Bob"]
+                assert snapshot["init"]["donations"][0]["comment"] == "</script><b>hi</b>"
+                assert snapshot["init"]["seq"] == feed.get_hub().last_seq
+
+                resp = await session.get(server.make_url("/feed?topics=tier:big"))
+                snapshot = snapshot_of(await resp.text())
+                assert [d["donor_name"] for d in snapshot["init"]["donations"]] == ["Bob"]
+
+                web_host._hub.publish({"type": "clear"})
+                resp = await session.get(server.make_url("/"))
+                html = await resp.text()
+                assert '<body class="snapshot-pending">' in html, "Overlay stays hidden until the snapshot is applied"
+                snapshot = snapshot_of(html)
+                assert snapshot["stream"] == {"epoch": web_host._hub.epoch, "seq": web_host._hub.last_seq}
+                etag = resp.headers["ETag"]
+                resp = await session.get(server.make_url("/"), headers={"If-None-Match": etag})
+                assert resp.status == 304
+        finally:
+            await server.close()
+
+    asyncio.run(run())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        (root / "app.js").write_text("1")
+        assets = StaticAssets()
+        assets.add_route(web.Application(), "/static", root)
+        page_path = root / "page.html"
+        page_path.write_text('<body><script src="/static/app.js"></script></body>')
+
+        page = PageTemplate(page_path, assets)
+        html = page.render({"n": 1})
+        assert html.startswith('<body><script src="/static/app.js?v=')
+        assert html.endswith('<script id="snapshot" type="application/json">{"n":1}</script>\n</body>')
+
+        # Edited template is compiled again
+        page_path.write_text("<body><p>changed</p></body>")
+        stat = page_path.stat()
+        os.utime(page_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        assert "<p>changed</p>" in page.render()
+
+    print("[PASS] test_hydrated_pages")
+
+
+def test_api_donations():
+    """Test feed REST API pagination, filters and conditional requests."""
+    from datetime import datetime
+    from aiohttp import web, ClientSession
+    from aiohttp.test_utils import TestServer
+    from email.utils import format_datetime
+    from datetime import timezone
+    from src.donations_feed import DonationsFeed, FeedQuery
+    from src.notification import Donation
+
+    async def run():
+        config = Config(str(PROJECT_ROOT / "config.example.yaml"))
+        feed = DonationsFeed(config)
+        for i in range(5):
+            feed.add_donation(Donation(
+                amount=(i + 1) * 10000,
+                donor_name="Alice" if i % 2 == 0 else "Bob",
+                timestamp=datetime.fromtimestamp(1700000000 + i * 60),
+            ))
+
+        web_host = WebHost(config)
+        web_host.set_donations_feed(feed)
+        app = web.Application()
+        web_host._setup_routes(app)
+
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            async with ClientSession() as session:
+                resp = await session.get(server.make_url("/api/donations?limit=2"))
+                page = await resp.json()
+                assert [d["amount"] for d in page["donations"]] == [500, 400], "Newest first"
+                etag = resp.headers["ETag"]
+                last_modified = resp.headers["Last-Modified"]
+                assert last_modified == format_datetime(datetime.fromtimestamp(1700000240, timezone.utc), usegmt=True), \
+                    "Last-Modified is the newest donation's time"
+
+                # Another worker with the same donations, built later, gives the same validators
+                other = DonationsFeed(config)
+                for donation in feed.get_donations():
+                    other.add_donation(donation)
+                assert other.get_page(FeedQuery(limit=2))[0] == etag
+                assert other.get_modified_at() == feed.get_modified_at()
+
+                resp = await session.get(server.make_url(f"/api/donations?limit=2&cursor={page['next_cursor']}"))
+                page = await resp.json()
+                assert [d["amount"] for d in page["donations"]] == [300, 200]
+
+                resp = await session.get(server.make_url("/api/donations?donor=ali&min_amount=200&until=1700000200"))
+                page = await resp.json()
+                assert [d["amount"] for d in page["donations"]] == [300]
+                assert page["next_cursor"] is None
+
+                resp = await session.get(server.make_url("/api/donations?limit=2"), headers={"If-None-Match": etag})
+                assert resp.status == 304
+                resp = await session.get(server.make_url("/api/donations?limit=2"), headers={"If-Modified-Since": last_modified})
+                assert resp.status == 304
+
+                feed.add_donation(Donation(amount=100, donor_name="Carol"))
+                resp = await session.get(server.make_url("/api/donations?limit=2"), headers={"If-None-Match": etag})
+                assert resp.status == 200, "New donation must invalidate ETag"
+
+                resp = await session.get(server.make_url("/api/donations?limit=abc"))
+                assert resp.status == 400
+        finally:
+            await server.close()
+
+    asyncio.run(run())
+    print("[PASS] test_api_donations")
+
+
+def test_feed_ring_buffer():
+    """Test feed eviction deltas and the memoized init message."""
+    import json
+    from src.donations_feed import DonationsFeed
+    from src.notification import Donation
+
+    async def run():
+        config = Config(str(PROJECT_ROOT / "config.example.yaml"))
+        feed = DonationsFeed(config, max_donations=3)
+        for i in range(3):
+            feed.add_donation(Donation(amount=(i + 1) * 10000, donor_name=f"D{i}"))
+
+        init = feed.init_envelope()
+        assert feed.init_envelope() is init, "Unchanged feed must reuse the encoded init"
+        assert json.loads(init.json) == feed.init_message()
+        assert [d["id"] for d in json.loads(init.json)["donations"]] == [1, 2, 3]
+
+        ws = _FakeWebSocket()
+        await feed.register_websocket(ws)
+        donation = Donation(amount=90000, donor_name="Big")
+        feed.add_donation(donation)
+        await feed.broadcast_new_donation(donation)
+        await asyncio.sleep(0.05)
+
+        messages = [json.loads(frame) for frame in ws.frames]
+        assert [m["type"] for m in messages] == ["init", "new_donation", "evict"]
+        assert messages[1]["donation"]["id"] == 4
+        assert messages[2]["ids"] == [1]
+        assert messages[2]["seq"] == messages[1]["seq"] + 1
+        assert [d.donor_name for d in feed.get_donations()] == ["D1", "D2", "Big"]
+
+        rebuilt = feed.init_envelope()
+        assert rebuilt is not init
+        assert [d["id"] for d in json.loads(rebuilt.json)["donations"]] == [2, 3, 4]
+        assert json.loads(rebuilt.json)["seq"] == feed.get_hub().last_seq
+
+        # Worker mirror applies the same window from the published messages
+        mirror = DonationsFeed(config, max_donations=3)
+        mirror.load_snapshot(DonationsFeed(config, max_donations=3).get_snapshot())
+        for i in range(5):
+            payload = json.dumps({"type": "new_donation", "donation": {
+                "id": i + 1, "donor_name": f"M{i}", "amount": 100.0, "comment": "", "timestamp": 1700000000,
+            }}).encode()
+            mirror.publish_mirrored(payload, i + 1, None)
+        assert [d["id"] for d in mirror.get_snapshot()["donations"]] == [3, 4, 5]
+
+        await feed.close_all()
+
+    asyncio.run(run())
+    print("[PASS] test_feed_ring_buffer")
+
+
+def test_fanout_channel():
+    """Test snapshot, ordered publishes and worker requests over the Unix socket."""
+    import tempfile
+    from src.web_host.broadcast_hub import BroadcastHub
+    from src.web_host.fanout import FanoutServer, FanoutClient
+
+    async def run(socket_path: Path):
+        core_hub = BroadcastHub("overlay")
+        core_hub.publish({"type": "before"})
+        requests = []
+
+        async def on_request(header, payload):
+            requests.append(header["op"])
+
+        server = FanoutServer(socket_path, lambda: {"epoch": core_hub.epoch, "seq": core_hub.last_seq}, on_request)
+        await server.start()
+        core_hub.add_listener(lambda envelope, ttl: server.publish("overlay", envelope.json, envelope.seq, ttl))
+
+        worker_hub = BroadcastHub("overlay")
+        received = []
+
+        async def on_frame(header, payload):
+            if header["op"] == "snapshot":
+                worker_hub.sync(header["epoch"], header["seq"])
+            else:
+                worker_hub.publish_encoded(payload, header["seq"], header["ttl"])
+                received.append(payload)
+
+        client = FanoutClient(socket_path, on_frame)
+        await client.start()
+        assert await client.wait_connected(timeout=2)
+        assert worker_hub.epoch == core_hub.epoch and worker_hub.last_seq == 1
+
+        core_hub.publish({"type": "after", "text": "line\nbreak"}, ttl=5)
+        assert await client.request({"op": "test_donation"})
+        await asyncio.sleep(0.1)
+
+        assert received == [b'{"type": "after", "text": "line\\nbreak", "seq": 2}']
+        assert worker_hub.last_seq == 2
+        assert requests == ["test_donation"]
+
+        # Stopped with the worker still connected: its handler is cancelled and awaited
+        await server.stop()
+        assert server.worker_count() == 0
+        await client.stop()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(Path(tmp) / "fanout.sock"))
+
+    print("[PASS] test_fanout_channel")
+
+
+def test_metrics_endpoint():
+    """Test /metrics exposition, client gauges and worker-mode merging."""
+    from aiohttp import web, ClientSession
+    from aiohttp.test_utils import TestServer
+    from src.web_host.fanout import FanoutClient
+
+    async def run():
+        config = Config(str(PROJECT_ROOT / "config.example.yaml"))
+        web_host = WebHost(config)
+        app = web.Application()
+        web_host._setup_routes(app)
+
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            async with ClientSession() as session:
+                ws = await session.ws_connect(server.make_url("/ws"))
+                await ws.receive_json(timeout=2)  # hello
+                await web_host.clear()
+                await ws.receive_json(timeout=2)
+
+                resp = await session.get(server.make_url("/metrics"))
+                assert resp.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+                lines = (await resp.text()).splitlines()
+                assert 'ws_clients{hub="overlay",transport="websocket"} 1' in lines
+                assert 'ws_clients{hub="overlay",transport="sse"} 0' in lines
+                sends = [line for line in lines if line.startswith('ws_send_duration_seconds_count{hub="overlay"}')]
+                assert sends and int(sends[0].split()[-1]) >= 2, sends
+                assert any(line.startswith("poller_poll_duration_seconds_count") for line in lines)
+                # Running totals are counters, so rate() works on them
+                assert "# TYPE ws_messages_published counter" in lines
+                published = [line for line in lines if line.startswith('ws_messages_published_total{hub="overlay"}')]
+                assert published and float(published[0].split()[-1]) >= 1, published
+                assert "# TYPE ws_clients_evicted counter" in lines
+                await ws.close()
+
+            # Worker: pipeline metrics come from the main process, clients and loop lag are its own
+            worker = WebHost(config)
+            worker.set_fanout_client(FanoutClient(Path("unused.sock"), worker.handle_fanout_frame))
+            await worker.handle_fanout_frame({"op": "metrics"}, b'poller_polls_total{result="new"} 3\n')
+            body = (await worker._handle_metrics(None)).body.decode("utf-8")
+            assert body.startswith('poller_polls_total{result="new"} 3\n')
+            assert "# TYPE ws_clients gauge" in body
+            assert "poller_poll_duration_seconds" not in body
+        finally:
+            await server.close()
+
+    asyncio.run(run())
+    print("[PASS] test_metrics_endpoint")
+
+
+def test_trace_ack():
+    """Test that an overlay ack completes the donation trace shown at /debug/traces."""
+    from aiohttp import web, ClientSession
+    from aiohttp.test_utils import TestServer
+    from src.tracing import TRACER
+
+    async def run():
+        web_host = WebHost(Config(str(PROJECT_ROOT / "config.example.yaml")))
+        app = web.Application()
+        web_host._setup_routes(app)
+
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            async with ClientSession() as session:
+                ws = await session.ws_connect(server.make_url("/ws"))
+                await ws.receive_json(timeout=2)  # hello
+
+                with TRACER.span("web-test-trace", "broadcast"):
+                    await web_host.show_media("video/200.gif", duration_ms=1000, trace_id="web-test-trace")
+                TRACER.finish("web-test-trace", linger=5)
+
+                message = await ws.receive_json(timeout=2)
+                assert message["trace_id"] == "web-test-trace"
+                await ws.send_json({"type": "ack", "trace_id": message["trace_id"]})
+                await asyncio.sleep(0.05)
+
+                resp = await session.get(server.make_url("/debug/traces?format=json"))
+                report = await resp.json()
+                trace = next(t for t in report["recent"] if t["trace_id"] == "web-test-trace")
+                assert [s["name"] for s in trace["spans"]] == ["broadcast", "client_ack"]
+
+                resp = await session.get(server.make_url("/debug/traces"))
+                assert "web-test-trace" in await resp.text()
+                await ws.close()
+        finally:
+            await server.close()
+
+    asyncio.run(run())
+    print("[PASS] test_trace_ack")
+
+
 async def run_server_interactive():
     """Run server interactively for manual testing."""
     config = Config(str(CONFIG_PATH))
@@ -101,5 +1014,22 @@ if __name__ == "__main__":
         asyncio.run(run_server_interactive())
     else:
         asyncio.run(test_server_start_stop())
+        test_static_assets_caching()
+        test_broadcast_hub_slow_consumer()
+        test_broadcast_hub_replay()
+        test_broadcast_hub_batching()
+        test_broadcast_hub_topics()
+        test_websocket_heartbeat()
+        test_leaderboard_endpoint()
+        test_goal_endpoint()
+        test_donation_search_endpoint()
+        test_msgpack_protocol()
+        test_sse_events()
+        test_hydrated_pages()
+        test_api_donations()
+        test_feed_ring_buffer()
+        test_fanout_channel()
+        test_metrics_endpoint()
+        test_trace_ack()
         asyncio.run(test_show_media())
         print("\nAll WebHost tests passed!")
@@ -0,0 +1,49 @@
+"""
+Topics clients can subscribe to at connect time with ?topics=a,b,c.
+
+Every broadcast is tagged with its message type (e.g. "show_media",
+"new_donation", "preload"). Donation messages are also tagged with
+"tier:<name>" (server.topic_tiers) and "jar:<jar id>". A client with
+topics gets only messages carrying at least one of them; a client without
+topics gets everything. Connection-level messages (hello, pong, feed init)
+are always sent.
+"""
+from typing import TYPE_CHECKING, Mapping
+
+if TYPE_CHECKING:
+    from src.config import Config
+
+MAX_TOPICS = 32
+
+
+def parse_topics(query: Mapping[str, str]) -> frozenset[str] | None:
+    """Topics from ?topics=, None when the client wants everything."""
+    raw = query.get("topics", "")
+    topics = frozenset(topic.strip() for topic in raw.split(",") if topic.strip())
+    if not topics:
+        return None
+    if len(topics) > MAX_TOPICS:
+        raise ValueError(f"At most {MAX_TOPICS} topics")
+    return topics
+
+
+def tier_for(tiers: Mapping[str, float], amount_uah: float) -> str | None:
+    """Name of the highest tier whose minimum (UAH) the amount reaches."""
+    best_name, best_min = None, None
+    for name, minimum in tiers.items():
+        if amount_uah >= minimum and (best_min is None or minimum > best_min):
+            best_name, best_min = name, minimum
+    return best_name
+
+
+def donation_topics(config: "Config", amount: int | None) -> tuple[str, ...]:
+    """Extra topics of a donation message (amount in kopecks)."""
+    topics = []
+    if amount is not None:
+        tier = tier_for(config.get_topic_tiers(), amount / 100)
+        if tier:
+            topics.append(f"tier:{tier}")
+    jar_id = config.get_jar_id()
+    if jar_id:
+        topics.append(f"jar:{jar_id}")
+    return tuple(topics)
@@ -1,27 +1,74 @@
 import asyncio
+import hashlib
 import json
-import weakref
+import tempfile
+import time
+from datetime import timezone
+from email.utils import format_datetime
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Callable
 
-from aiohttp import web, WSMsgType
+from aiohttp import web, WSMsgType, WSCloseCode
+
+from src.history import ExportQuery, HistoryExport
+from src.metrics import REGISTRY, EventLoopMonitor, metrics
+from src.tracing import TRACER, render_html
+from . import protocol
+from .broadcast_hub import BroadcastHub, Envelope, HubClient, SseConnection, SSE_KEEPALIVE
+from .fanout import FanoutServer, FanoutClient
+from .page_template import PageTemplate
+from .static_assets import StaticAssets
+from .topics import donation_topics, parse_topics
+from .workers import WorkerPool
 
 if TYPE_CHECKING:
     from src.config import Config
     from src.notification import NotificationService
     from src.donations_feed import DonationsFeed
+    from src.history import HistoryStore
+    from src.media_player import MediaTranscoder
 
 
 class WebHost:
+    # Seconds a preload hint stays worth replaying
+    PRELOAD_TTL = 60.0
+    # How often the main process sends pipeline metrics and traces to web workers
+    DIAGNOSTICS_PUSH_INTERVAL = 5.0
+
     def __init__(self, config: "Config", project_root: Path | None = None):
         self._config = config
         self._app: web.Application | None = None
         self._runner: web.AppRunner | None = None
         self._site: web.TCPSite | None = None
-        self._websockets: weakref.WeakSet[web.WebSocketResponse] = weakref.WeakSet()
+        self._hub = BroadcastHub(
+            "overlay",
+            max_queue=config.get_ws_send_queue(),
+            send_timeout=config.get_ws_send_timeout(),
+            replay_size=config.get_ws_replay_size(),
+            batch_window=config.get_ws_batch_window(),
+        )
         self._running = False
         self._notification_service: "NotificationService | None" = None
         self._donations_feed: "DonationsFeed | None" = None
+        self._transcoder: "MediaTranscoder | None" = None
+        self._history_store: "HistoryStore | None" = None
+        self._assets = StaticAssets()
+
+        # Multi-process mode: main process feeds workers, workers serve clients
+        self._fanout_server: FanoutServer | None = None
+        self._fanout_client: FanoutClient | None = None
+        self._worker_pool: WorkerPool | None = None
+        self._forwarding_to_workers = False
+        self._diagnostics_task: asyncio.Task | None = None
+        # Worker side: latest pipeline metrics and trace report of the main process
+        self._core_metrics = b""
+        self._core_traces: dict = {}
+        # Leaderboard windows as subscribers have them (see src/leaderboard), None if not running
+        self._leaderboard: dict[str, dict] | None = None
+        # Latest jar goal progress (see src/goal), None until known
+        self._goal_progress: dict | None = None
+
+        self._loop_monitor = EventLoopMonitor()
 
         self._static_dir = Path(__file__).parent / "static"
         self._templates_dir = Path(__file__).parent / "templates"
@@ -29,6 +76,10 @@ class WebHost:
         self._feed_templates_dir = Path(__file__).parent.parent / "donations_feed" / "templates"
         self._project_root = project_root or Path(__file__).parent.parent.parent
 
+        # Compiled once, recompiled when the file changes
+        self._overlay_page = PageTemplate(self._templates_dir / "overlay.html", self._assets)
+        self._feed_page = PageTemplate(self._feed_templates_dir / "feed.html", self._assets)
+
     def set_notification_service(self, service: "NotificationService") -> None:
         """Set notification service for test donations."""
         self._notification_service = service
@@ -37,17 +88,39 @@ class WebHost:
         """Set donations feed for real-time updates."""
         self._donations_feed = feed
 
+    def set_media_transcoder(self, transcoder: "MediaTranscoder") -> None:
+        """Set transcoder providing video variants of media images."""
+        self._transcoder = transcoder
+
+    def set_history_store(self, store: "HistoryStore") -> None:
+        """Set donation history the search API queries."""
+        self._history_store = store
+
+    def set_fanout_client(self, client: FanoutClient) -> None:
+        """Run as web worker: broadcasts come from the main process through client."""
+        self._fanout_client = client
+
     def _setup_routes(self, app: web.Application) -> None:
         # Overlay routes
         app.router.add_get("/", self._handle_index)
         app.router.add_get("/ws", self._handle_websocket)
+        app.router.add_get("/events", self._handle_events)
         app.router.add_post("/test-donation", self._handle_test_donation)
-        app.router.add_static("/static", self._static_dir, name="static")
+        app.router.add_get("/api/connections", self._handle_connections)
+        app.router.add_get("/api/leaderboard", self._handle_leaderboard)
+        app.router.add_get("/api/goal", self._handle_goal)
+        app.router.add_get("/metrics", self._handle_metrics)
+        app.router.add_get("/debug/traces", self._handle_traces)
+        self._assets.add_route(app, "/static", self._static_dir)
 
         # Donations feed routes
         app.router.add_get("/feed", self._handle_feed_index)
         app.router.add_get("/feed/ws", self._handle_feed_websocket)
-        app.router.add_static("/feed/static", self._feed_static_dir, name="feed_static")
+        app.router.add_get("/feed/events", self._handle_feed_events)
+        app.router.add_get("/api/donations", self._handle_api_donations)
+        app.router.add_get("/api/donations/search", self._handle_search_donations)
+        app.router.add_get("/api/donations/export", self._handle_export_donations)
+        self._assets.add_route(app, "/feed/static", self._feed_static_dir)
 
         # Media path relative to project root
         media_path = Path(self._config.get_media_path())
@@ -57,31 +130,93 @@ class WebHost:
 
         print(f"[WebHost] Media path: {media_path}")
         if media_path.exists():
-            app.router.add_static("/media", media_path, name="media")
+            self._assets.add_route(app, "/media", media_path)
         else:
             print(f"[WebHost] Warning: Media path does not exist: {media_path}")
 
+        # Transcoded video variants and posters
+        if self._transcoder and self._transcoder.is_available():
+            cache_dir = self._transcoder.get_cache_dir()
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            self._assets.add_route(app, "/media-cache", cache_dir, hashed_names=True)
+
     async def _handle_index(self, request: web.Request) -> web.Response:
-        template_path = self._templates_dir / "overlay.html"
-        if template_path.exists():
-            content = template_path.read_text(encoding="utf-8")
-            # Inject show_test_button config
-            show_test_button = self._config.show_test_button()
-            test_panel_display = "display: block" if show_test_button else "display: none"
-            content = content.replace(
-                '<div id="test-panel">',
-                f'<div id="test-panel" style="{test_panel_display}">'
-            )
-            return web.Response(text=content, content_type="text/html")
-        return web.Response(text="Overlay template not found", status=404)
+        if not self._overlay_page.exists():
+            return web.Response(text="Overlay template not found", status=404)
+        # Stream position: the page connects with since=seq and gets only what came after
+        snapshot = {
+            "config": self._page_config(),
+            "stream": {"epoch": self._hub.epoch, "seq": self._hub.last_seq},
+        }
+        return self._page_response(request, self._overlay_page.render(snapshot))
+
+    def _page_config(self) -> dict:
+        """Config the pages need at first paint."""
+        return {"show_test_button": self._config.show_test_button()}
+
+    def _page_response(self, request: web.Request, content: str) -> web.Response:
+        """
+        Send rendered HTML page.
+        Pages revalidate by ETag, so a scene reload costs a 304 and cached assets.
+        """
+        body = content.encode("utf-8")
+        etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+        headers = {"Cache-Control": "no-cache", "ETag": etag}
+
+        if self._assets.etag_matches(request, etag):
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=body, headers=headers, content_type="text/html", charset="utf-8")
 
     async def _handle_test_donation(self, request: web.Request) -> web.Response:
-        """Handle test donation button click."""
+        """
+        Handle test donation button click.
+        Optional JSON body {"amount": kopecks, "donor_name": str, "comment": str}
+        overrides the defaults (used by the load test to tag donations).
+        """
         print("[WebHost] Test donation requested")
 
+        try:
+            donation = await self._read_test_donation(request)
+        except ValueError as e:
+            return web.json_response({"status": "error", "message": str(e)}, status=400)
+
+        if self._fanout_client:
+            # Donations are processed by the main process only
+            if not await self._fanout_client.request({"op": "test_donation", "donation": donation}):
+                return web.json_response({"status": "error", "message": "Main process not reachable"}, status=503)
+        else:
+            await self._send_test_donation(donation)
+
+        return web.json_response({"status": "ok", "message": "Test donation sent"})
+
+    @staticmethod
+    async def _read_test_donation(request: web.Request) -> dict:
+        if not request.body_exists:
+            return {}
+        try:
+            data = await request.json()
+        except ValueError:
+            raise ValueError("Body must be JSON")
+        if not isinstance(data, dict):
+            raise ValueError("Body must be a JSON object")
+
+        donation = {}
+        if "amount" in data:
+            amount = data["amount"]
+            if not isinstance(amount, int) or isinstance(amount, bool) or amount <= 0:
+                raise ValueError("amount must be a positive integer (kopecks)")
+            donation["amount"] = amount
+        for key in ("donor_name", "comment"):
+            if key in data:
+                if not isinstance(data[key], str):
+                    raise ValueError(f"{key} must be a string")
+                donation[key] = data[key]
+        return donation
+
+    async def _send_test_donation(self, donation: dict | None = None) -> None:
         if self._notification_service:
             # Use notification service (proper flow with MediaPlayer)
-            await self._notification_service.test_donation()
+            await self._notification_service.test_donation(**(donation or {}))
         else:
             # Fallback: send test media directly
             await self.show_media(
@@ -90,69 +225,347 @@ class WebHost:
                 duration_ms=5000
             )
 
-        return web.json_response({"status": "ok", "message": "Test donation sent"})
+    async def _handle_connections(self, request: web.Request) -> web.Response:
+        """Live WebSocket connection counts."""
+        return web.json_response(self.get_connection_counts())
+
+    async def _handle_metrics(self, request: web.Request) -> web.Response:
+        """Prometheus text exposition."""
+        if self._fanout_client:
+            # Pipeline metrics live in the main process; this worker adds its own clients and loop lag
+            body = self._core_metrics + REGISTRY.render(metrics.is_per_process).encode("utf-8")
+        else:
+            body = REGISTRY.render().encode("utf-8")
+        return web.Response(body=body, headers={"Content-Type": REGISTRY.CONTENT_TYPE})
+
+    async def _handle_traces(self, request: web.Request) -> web.Response:
+        """Recent and slowest donation traces, as a page or ?format=json."""
+        report = self._core_traces if self._fanout_client else TRACER.get_report()
+        if request.query.get("format") == "json":
+            return web.json_response(report, headers={"Cache-Control": "no-store"})
+        return web.Response(text=render_html(report), content_type="text/html", headers={"Cache-Control": "no-store"})
+
+    def get_connection_counts(self) -> dict:
+        counts = {"overlay": self._hub.client_count(), "feed": 0}
+        if self._donations_feed:
+            counts["feed"] = self._donations_feed.client_count()
+        return counts
+
+    def _create_websocket(self) -> web.WebSocketResponse:
+        heartbeat = self._config.get_ws_heartbeat()
+        # Messages are pre-encoded once for all clients, so no per-client compression.
+        # Heartbeat pings the peer and closes it if no pong arrives within half the interval.
+        return web.WebSocketResponse(compress=False, heartbeat=heartbeat or None, protocols=protocol.subprotocols())
+
+    def _hello_message(self, client: HubClient) -> dict:
+        """Tell client how often to send its own heartbeat, where the stream is and how it is encoded."""
+        idle_timeout = self._config.get_ws_idle_timeout()
+        interval = idle_timeout / 3 if idle_timeout else 15.0
+        return {
+            "type": "hello",
+            "heartbeat_ms": round(interval * 1000),
+            "epoch": client.hub.epoch,
+            "seq": client.hub.last_seq,
+            "schema": protocol.SCHEMA_VERSION,
+            "format": client.format,
+        }
+
+    @staticmethod
+    def _request_topics(request: web.Request) -> frozenset[str] | None:
+        """Topics from ?topics=a,b (see topics.py); None = every message."""
+        try:
+            return parse_topics(request.query)
+        except ValueError as e:
+            raise web.HTTPBadRequest(text=str(e))
+
+    @staticmethod
+    def _resume_point(request: web.Request) -> tuple[int | None, str | None]:
+        """Read ?since=<seq>&epoch=<epoch> of a reconnecting client."""
+        try:
+            since = int(request.query["since"])
+        except (KeyError, ValueError):
+            return None, None
+        return since, request.query.get("epoch")
+
+    async def _receive_loop(self, ws: web.WebSocketResponse, client: HubClient, name: str) -> None:
+        """Read client messages until disconnect: answer heartbeats, close idle peers."""
+        idle_timeout = self._config.get_ws_idle_timeout() or None
+
+        while not ws.closed:
+            try:
+                msg = await ws.receive(timeout=idle_timeout)
+            except asyncio.TimeoutError:
+                print(f"[WebHost] {name} WebSocket idle for {idle_timeout:.0f}s, closing")
+                await ws.close(code=WSCloseCode.GOING_AWAY, message=b"idle timeout")
+                break
+
+            if msg.type == WSMsgType.TEXT:
+                await self._handle_client_message(client, msg.data)
+            elif msg.type == WSMsgType.ERROR:
+                print(f"[WebHost] {name} WebSocket error: {ws.exception()}")
+            elif msg.type in (WSMsgType.CLOSE, WSMsgType.CLOSING, WSMsgType.CLOSED):
+                break
+
+    async def _handle_client_message(self, client: HubClient, data: str) -> None:
+        try:
+            message = json.loads(data)
+        except ValueError:
+            return
+        if not isinstance(message, dict):
+            return
+
+        msg_type = message.get("type")
+        if msg_type == "ping":
+            client.hub.send_to(client, {"type": "pong", "t": message.get("t")})
+        elif msg_type == "ack" and isinstance(message.get("trace_id"), str):
+            await self._handle_ack(message["trace_id"])
+
+    async def _handle_ack(self, trace_id: str) -> None:
+        """Overlay has shown the alert: completes the donation's trace."""
+        if self._fanout_client:
+            # Traces are kept by the main process
+            await self._fanout_client.request({"op": "trace_ack", "trace_id": trace_id, "at": time.time()})
+        else:
+            TRACER.ack(trace_id)
 
     async def _handle_websocket(self, request: web.Request) -> web.WebSocketResponse:
-        ws = web.WebSocketResponse()
+        topics = self._request_topics(request)
+        ws = self._create_websocket()
         await ws.prepare(request)
 
-        self._websockets.add(ws)
-        print(f"[WebHost] WebSocket connected. Total: {len(self._websockets)}")
+        since, epoch = self._resume_point(request)
+        client = self._hub.add_websocket(ws, protocol.negotiate(request, ws.ws_protocol), topics)
+        self._hub.send_to(client, self._hello_message(client))
+        # Missed alerts follow hello; expired ones are skipped
+        self._resume_overlay(client, since, epoch)
+        print(f"[WebHost] WebSocket connected. Total: {self._hub.client_count()}")
 
         try:
-            async for msg in ws:
-                if msg.type == WSMsgType.TEXT:
-                    pass
-                elif msg.type == WSMsgType.ERROR:
-                    print(f"[WebHost] WebSocket error: {ws.exception()}")
+            await self._receive_loop(ws, client, "Overlay")
         finally:
-            self._websockets.discard(ws)
-            print(f"[WebHost] WebSocket disconnected. Total: {len(self._websockets)}")
+            await self._hub.remove_client(ws)
+            print(f"[WebHost] WebSocket disconnected. Total: {self._hub.client_count()}")
 
         return ws
 
+    def _resume_overlay(self, client: HubClient, since: int | None, epoch: str | None) -> None:
+        """
+        Queue overlay messages the client missed. Leaderboard updates only
+        carry changes, so a subscriber that can't be replayed gets full standings;
+        a goal_progress subscriber gets the current progress.
+        """
+        if since is not None and self._hub.replay(client, since, epoch):
+            return
+        if client.topics and "leaderboard" in client.topics and self._leaderboard is not None:
+            self._hub.send_to(client, {"type": "leaderboard", "full": True, "windows": self._leaderboard})
+        if client.topics and "goal_progress" in client.topics and self._goal_progress is not None:
+            self._hub.send_to(client, {"type": "goal_progress", **self._goal_progress})
+
+    async def _handle_events(self, request: web.Request) -> web.StreamResponse:
+        """Overlay events as Server-Sent Events."""
+        return await self._serve_sse(request, self._hub, self._resume_overlay)
+
+    async def _handle_feed_events(self, request: web.Request) -> web.StreamResponse:
+        """Feed events as Server-Sent Events."""
+        if not self._donations_feed:
+            return web.Response(text="Feed not configured", status=500)
+        return await self._serve_sse(request, self._donations_feed.get_hub(), self._donations_feed.resume)
+
+    async def _serve_sse(
+        self,
+        request: web.Request,
+        hub: BroadcastHub,
+        on_connect: Callable[[HubClient, int | None, str | None], None],
+    ) -> web.StreamResponse:
+        """
+        Stream hub messages as text/event-stream.
+        Event ids are "<epoch>-<seq>", so EventSource resumes via Last-Event-ID
+        on its own. A passive listener costs one queue and one writer task.
+        """
+        topics = self._request_topics(request)
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # Stop nginx from buffering the stream
+        })
+        await response.prepare(request)
+        await response.write(b"retry: 3000\n\n")
+
+        since, epoch = self._resume_point(request)
+        last_event_seq = hub.parse_event_id(request.headers.get("Last-Event-ID"))
+        if last_event_seq is not None:
+            since, epoch = last_event_seq, hub.epoch
+
+        conn = SseConnection(response)
+        client = hub.add_sse(conn, topics)
+        on_connect(client, since, epoch)
+        print(f"[WebHost] SSE client connected to {hub.name}. Total: {hub.client_count()}")
+
+        keepalive = self._config.get_sse_keepalive()
+        try:
+            # A dead peer is noticed when a write fails, keep-alives make sure one happens
+            while not await conn.wait_closed(keepalive):
+                if client.queue_size == 0:
+                    hub.send_envelope(client, SSE_KEEPALIVE)
+        finally:
+            await hub.remove_client(conn)
+            print(f"[WebHost] SSE client disconnected from {hub.name}. Total: {hub.client_count()}")
+
+        return response
+
     async def _handle_feed_index(self, request: web.Request) -> web.Response:
-        """Handle feed page."""
-        template_path = self._feed_templates_dir / "feed.html"
-        if template_path.exists():
-            content = template_path.read_text(encoding="utf-8")
-            return web.Response(text=content, content_type="text/html")
-        return web.Response(text="Feed template not found", status=404)
+        """Handle feed page, with current donations inlined."""
+        if not self._feed_page.exists():
+            return web.Response(text="Feed template not found", status=404)
+        snapshot = {"config": self._page_config()}
+        if self._donations_feed:
+            snapshot["init"] = self._donations_feed.init_message(self._request_topics(request))
+        return self._page_response(request, self._feed_page.render(snapshot))
 
     async def _handle_feed_websocket(self, request: web.Request) -> web.WebSocketResponse:
         """Handle feed WebSocket."""
         if not self._donations_feed:
             return web.Response(text="Feed not configured", status=500)
 
-        ws = web.WebSocketResponse()
+        topics = self._request_topics(request)
+        ws = self._create_websocket()
         await ws.prepare(request)
 
-        await self._donations_feed.register_websocket(ws)
+        since, epoch = self._resume_point(request)
+        client = await self._donations_feed.register_websocket(
+            ws, since, epoch, protocol.negotiate(request, ws.ws_protocol), topics
+        )
+        client.hub.send_to(client, self._hello_message(client))
 
         try:
-            async for msg in ws:
-                if msg.type == WSMsgType.TEXT:
-                    pass
-                elif msg.type == WSMsgType.ERROR:
-                    print(f"[WebHost] Feed WebSocket error: {ws.exception()}")
+            await self._receive_loop(ws, client, "Feed")
         finally:
-            self._donations_feed.unregister_websocket(ws)
+            await self._donations_feed.unregister_client(ws)
 
         return ws
 
-    async def _broadcast(self, message: dict) -> None:
-        if not self._websockets:
-            return
+    async def _handle_api_donations(self, request: web.Request) -> web.Response:
+        """
+        Feed donations, newest first, with cursor pagination and filters:
+        ?limit=&cursor=&since=&until=&min_amount=&donor=
+        Responses carry ETag and Last-Modified, so polling dashboards mostly get 304.
+        """
+        if not self._donations_feed:
+            return web.json_response({"error": "Feed not configured"}, status=500)
+
+        try:
+            query = self._donations_feed.parse_query(request.query)
+        except ValueError as e:
+            return web.json_response({"error": str(e)}, status=400)
+
+        etag, body = self._donations_feed.get_page(query)
+        headers = {"Cache-Control": "no-cache", "ETag": etag}
+        modified_at = self._donations_feed.get_modified_at()
+        if modified_at is not None:
+            modified_at = modified_at.astimezone(timezone.utc).replace(microsecond=0)
+            headers["Last-Modified"] = format_datetime(modified_at, usegmt=True)
+
+        if "If-None-Match" in request.headers:
+            not_modified = self._assets.etag_matches(request, etag)
+        else:
+            since = request.if_modified_since
+            not_modified = since is not None and modified_at is not None and modified_at <= since
+        if not_modified:
+            return web.Response(status=304, headers=headers)
 
-        data = json.dumps(message)
-        tasks = []
+        return web.Response(body=body, headers=headers, content_type="application/json", charset="utf-8")
 
-        for ws in list(self._websockets):
-            if not ws.closed:
-                tasks.append(ws.send_str(data))
+    async def _handle_search_donations(self, request: web.Request) -> web.Response:
+        """
+        Full-text search of donation history by donor name and comment, best match first:
+        ?q=&since=&until=&min_amount=&max_amount=&jar=&limit=&offset=
+        """
+        if not self._history_store:
+            return web.json_response({"error": "History not configured"}, status=500)
 
-        if tasks:
-            await asyncio.gather(*tasks, return_exceptions=True)
+        try:
+            query = self._history_store.parse_search(request.query)
+        except ValueError as e:
+            return web.json_response({"error": str(e)}, status=400)
+
+        records, next_offset = await self._history_store.search(query)
+        return web.json_response(
+            {"donations": [record.to_dict() for record in records], "next_offset": next_offset},
+            dumps=lambda data: json.dumps(data, ensure_ascii=False),
+        )
+
+    async def _handle_export_donations(self, request: web.Request) -> web.StreamResponse:
+        """
+        Donation history as a CSV or JSON Lines download, oldest first:
+        ?format=csv|jsonl&since=&until=&jar=
+        Streamed in chunks as it is read, so a year of donations isn't held in memory.
+        """
+        if not self._history_store:
+            return web.json_response({"error": "History not configured"}, status=500)
+
+        try:
+            query = ExportQuery.from_params(request.query)
+        except ValueError as e:
+            return web.json_response({"error": str(e)}, status=400)
+
+        export = HistoryExport(self._history_store, query)
+        response = web.StreamResponse(headers={
+            "Content-Type": f"{export.content_type}; charset=utf-8",
+            "Content-Disposition": f'attachment; filename="{export.filename}"',
+            "Cache-Control": "no-store",
+        })
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+        # write() waits while the client is behind, so a slow download reads no further ahead
+        async for chunk in export.chunks():
+            await response.write(chunk)
+        await response.write_eof()
+        print(f"[WebHost] Exported {export.rows} donation(s) as {query.format}")
+        return response
+
+    async def _handle_leaderboard(self, request: web.Request) -> web.Response:
+        """Totals and top donors of every window, or of one with ?window=."""
+        if self._leaderboard is None:
+            return web.json_response({"error": "Leaderboard not configured"}, status=500)
+        name = request.query.get("window")
+        if name is None:
+            return web.json_response({"windows": self._leaderboard})
+        if name not in self._leaderboard:
+            return web.json_response({"error": f"Unknown window '{name}'"}, status=404)
+        return web.json_response(self._leaderboard[name])
+
+    async def publish_leaderboard(self, windows: dict[str, dict]) -> None:
+        """Push changed parts of leaderboard windows to "leaderboard" subscribers."""
+        self._apply_leaderboard(windows)
+        await self._broadcast({"type": "leaderboard", "windows": windows})
+
+    def _apply_leaderboard(self, windows: dict[str, dict]) -> None:
+        if self._leaderboard is None:
+            self._leaderboard = {}
+        for name, changes in windows.items():
+            self._leaderboard.setdefault(name, {}).update(changes)
+
+    async def _handle_goal(self, request: web.Request) -> web.Response:
+        """Jar balance and progress towards its goal."""
+        if self._goal_progress is None:
+            return web.json_response({"error": "Goal progress not available"}, status=500)
+        return web.json_response(self._goal_progress)
+
+    async def publish_goal_progress(self, progress: dict) -> None:
+        """Push jar balance and goal progress to "goal_progress" subscribers."""
+        self._goal_progress = progress
+        await self._broadcast({"type": "goal_progress", **progress})
+
+    async def _broadcast(self, message: dict, ttl: float | None = None, topics: tuple[str, ...] = ()) -> None:
+        # Only queues the message - slow clients can't hold up the caller
+        self._hub.publish(message, ttl, topics)
+
+    def get_broadcast_stats(self) -> dict:
+        """Overlay and feed client counts, send queue lag and evictions."""
+        stats = {"overlay": self._hub.get_stats()}
+        if self._donations_feed:
+            stats["feed"] = self._donations_feed.get_broadcast_stats()
+        return stats
 
     async def start_async(self) -> None:
         if self._running:
@@ -161,24 +574,137 @@ class WebHost:
         self._app = web.Application()
         self._setup_routes(self._app)
 
-        self._runner = web.AppRunner(self._app)
-        await self._runner.setup()
-
         host = self._config.get_host()
         port = self._config.get_port()
 
-        self._site = web.TCPSite(self._runner, host, port)
-        await self._site.start()
+        workers = self._config.get_workers()
+        is_worker = self._fanout_client is not None
+        if workers > 0 and not is_worker and not WorkerPool.is_supported():
+            print("[WebHost] Worker processes need SO_REUSEPORT and Unix sockets, serving from main process")
+            workers = 0
+
+        if workers > 0 and not is_worker:
+            # Routes are still set up here: media URLs are fingerprinted before publishing
+            await self._start_workers(workers)
+        else:
+            self._runner = web.AppRunner(self._app)
+            await self._runner.setup()
+
+            self._site = web.TCPSite(self._runner, host, port, reuse_port=is_worker or None)
+            await self._site.start()
+
+        # Hash static and media files off the event loop
+        await self._assets.warm()
 
+        self._loop_monitor.start()
         self._running = True
         print(f"[WebHost] Server started at http://{host}:{port}")
 
+    async def _start_workers(self, count: int) -> None:
+        socket_path = self._config.get_fanout_socket()
+        if socket_path:
+            socket_path = Path(socket_path)
+            if not socket_path.is_absolute():
+                socket_path = self._project_root / socket_path
+        else:
+            socket_path = Path(tempfile.gettempdir()) / f"monobank-donation-{self._config.get_port()}.sock"
+
+        self._fanout_server = FanoutServer(socket_path, self._fanout_snapshot, self._handle_worker_request)
+        await self._fanout_server.start()
+
+        if not self._forwarding_to_workers:
+            self._forwarding_to_workers = True
+            self._hub.add_listener(lambda envelope, ttl: self._forward_to_workers("overlay", envelope, ttl))
+            if self._donations_feed:
+                self._donations_feed.get_hub().add_listener(
+                    lambda envelope, ttl: self._forward_to_workers("feed", envelope, ttl)
+                )
+
+        self._worker_pool = WorkerPool(self._config.get_config_path().resolve(), self._project_root, socket_path, count)
+        await self._worker_pool.start()
+        self._diagnostics_task = asyncio.create_task(self._push_diagnostics())
+
+    async def _push_diagnostics(self) -> None:
+        """Send pipeline metrics and traces to workers, which serve /metrics and /debug/traces in this mode."""
+        def is_pipeline(name: str) -> bool:
+            return not metrics.is_per_process(name)
+
+        while True:
+            await asyncio.sleep(self.DIAGNOSTICS_PUSH_INTERVAL)
+            if self._fanout_server and self._fanout_server.worker_count():
+                self._fanout_server.send_all({"op": "metrics"}, REGISTRY.render(is_pipeline).encode("utf-8"))
+                self._fanout_server.send_all({"op": "traces"}, json.dumps(TRACER.get_report()).encode("utf-8"))
+
+    def _forward_to_workers(self, hub: str, envelope: Envelope, ttl: float | None) -> None:
+        if self._fanout_server:
+            self._fanout_server.publish(hub, envelope.json, envelope.seq, ttl, envelope.topics)
+
+    def _fanout_snapshot(self) -> dict:
+        """State a worker needs before it can serve clients."""
+        return {
+            "overlay": {"epoch": self._hub.epoch, "seq": self._hub.last_seq},
+            "feed": self._donations_feed.get_snapshot() if self._donations_feed else None,
+            "leaderboard": self._leaderboard,
+            "goal_progress": self._goal_progress,
+        }
+
+    async def _handle_worker_request(self, header: dict, payload: bytes) -> None:
+        op = header.get("op")
+        if op == "test_donation":
+            print("[WebHost] Test donation requested by worker")
+            await self._send_test_donation(header.get("donation"))
+        elif op == "trace_ack":
+            TRACER.ack(header.get("trace_id"), header.get("at"))
+
+    async def handle_fanout_frame(self, header: dict, payload: bytes) -> None:
+        """Apply snapshot or broadcast received from the main process (worker side)."""
+        op = header.get("op")
+        if op == "snapshot":
+            self._hub.sync(header["overlay"]["epoch"], header["overlay"]["seq"])
+            if self._donations_feed and header.get("feed"):
+                self._donations_feed.load_snapshot(header["feed"])
+            self._leaderboard = header.get("leaderboard")
+            self._goal_progress = header.get("goal_progress")
+        elif op == "publish":
+            if header["hub"] == "overlay":
+                topics = tuple(header.get("topics", ()))
+                if "leaderboard" in topics:
+                    # Kept for /api/leaderboard and new subscribers of this worker
+                    self._apply_leaderboard(json.loads(payload)["windows"])
+                elif "goal_progress" in topics:
+                    progress = json.loads(payload)
+                    progress.pop("type", None)
+                    self._goal_progress = progress
+                self._hub.publish_encoded(payload, header["seq"], header.get("ttl"), topics=topics)
+            elif header["hub"] == "feed" and self._donations_feed:
+                self._donations_feed.publish_mirrored(payload, header["seq"], header.get("ttl"), tuple(header.get("topics", ())))
+        elif op == "metrics":
+            self._core_metrics = payload
+        elif op == "traces":
+            self._core_traces = json.loads(payload)
+
     async def stop_async(self) -> None:
         if not self._running:
             return
 
-        for ws in list(self._websockets):
-            await ws.close()
+        await self._loop_monitor.stop()
+        if self._diagnostics_task:
+            self._diagnostics_task.cancel()
+            try:
+                await self._diagnostics_task
+            except asyncio.CancelledError:
+                pass
+            self._diagnostics_task = None
+        if self._worker_pool:
+            await self._worker_pool.stop()
+            self._worker_pool = None
+        if self._fanout_server:
+            await self._fanout_server.stop()
+            self._fanout_server = None
+
+        await self._hub.close_all()
+        if self._donations_feed:
+            await self._donations_feed.close_all()
 
         if self._runner:
             await self._runner.cleanup()
@@ -203,13 +729,45 @@ class WebHost:
     def get_url(self) -> str:
         return f"http://{self._config.get_host()}:{self._config.get_port()}"
 
+    def _media_url(self, path: str) -> str:
+        """Get fingerprinted URL of file in media folder."""
+        return self._assets.url("/media", path)
+
+    def _video_sources(self, image_path: str) -> dict | None:
+        """
+        Get video variants of image for message, best first.
+        Overlay plays the first source its browser supports.
+        """
+        if not self._transcoder:
+            return None
+
+        variants = self._transcoder.get_variants(image_path)
+        if not variants or not variants.has_video():
+            return None
+
+        sources = []
+        # WebM (VP9) first: smaller and keeps transparency
+        if variants.webm:
+            sources.append({"src": f"/media-cache/{variants.webm}", "type": 'video/webm; codecs="vp9"'})
+        if variants.mp4:
+            sources.append({"src": f"/media-cache/{variants.mp4}", "type": 'video/mp4; codecs="avc1.42E01E"'})
+
+        result = {"sources": sources}
+        if variants.poster:
+            result["poster"] = f"/media-cache/{variants.poster}"
+        return result
+
     async def show_image(self, image_path: str, duration_ms: int | None = None) -> None:
         duration = duration_ms or self._config.get_default_duration()
-        await self._broadcast({
+        message = {
             "type": "show_image",
-            "image": f"/media/{image_path}",
+            "image": self._media_url(image_path),
             "duration": duration,
-        })
+        }
+        video = self._video_sources(image_path)
+        if video:
+            message["video"] = video
+        await self._broadcast(message, ttl=duration / 1000)
 
     async def show_gif(self, gif_path: str, duration_ms: int | None = None) -> None:
         await self.show_image(gif_path, duration_ms)
@@ -222,23 +780,52 @@ class WebHost:
         donor_name: str | None = None,
         comment: str | None = None,
         amount: int | None = None,
+        trace_id: str | None = None,
     ) -> None:
         duration = duration_ms or self._config.get_default_duration()
         message = {
             "type": "show_media",
-            "image": f"/media/{image_path}",
+            "image": self._media_url(image_path),
             "duration": duration,
         }
+        video = self._video_sources(image_path)
+        if video:
+            message["video"] = video
         if audio_path:
-            message["audio"] = f"/media/{audio_path}"
+            message["audio"] = self._media_url(audio_path)
         if donor_name:
             message["donor_name"] = donor_name
         if comment:
             message["comment"] = comment
         if amount is not None:
             message["amount"] = amount
+        if trace_id:
+            # Overlay answers with an ack carrying it, closing the trace
+            message["trace_id"] = trace_id
 
-        await self._broadcast(message)
+        topics = donation_topics(self._config, amount) if amount is not None else ()
+        # Not worth replaying to a reconnecting overlay once it would have ended
+        await self._broadcast(message, ttl=duration / 1000, topics=topics)
+
+    async def preload_media(self, image_paths: list[str], audio_paths: list[str] | None = None) -> None:
+        """Tell overlay clients to fetch media that will be shown soon."""
+        if not image_paths and not audio_paths:
+            return
+        images = []
+        videos = []
+        for path in image_paths:
+            video = self._video_sources(path)
+            if video:
+                videos.append(video)
+            else:
+                images.append(self._media_url(path))
+
+        await self._broadcast({
+            "type": "preload",
+            "images": images,
+            "videos": videos,
+            "audio": [self._media_url(p) for p in audio_paths or []],
+        }, ttl=self.PRELOAD_TTL)
 
     async def clear(self) -> None:
         await self._broadcast({"type": "clear"})
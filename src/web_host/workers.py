@@ -0,0 +1,139 @@
+import asyncio
+import multiprocessing
+import signal
+import socket
+from pathlib import Path
+
+from .fanout import FanoutClient
+
+
+class WorkerPool:
+    """
+    Web worker processes serving overlay and feed on one shared port.
+
+    Every worker binds the port with SO_REUSEPORT, so the kernel spreads
+    connections across them. Workers only serve clients; donations are still
+    processed by the main process, which streams every broadcast to them
+    over a Unix socket (see fanout.py). Crashed workers are restarted.
+    """
+
+    SUPERVISE_INTERVAL = 2.0
+
+    def __init__(self, config_path: Path, project_root: Path, socket_path: Path, count: int):
+        self._config_path = config_path
+        self._project_root = project_root
+        self._socket_path = socket_path
+        self._count = count
+
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: list[multiprocessing.Process | None] = [None] * count
+        self._task: asyncio.Task | None = None
+
+    @staticmethod
+    def is_supported() -> bool:
+        return hasattr(socket, "SO_REUSEPORT") and hasattr(socket, "AF_UNIX")
+
+    async def start(self) -> None:
+        for index in range(self._count):
+            self._spawn(index)
+        self._task = asyncio.create_task(self._supervise())
+        print(f"[WorkerPool] Started {self._count} worker(s)")
+
+    def _spawn(self, index: int) -> None:
+        process = self._context.Process(
+            target=run_worker,
+            args=(str(self._config_path), str(self._project_root), str(self._socket_path), index),
+            name=f"web-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        self._processes[index] = process
+
+    async def _supervise(self) -> None:
+        while True:
+            await asyncio.sleep(self.SUPERVISE_INTERVAL)
+            for index, process in enumerate(self._processes):
+                if process is not None and not process.is_alive():
+                    print(f"[WorkerPool] Worker {index} exited with code {process.exitcode}, restarting")
+                    self._spawn(index)
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        processes = [p for p in self._processes if p is not None]
+        for process in processes:
+            process.terminate()
+
+        def join_all() -> None:
+            for process in processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.kill()
+                    process.join()
+
+        await asyncio.to_thread(join_all)
+        self._processes = [None] * self._count
+        print("[WorkerPool] Workers stopped")
+
+    def alive_count(self) -> int:
+        return sum(1 for p in self._processes if p is not None and p.is_alive())
+
+
+def run_worker(config_path: str, project_root: str, socket_path: str, index: int) -> None:
+    """Entry point of a worker process."""
+    try:
+        asyncio.run(_worker_main(Path(config_path), Path(project_root), Path(socket_path), index))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _worker_main(config_path: Path, project_root: Path, socket_path: Path, index: int) -> None:
+    # Imported here: this module is imported by web_host itself
+    from src.config import Config
+    from src.donations_feed import DonationsFeed
+    from src.history import HistoryStore
+    from src.media_player import MediaPlayer, MediaTranscoder
+    from .web_host import WebHost
+
+    config = Config(str(config_path))
+    web_host = WebHost(config, project_root=project_root)
+    donations_feed = DonationsFeed(config, max_donations=50)
+    media_player = MediaPlayer(config, project_root=project_root)
+
+    web_host.set_donations_feed(donations_feed)
+    # Not started: only tells the worker where transcoded variants are served from
+    web_host.set_media_transcoder(MediaTranscoder(config, media_player, project_root=project_root))
+
+    # Searches are served here, from the database the main process writes
+    history_store = HistoryStore.from_config(config, project_root, read_only=True) if config.is_history_enabled() else None
+    if history_store:
+        await history_store.start()
+        web_host.set_history_store(history_store)
+
+    fanout_client = FanoutClient(socket_path, web_host.handle_fanout_frame)
+    web_host.set_fanout_client(fanout_client)
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    await fanout_client.start()
+    if not await fanout_client.wait_connected(timeout=10):
+        print(f"[Worker {index}] Main process not reachable yet, serving without state")
+
+    await web_host.start_async()
+    print(f"[Worker {index}] Serving")
+
+    await stop_event.wait()
+
+    await web_host.stop_async()
+    await fanout_client.stop()
+    if history_store:
+        await history_store.stop()
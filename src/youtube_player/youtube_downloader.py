@@ -1,8 +1,11 @@
 import asyncio
 import subprocess
+import time
 from pathlib import Path
 from typing import Optional, Tuple
 
+from src.metrics import metrics
+
 
 class YouTubeDownloader:
     """Download YouTube videos using yt-dlp."""
@@ -13,6 +16,28 @@ class YouTubeDownloader:
     def __init__(self):
         self.CACHE_DIR.mkdir(exist_ok=True)
 
+    @staticmethod
+    async def _run_ytdlp(operation: str, args: list[str], timeout: int) -> subprocess.CompletedProcess:
+        """Run yt-dlp in a thread, recording call duration by operation and outcome."""
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await asyncio.to_thread(
+                subprocess.run,
+                ["yt-dlp", *args],
+                capture_output=True,
+                text=True,
+                timeout=timeout
+            )
+            if result.returncode == 0:
+                outcome = "ok"
+            return result
+        except subprocess.TimeoutExpired:
+            outcome = "timeout"
+            raise
+        finally:
+            metrics.YTDLP_DURATION.labels(operation, outcome).observe(time.perf_counter() - started)
+
     async def get_info(self, url: str) -> Optional[Tuple[str, int]]:
         """
         Get video info from YouTube.
@@ -20,16 +45,13 @@ class YouTubeDownloader:
         """
         try:
             print(f"[YouTubeDownloader] Getting info for: {url}")
-            result = await asyncio.to_thread(
-                subprocess.run,
+            result = await self._run_ytdlp(
+                "info",
                 [
-                    "yt-dlp",
                     "--dump-json",
                     "--no-warnings",
                     url
                 ],
-                capture_output=True,
-                text=True,
                 timeout=10
             )
 
@@ -80,22 +102,23 @@ class YouTubeDownloader:
 
             print(f"[YouTubeDownloader] Downloading: {title} ({duration}s)")
 
-            result = await asyncio.to_thread(
-                subprocess.run,
-                [
-                    "yt-dlp",
-                    "-f", "bestaudio",
-                    "-x",
-                    "--audio-format", "mp3",
-                    "--audio-quality", "192",
-                    "-o", str(output_path),
-                    "--no-warnings",
-                    url
-                ],
-                capture_output=True,
-                text=True,
-                timeout=60
-            )
+            metrics.YOUTUBE_DOWNLOADS_ACTIVE.inc()
+            try:
+                result = await self._run_ytdlp(
+                    "download",
+                    [
+                        "-f", "bestaudio",
+                        "-x",
+                        "--audio-format", "mp3",
+                        "--audio-quality", "192",
+                        "-o", str(output_path),
+                        "--no-warnings",
+                        url
+                    ],
+                    timeout=60
+                )
+            finally:
+                metrics.YOUTUBE_DOWNLOADS_ACTIVE.dec()
 
             if result.returncode == 0 and output_path.exists():
                 print(f"[YouTubeDownloader] Downloaded: {output_path}")
@@ -4,6 +4,9 @@ import time
 from pathlib import Path
 from typing import Optional
 
+from src.metrics import metrics
+from src.tracing import TRACER
+
 from .url_parser import YouTubeURLParser
 from .queue_manager import QueueManager, QueueItem
 from .youtube_downloader import YouTubeDownloader
@@ -25,11 +28,24 @@ class YouTubePlayer:
         self._auto_play = False  # Don't auto-play on startup
         self._was_playing = False  # Track previous playback state
 
-    async def add_from_comment(self, comment: str) -> bool:
+        # Read from the queue only when metrics are scraped
+        metrics.YOUTUBE_QUEUE_ITEMS.labels("downloaded").set_function(self.queue.get_downloaded_count)
+        metrics.YOUTUBE_QUEUE_ITEMS.labels("pending").set_function(
+            lambda: self.queue.size() - self.queue.get_downloaded_count()
+        )
+
+    async def add_from_comment(self, comment: str, trace_id: Optional[str] = None) -> bool:
         """
         Extract URL from comment and add to queue.
         Returns True if added, False otherwise.
+        trace_id: donation trace to record the music_ingestion span in.
         """
+        with TRACER.span(trace_id, "music_ingestion") as span:
+            added = await self._add_from_comment(comment)
+            span.set(added=added)
+        return added
+
+    async def _add_from_comment(self, comment: str) -> bool:
         print(f"[YouTubePlayer] add_from_comment called with: {comment[:100]}")
 
         url = self.parser.extract_url(comment)